@@ -0,0 +1,311 @@
+import functools
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+# The active result cache, or None. Memoized functions check this once per call, so caching costs nothing when it is off.
+# The modules the cache needs are imported when it is first used, so that importing the package stays fast.
+ACTIVE: Optional['ResultCache'] = None
+_active_lock = threading.Lock() # Held while ACTIVE is changed
+
+# Lookups only read the database. The hits and misses of each process, and the results they used, are written in batches instead,
+# so that readers in different processes never wait for each other's write lock.
+FLUSH_SECONDS = 5.0 # The longest a process keeps its hits and misses before writing them
+FLUSH_LOOKUPS = 256 # The most lookups a process keeps before writing them
+TOUCH_SECONDS = 60.0 # A hit only marks its result as recently used if it was last marked longer ago than this
+
+class ResultCache():
+    '''
+    An on-disk cache of the results of get_upstream() and the solvers, shared by every process that opens the same file, and kept across restarts.
+    Caching is opt-in: results are only looked up and stored while a cache is active.
+
+        >>> with ResultCache('upstream.db'):
+        ...     plan = FactoryGroup([SurgeSmelter()]).get_upstream(rounded = True) # Solved once, then read from the cache
+
+    Results are keyed by the function, the exact contents of the group (factories, their variants, counts and rates, in order), every other argument, and catalog_version(),
+    so a result is never reused for a different question or catalog. Calls whose arguments cannot be keyed, such as a custom objective function, are not cached.
+    Calls made while computing a cached result are not cached themselves, so get_upstream(solver = 'linear') stores one result, not one for each solver it uses.
+
+    The least recently used results are evicted once the cache is larger than max_bytes. The file is an SQLite database in WAL mode,
+    so several worker processes on one host can read and write it at once; each process and thread uses its own connection.
+    Lookups never write: each process records when results were used (to within TOUCH_SECONDS), and its hits and misses, and writes them with its next store,
+    every FLUSH_SECONDS or FLUSH_LOOKUPS lookups, and when it leaves the with block or closes the cache, so the totals of stats() can lag behind other processes by that much.
+
+    Args:
+        path (str): The database file. It is created if it does not exist.
+        max_bytes (int): The largest total size of the stored results, in bytes. Defaults to 256 MiB.
+        timeout (float): How long to wait for another process's write to finish, in seconds. Defaults to 30.
+
+    Attributes:
+        path (str): The database file.
+        max_bytes (int): The largest total size of the stored results.
+        counters (Dict[str, int]): The hits, misses, stores and evictions of this process. See stats() for the totals of every process.
+    '''
+    def __init__(self, path: str, max_bytes: int = 256 * 2**20, timeout: float = 30.0):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.counters = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._previous = []
+        self._pending()
+        with self._write() as connection:
+            connection.execute('CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, used REAL NOT NULL)')
+            connection.execute('CREATE INDEX IF NOT EXISTS results_used ON results (used)')
+            connection.execute('CREATE TABLE IF NOT EXISTS totals (name TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+            connection.executemany('INSERT OR IGNORE INTO totals VALUES (?, 0)', [('bytes',), ('hits',), ('misses',), ('stores',), ('evictions',)])
+
+    def call(self, function: Callable, *args, **kwargs) -> Any:
+        '''
+        Calls a function through the cache: returns its stored result for these arguments, or calls it and stores the result.
+
+        Returns:
+            The result of the function.
+        '''
+        if getattr(self._local, 'computing', False):
+            return function(*args, **kwargs)
+        key = self.key(function, *args, **kwargs)
+        if key is None:
+            return function(*args, **kwargs)
+        found = self.get(key)
+        if found is not None:
+            return found[0]
+        self._local.computing = True
+        try:
+            result = function(*args, **kwargs)
+        finally:
+            self._local.computing = False
+        self.put(key, result)
+        return result
+
+    def key(self, function: Callable, *args, **kwargs) -> Optional[str]:
+        '''
+        The canonical key of a call: a hash of the function's name, its arguments with defaults filled in, and the catalog version.
+
+        Returns:
+            str: The key, or None if an argument cannot be keyed.
+        '''
+        import hashlib
+        from MindustryTools.Catalog import catalog_version
+        bound = _signature(function).bind(*args, **kwargs)
+        bound.apply_defaults()
+        try:
+            arguments = _canonical(bound.arguments)
+        except TypeError:
+            return None
+        text = repr((function.__module__, function.__qualname__, catalog_version(), arguments))
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[tuple]:
+        '''
+        Looks up a result, marking it as recently used. Only reads the database; see flush().
+
+        Returns:
+            tuple: A tuple of the result, or None if it is not cached (results may themselves be None).
+        '''
+        import pickle
+        row = self._connection().execute('SELECT value, used FROM results WHERE key = ?', (key,)).fetchone()
+        now = time.time()
+        with self._lock:
+            name = 'misses' if row is None else 'hits'
+            self.counters[name] += 1
+            self._unflushed[name] += 1
+            if row is not None and now - row[1] > TOUCH_SECONDS:
+                self._touched[key] = now
+            due = self._unflushed['hits'] + self._unflushed['misses'] >= FLUSH_LOOKUPS or time.monotonic() - self._flushed > FLUSH_SECONDS
+        if due:
+            self.flush()
+        return None if row is None else (pickle.loads(row[0]),)
+
+    def flush(self):
+        'Writes the hits, misses and uses of results that this process has not written yet. Called automatically; see get().'
+        with self._lock:
+            empty = not self._touched and not self._unflushed['hits'] and not self._unflushed['misses']
+        if not empty:
+            with self._write() as connection:
+                self._flush(connection)
+
+    def put(self, key: str, value: Any):
+        'Stores a result, evicting the least recently used results if the cache is then too large.'
+        import pickle
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        if len(data) > self.max_bytes:
+            return
+        with self._write() as connection:
+            previous = connection.execute('SELECT size FROM results WHERE key = ?', (key,)).fetchone()
+            connection.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)', (key, data, len(data), time.time()))
+            size = connection.execute("UPDATE totals SET value = value + ? WHERE name = 'bytes' RETURNING value", (len(data) - (previous[0] if previous else 0),)).fetchone()[0]
+            self._count(connection, 'stores')
+            self._flush(connection)
+            while size > self.max_bytes:
+                evicted = connection.execute('SELECT key, size FROM results ORDER BY used LIMIT 64').fetchall()
+                for old, old_size in evicted:
+                    if size <= self.max_bytes:
+                        break
+                    connection.execute('DELETE FROM results WHERE key = ?', (old,))
+                    size -= old_size
+                    self._count(connection, 'evictions')
+                connection.execute("UPDATE totals SET value = ? WHERE name = 'bytes'", (size,))
+
+    def stats(self) -> Dict[str, float]:
+        '''
+        The totals of every process that has used the cache, including this process's lookups, but not those other processes have not written yet. See flush().
+
+        Returns:
+            Dict[str, float]: The number of entries and their size in bytes, the hits, misses, stores and evictions, and the hit rate.
+        '''
+        self.flush()
+        connection = self._connection()
+        stats = dict(connection.execute('SELECT name, value FROM totals').fetchall())
+        stats['entries'] = connection.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+    def clear(self):
+        'Removes every result and resets the statistics.'
+        with self._write() as connection:
+            connection.execute('DELETE FROM results')
+            connection.execute('UPDATE totals SET value = 0')
+        self.counters = dict.fromkeys(self.counters, 0)
+        self._pending()
+
+    def close(self):
+        'Writes what this process has not written yet, and closes the connection of this thread.'
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            self.flush()
+            connection.close()
+            self._local.connection = None
+
+    def __enter__(self) -> 'ResultCache':
+        global ACTIVE
+        with _active_lock:
+            self._previous.append(ACTIVE)
+            ACTIVE = self
+        return self
+
+    def __exit__(self, *exception):
+        global ACTIVE
+        with _active_lock:
+            ACTIVE = self._previous.pop()
+        self.flush()
+
+    def __repr__(self):
+        return f"ResultCache('{self.path}')"
+
+    def __getstate__(self):
+        # Connections and locks cannot be sent to other processes; each process opens its own
+        state = self.__dict__.copy()
+        del state['_local'], state['_lock'], state['_unflushed'], state['_touched'], state['_flushed']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._pending()
+
+    def _connection(self):
+        'The connection of this thread, opened again after a fork, as SQLite connections cannot be shared between processes.'
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            import sqlite3
+            connection = self._local.connection = sqlite3.connect(self.path, timeout = self.timeout, isolation_level = None)
+            connection.execute('PRAGMA journal_mode = WAL')
+            connection.execute('PRAGMA synchronous = NORMAL')
+            self._local.pid = os.getpid()
+        return connection
+
+    def _write(self):
+        return _Transaction(self._connection())
+
+    def _count(self, connection, name: str):
+        self.counters[name] += 1
+        connection.execute('UPDATE totals SET value = value + 1 WHERE name = ?', (name,))
+
+    def _pending(self):
+        'Starts a new batch of lookups to write. See flush().'
+        self._unflushed = {'hits': 0, 'misses': 0}
+        self._touched = {}
+        self._flushed = time.monotonic()
+
+    def _flush(self, connection):
+        'Writes the current batch of lookups, within a write transaction.'
+        with self._lock:
+            unflushed, touched = self._unflushed, self._touched
+            self._pending()
+        connection.executemany('UPDATE totals SET value = value + ? WHERE name = ?', [(number, name) for name, number in unflushed.items() if number])
+        connection.executemany('UPDATE results SET used = MAX(used, ?) WHERE key = ?', [(used, key) for key, used in touched.items()])
+
+class _Transaction():
+    'Runs a block as one write transaction, taking the write lock at the start so that concurrent writers wait instead of failing partway through.'
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        self.connection.execute('BEGIN IMMEDIATE')
+        return self.connection
+
+    def __exit__(self, exception_type, *exception):
+        self.connection.execute('ROLLBACK' if exception_type is not None else 'COMMIT')
+
+def use_cache(cache: Optional[ResultCache | str]) -> Optional[ResultCache]:
+    '''
+    Activates a result cache for the rest of the process, or deactivates caching with None. Use a ResultCache as a context manager to cache only a block.
+
+    Args:
+        cache (ResultCache | str): The cache, or the path of its database file.
+
+    Returns:
+        ResultCache: The active cache.
+    '''
+    global ACTIVE
+    cache = ResultCache(cache) if isinstance(cache, str) else cache
+    with _active_lock:
+        ACTIVE = cache
+    return cache
+
+def memoized(function: Callable) -> Callable:
+    'Caches the results of a function in the active ResultCache, if there is one.'
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        cache = ACTIVE
+        if cache is None:
+            return function(*args, **kwargs)
+        return cache.call(function, *args, **kwargs)
+    return wrapper
+
+@functools.lru_cache(maxsize = None)
+def _signature(function: Callable) -> 'inspect.Signature':
+    import inspect
+    return inspect.signature(function)
+
+def _canonical(value: Any) -> Any:
+    '''
+    A plain, hashable form of an argument that is the same in every process, as REGISTRY indexes and object ids are not.
+
+    Raises:
+        TypeError: If the value cannot be keyed, such as a function.
+    '''
+    from MindustryTools.MindustryObject import Building
+    from MindustryTools.Factories import FactoryGroup
+    import MindustryTools.Materials as M
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, M.Material):
+        return ('material', value.id)
+    if isinstance(value, Building):
+        return ('building', type(value).__name__, value.id, tuple((name, getattr(value, name)) for name in value._variant_fields))
+    if isinstance(value, FactoryGroup):
+        return ('group', type(value).__name__, # In order, as the order of a group can break ties in the iterative solver
+                tuple((_canonical(factory), count) for factory, count in value.factories.items()),
+                tuple((_canonical(material), rate) for material, rate in value.IOMap.items()))
+    if isinstance(value, dict):
+        return ('dict', tuple(sorted(((_canonical(key), _canonical(item)) for key, item in value.items()), key = repr)))
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = [_canonical(item) for item in value]
+        return (type(value).__name__, tuple(sorted(items, key = repr) if isinstance(value, (set, frozenset)) else items))
+    raise TypeError(f"Cannot key {type(value).__name__} arguments")
@@ -0,0 +1,338 @@
+import json
+import marshal
+import os
+import sys
+import threading
+import zlib
+from dataclasses import fields, MISSING
+from typing import Dict, List, Optional
+
+from MindustryTools.MindustryObject import Building, MindustryException, REGISTRY, VARIANTS
+import MindustryTools.Materials as M
+from MindustryTools.Factories import Factory
+from MindustryTools.Collectors import Collector, Drill, Pump
+from MindustryTools.Graphs import RecipeGraph
+
+DATA_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+DEFAULT_CATALOG = 'serpulo'
+CACHE_FORMAT = 1 # Change whenever the compiled form changes, so that old caches are ignored
+
+BASES = {'Factory': Factory, 'Collector': Collector, 'Drill': Drill, 'Pump': Pump}
+MATERIAL_FIELDS = ('inputs', 'outputs') # Fields keyed by material
+BUILT_IN_MATERIALS = {'POWER': M.POWER} # Every catalog can use these without defining them
+
+_catalogs = {} # path: Catalog
+_default = None
+_lock = threading.Lock()
+_version = [None, None] # The graph version, REGISTRY sizes and sources catalog_version() was last computed for, and the result
+
+class Catalog():
+    '''
+    A set of materials and buildings, such as those of one planet or mod, loaded from a JSON data file. See data/serpulo.json for the format.
+
+    Each building becomes a new subclass of its base (Factory, Collector, Drill or Pump) with the given values as defaults, so no classes need to be written.
+    The generated classes only take keyword arguments, e.g. SurgeSmelter(efficiency = 0.5). Extra class attributes can be given under "attributes".
+    The default catalog is loaded the first time one of its materials or buildings is used, and its names are added to the Materials, Factories and Collectors modules.
+    Other catalogs are only loaded by load_catalog(), and their names are attributes of the catalog:
+
+        >>> erekir = load_catalog('erekir.json')
+        >>> plan = FactoryGroup([erekir.SiliconArcFurnace()]).get_upstream(erekir.default_sources())
+
+    Material and building ids must be unique across all loaded catalogs, as all of them share the REGISTRY.
+
+    Attributes:
+        name (str): The name of the catalog.
+        path (str): The data file the catalog was loaded from.
+        materials (Dict[str, M.Material]): The materials, by key (e.g. 'COPPER'), including POWER.
+        lists (Dict[str, List[M.Material]]): Named lists of materials, such as MATERIALS.
+        classes (Dict[str, type]): The generated building classes, by class name.
+        buildings (Dict[str, Building]): One instance of each building class, by class name. These are the instances used in groups.
+        groups (Dict[str, Dict[int, Building]]): Named groups of buildings by id, such as FACTORIES, GENERATORS, DRILLS and PUMPS.
+        graph (RecipeGraph): The producers and consumers of each material, over the FACTORIES group.
+        sources (Dict[M.Material, List[Factory]]): The factories that produce each material, with the most advanced last. This is graph.producers, so it includes factories registered later.
+    '''
+    def __init__(self, data: dict, path: str, default: bool = False):
+        '''
+        Args:
+            data (dict): The compiled catalog, as returned by _compile().
+            path (str): The data file the catalog was loaded from.
+            default (bool): Whether this is the default catalog, whose classes belong to the modules of their bases. Defaults to False.
+        '''
+        self.name = data['name']
+        self.path = path
+        self.materials = dict(BUILT_IN_MATERIALS)
+        for key, spec in data['materials'].items():
+            self.materials[key] = M.Material(**spec)
+        self.lists = {name: [self.materials[key] for key in keys] for name, keys in data['lists'].items()}
+
+        self.classes = {}
+        self.buildings = {}
+        for name, (base, spec, attributes) in data['buildings'].items():
+            defaults = {key: {self.materials[material]: rate for material, rate in value.items()} if key in MATERIAL_FIELDS else value for key, value in spec.items()}
+            cls = self.classes[name] = _building_class(name, BASES[base], defaults, attributes, BASES[base].__module__ if default else __name__)
+            self.buildings[name] = cls()
+        self.groups = {group: {self.buildings[name].id: self.buildings[name] for name in names} for group, names in data['groups'].items()}
+
+        self.graph = RecipeGraph(self.groups.get('FACTORIES', {}).values())
+        self.sources = self.graph.producers
+
+    def register_factory(self, factory: Factory):
+        '''
+        Add a factory to the catalog, as if it were in the data file. It joins FACTORIES (and GENERATORS, if it generates power), and becomes the default source of what it produces.
+        A factory with the same id as an existing one replaces it.
+
+        Args:
+            factory (Factory): The factory to add.
+        '''
+        self.groups.setdefault('FACTORIES', {})[factory.id] = factory
+        if factory.power > 0:
+            self.groups.setdefault('GENERATORS', {})[factory.id] = factory
+        self.graph.register_factory(factory)
+
+    def default_sources(self) -> Dict[M.Material, Factory]:
+        'The most advanced source of each material, to pass to get_upstream().'
+        return {material: factories[-1] for material, factories in self.sources.items() if factories}
+
+    def exports(self) -> Dict[str, Dict[str, object]]:
+        '''
+        The names this catalog defines, grouped by the module they belong to: materials and material lists in Materials, and buildings and building groups in the module of their base.
+
+        Returns:
+            Dict[str, Dict[str, object]]: The names and values for each module name.
+        '''
+        modules = {name: {} for name in (M.__name__, Factory.__module__, Collector.__module__)}
+        modules[M.__name__].update(self.materials)
+        modules[M.__name__].update(self.lists)
+        for name, cls in self.classes.items():
+            modules[_base(cls).__module__][name] = cls
+        for group, buildings in self.groups.items():
+            module = _base(type(next(iter(buildings.values())))).__module__ if buildings else Factory.__module__
+            modules[module][group] = buildings
+        modules[Factory.__module__]['SOURCES'] = self.sources
+        return modules
+
+    def __getattr__(self, name):
+        for names in (self.materials, self.lists, self.classes, self.groups):
+            if name in names:
+                return names[name]
+        if name == 'SOURCES':
+            return self.sources
+        raise AttributeError(f"Catalog '{self.name}' has no material or building named '{name}'")
+
+    def __repr__(self):
+        return f"Catalog('{self.name}', {len(self.materials)} materials, {len(self.buildings)} buildings)"
+
+def load_catalog(catalog: str = DEFAULT_CATALOG, cache: bool = True) -> Catalog:
+    '''
+    Load a catalog of materials and buildings. Each file is only loaded once per process.
+
+    The first load compiles the file and caches the result in a __pycache__ directory next to it, which later processes load directly.
+    The cache is rebuilt whenever the file changes, and is skipped if the directory is not writable.
+
+    Args:
+        catalog (str): The name of a catalog shipped with the package (such as 'serpulo'), or the path to a JSON data file. Defaults to the default catalog.
+        cache (bool): Whether to read and write the compiled cache. Defaults to True.
+
+    Returns:
+        Catalog: The loaded catalog.
+
+    Raises:
+        MindustryException: If the data file is invalid.
+    '''
+    path = _path(catalog)
+    result = _catalogs.get(path)
+    if result is None:
+        if path == _path(DEFAULT_CATALOG):
+            return default_catalog()
+        result = _catalogs[path] = Catalog(_read(path, cache), path)
+    return result
+
+def default_catalog() -> Catalog:
+    '''
+    Load the default catalog, and add its names to the Materials, Factories, Collectors and MindustryTools modules.
+    This happens automatically the first time one of its materials or buildings is used.
+
+    Returns:
+        Catalog: The default catalog.
+    '''
+    global _default
+    if _default is None:
+        with _lock:
+            if _default is None:
+                path = _path(DEFAULT_CATALOG)
+                catalog = _catalogs[path] = Catalog(_read(path, True), path, default = True)
+                package = sys.modules.get(__package__)
+                for module, names in catalog.exports().items():
+                    vars(sys.modules[module]).update(names)
+                    if package is not None:
+                        for name, value in names.items():
+                            vars(package).setdefault(name, value)
+                _default = catalog
+    return _default
+
+def catalog_version() -> int:
+    '''
+    A fingerprint of the materials and buildings of the default catalog, including registered factories and the sources of each material (also if SOURCES is edited directly), which is the same in every process that loads the same catalog.
+    Stored plans, cached results and cached solver models are only used with the catalog they were made with, as their rates would not match any other.
+
+    Returns:
+        int: The fingerprint, as an unsigned 32-bit integer.
+    '''
+    catalog = default_catalog()
+    # SOURCES can also be edited directly, without changing the graph version, so the number and default of each material's sources are part of the key
+    key = (catalog.graph.version, len(REGISTRY.buildings), len(REGISTRY.materials), tuple((len(factories), factories[-1].index if factories else None) for factories in catalog.sources.values()))
+    if _version[0] != key:
+        buildings = {building.id: building for building in (*catalog.buildings.values(), *catalog.graph.factories.values())}
+        described = [[material.id, material.name] for material in catalog.materials.values()]
+        described += [_describe(building) for building in buildings.values()]
+        described.append([[material.id, [_describe(factory) for factory in factories]] for material, factories in catalog.sources.items()]) # The order of the sources decides the default one
+        _version[:] = key, zlib.crc32(json.dumps(described, sort_keys = True, default = str).encode())
+    return _version[1]
+
+def _describe(building: Building) -> list:
+    'The fields of a building that plans depend on, for catalog_version().'
+    entry = [building.id, building.name, building.power, building.size]
+    if isinstance(building, Factory):
+        entry += [sorted([str(material.id), rate] for material, rate in building.inputs.items()), sorted([str(material.id), rate] for material, rate in building.outputs.items())]
+    return entry
+
+def register_factory(factory: Factory):
+    '''
+    Add a custom factory to the default catalog, so that get_upstream() and the solvers use it by default. See Catalog.register_factory().
+
+    Args:
+        factory (Factory): The factory to add.
+    '''
+    default_catalog().register_factory(factory)
+
+def _path(catalog: str) -> str:
+    if os.sep not in catalog and '/' not in catalog and not catalog.endswith('.json'):
+        catalog = os.path.join(DATA_DIRECTORY, catalog + '.json')
+    return os.path.abspath(catalog)
+
+def _base(cls: type) -> type:
+    'The base of a generated building class.'
+    return next(base for base in cls.__mro__ if base in BASES.values())
+
+def _building_class(name: str, base: type, defaults: dict, attributes: dict, module: str) -> type:
+    '''
+    Create a subclass of base that uses the given defaults for its fields.
+    This is much faster than creating a new dataclass, as the fields, __init__, __repr__ and ordering of the base are reused.
+    '''
+    def __init__(self, **values):
+        base.__init__(self, **{**defaults, **values})
+    __init__.__qualname__ = f'{name}.__init__'
+    variant_defaults = {field.name: defaults.get(field.name, field.default) for field in fields(base) if field.name in base._variant_fields}
+    namespace = {'__module__': module, '__qualname__': name, '__init__': __init__, '__doc__': f'{defaults["name"]}. See {base.__name__}.',
+                 '_default_id': defaults['id'], '_variant_defaults': tuple(variant_defaults[name] for name in base._variant_fields), **attributes}
+    return _BuildingClass(name, (base,), namespace)
+
+class _BuildingClass(type):
+    '''
+    The type of generated building classes. Calling one with at most its variant fields, e.g. SurgeSmelter(efficiency = 0.5), returns the shared variant if it has been built before (see Building.variant()),
+    so building the same variant in a loop does not create and scale new rates each time. Unpickling and copying do not call the class, so always create new instances.
+    '''
+    def __call__(cls, **values):
+        if not values.keys() <= set(cls._variant_fields):
+            return super().__call__(**values)
+        key = (cls, cls._default_id, tuple(values.get(name, default) for name, default in zip(cls._variant_fields, cls._variant_defaults)))
+        instance = VARIANTS.get(key)
+        if instance is None:
+            instance = VARIANTS.setdefault(key, super().__call__(**values))
+        return instance
+
+def _read(path: str, cache: bool) -> dict:
+    'Read a compiled catalog from the cache, or compile the data file and cache it.'
+    try:
+        stat = os.stat(path)
+    except OSError:
+        raise MindustryException(f"No catalog found at '{path}'")
+    stamp = (CACHE_FORMAT, stat.st_mtime_ns, stat.st_size)
+    cache_path = os.path.join(os.path.dirname(path), '__pycache__', os.path.basename(path) + '.marshal')
+    if cache:
+        try:
+            with open(cache_path, 'rb') as file:
+                cached_stamp, data = marshal.load(file)
+            if cached_stamp == stamp:
+                return data
+        except (OSError, EOFError, ValueError, TypeError): # Missing, stale or corrupt
+            pass
+
+    with open(path, encoding = 'utf-8') as file:
+        try:
+            data = _compile(json.load(file), path)
+        except json.JSONDecodeError as error:
+            raise MindustryException(f"Catalog '{path}' is not valid JSON: {error}")
+
+    if cache:
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok = True)
+            temporary = f'{cache_path}.{os.getpid()}'
+            with open(temporary, 'wb') as file:
+                marshal.dump((stamp, data), file)
+            os.replace(temporary, cache_path) # Atomic, so other processes never read a partial cache
+        except OSError:
+            pass
+    return data
+
+def _compile(data: dict, path: str) -> dict:
+    '''
+    Check a parsed data file, and reduce it to plain values that marshal can cache, so that loading only has to create the objects.
+
+    Raises:
+        MindustryException: If anything in the data file is invalid.
+    '''
+    def fail(message):
+        raise MindustryException(f"Catalog '{path}': {message}")
+
+    material_fields = {field.name for field in fields(M.Material)} - {'sources', 'source'}
+    materials = {}
+    for key, spec in data.get('materials', {}).items():
+        if key in BUILT_IN_MATERIALS:
+            fail(f"'{key}' is built in, and cannot be redefined.")
+        unknown = set(spec) - material_fields
+        if unknown:
+            fail(f"Material '{key}' has unknown fields {sorted(unknown)}.")
+        if 'id' not in spec or 'name' not in spec:
+            fail(f"Material '{key}' needs an id and a name.")
+        materials[key] = dict(spec)
+    known_materials = set(materials) | set(BUILT_IN_MATERIALS)
+
+    lists = {}
+    for name, keys in data.get('lists', {}).items():
+        for key in keys:
+            if key not in known_materials:
+                fail(f"List '{name}' contains unknown material '{key}'.")
+        lists[name] = list(keys)
+
+    buildings = {}
+    for name, spec in data.get('buildings', {}).items():
+        spec = dict(spec)
+        spec.pop('note', None)
+        base = spec.pop('base', None)
+        if base not in BASES:
+            fail(f"Building '{name}' has base '{base}', which is not one of {list(BASES)}.")
+        attributes = spec.pop('attributes', {})
+        base_fields = {field.name: field for field in fields(BASES[base])}
+        unknown = set(spec) - set(base_fields)
+        if unknown:
+            fail(f"Building '{name}' has unknown fields {sorted(unknown)}. Use 'attributes' for anything else.")
+        for key in MATERIAL_FIELDS:
+            if key in base_fields:
+                spec.setdefault(key, {})
+                for material in spec[key]:
+                    if material not in known_materials:
+                        fail(f"Building '{name}' uses unknown material '{material}'.")
+        missing = [key for key, field in base_fields.items() if key not in spec and field.default is MISSING and field.default_factory is MISSING]
+        if missing:
+            fail(f"Building '{name}' is missing {missing}.")
+        buildings[name] = [base, spec, attributes]
+
+    groups = {}
+    for group, names in data.get('groups', {}).items():
+        for name in names:
+            if name not in buildings:
+                fail(f"Group '{group}' contains unknown building '{name}'.")
+        groups[group] = list(names)
+
+    return {'name': data.get('name', os.path.splitext(os.path.basename(path))[0]), 'materials': materials, 'lists': lists, 'buildings': buildings, 'groups': groups}
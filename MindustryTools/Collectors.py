@@ -36,6 +36,18 @@ class Collector(Building):
             tiles = self.size**2
         return self.base_speed * tiles
 
+    def can_collect(self, material: Material) -> bool:
+        '''
+        Whether the collector can gather a material, so that get_speed() does not raise an exception for it.
+
+        Args:
+            material (Material): The material.
+
+        Returns:
+            bool: True if the material can be collected.
+        '''
+        return material.is_natural
+
     def required_tiles(self, material: Material, target_rate: float) -> float:
         '''
         Get the number of tiles required to achieve a target collection rate.
@@ -71,6 +83,8 @@ class Drill(Collector):
     boost_multiplier: float = 2.56
     boosted: bool = False
 
+    _variant_fields = ('boosted',)
+
     def get_speed(self, material, tiles=None) -> float:
         '''
         Get the speed of the drill.
@@ -83,7 +97,10 @@ class Drill(Collector):
         if material.hardness > self.max_hardness:
             raise MindustryException(f"{material.name} is too hard for this drill.")
 
-        return (60 / (self.base_speed + (50 * material.hardness))) * tiles * (self.water_boost if self.boosted else 1)
+        return (60 / (self.base_speed + (50 * material.hardness))) * tiles * (self.boost_multiplier if self.boosted else 1)
+
+    def can_collect(self, material: Material) -> bool:
+        return material.is_natural and not material.is_liquid and material.hardness is not None and material.hardness <= self.max_hardness
 
 
 @dataclass(frozen=True)
@@ -99,74 +116,21 @@ class Pump(Collector):
         if not material.is_liquid:
             raise MindustryException(f"{material.name} is not a liquid.")
         return super().get_speed(material=material, tiles=tiles)
-    
-
-# DRILLS
-@dataclass(frozen=True)
-class MechanicalDrill(Drill):
-    id: int = 201
-    name: str = 'Mechanical Drill'
-    power: int = 0
-    size: int = 2
-    max_hardness: int = 2
-    base_speed: float = 600.0
-    water_intake: float = 3.0
-
-@dataclass(frozen=True)
-class PneumaticDrill(Drill):
-    id: int = 202
-    name: str = 'Pneumatic Drill'
-    power: int = 0
-    size: int = 2
-    max_hardness: int = 3
-    base_speed: float = 400.0
-    water_intake: float = 3.6
 
-@dataclass(frozen=True)
-class LaserDrill(Drill):
-    id: int = 203
-    name: str = 'Laser Drill'
-    power: int = -60
-    size: int = 3
-    max_hardness: int = 4
-    base_speed: float = 280.0
-    water_intake: float = 4.8
-
-@dataclass(frozen=True)
-class AirblastDrill(Drill):
-    id: int = 204
-    name: str = 'Airblast Drill'
-    power: int = -60
-    size: int = 4
-    max_hardness: int = 4
-    base_speed: float = 280.0
-    water_intake: int = 3
-    water_boost: float = 3.24
-
-#PUMPS
-@dataclass(frozen=True)
-class MechanicalPump(Pump):
-    id: int = 401
-    name: str = 'Mechanical Pump'
-    power: int = 0
-    size: int = 1
-    base_speed: float = 7.0
-
-@dataclass(frozen=True)
-class RotaryPump(Pump):
-    id: int = 402
-    name:str = 'Rotary Pump'
-    power: int = -18
-    size: int = 2
-    base_speed: float = 12.2
+    def can_collect(self, material: Material) -> bool:
+        return material.is_natural and material.is_liquid
+    
 
-@dataclass(frozen=True)
-class ImpulsePump(Pump):
-    id: int = 403
-    name: str = 'Impulse Pump'
-    power: int = -78
-    size: int = 3
-    base_speed: float = 13.2
-
-DRILLS = {collector.id: collector for collector in [MechanicalDrill(), PneumaticDrill(), LaserDrill(), AirblastDrill()]}
-PUMPS = {collector.id: collector for collector in [MechanicalPump(), RotaryPump(), ImpulsePump()]}
+def __getattr__(name: str):
+    # Loads the default catalog the first time one of its drills, pumps, DRILLS or PUMPS is used. See Catalog.py.
+    if name == '__all__': # Asked for by from MindustryTools.Collectors import *, which does not otherwise see the catalog's names
+        from MindustryTools.Catalog import default_catalog
+        default_catalog()
+        return [key for key in globals() if not key.startswith('_')]
+    if name.startswith('__'):
+        raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+    from MindustryTools.Catalog import default_catalog
+    names = default_catalog().exports()[__name__]
+    if name in names:
+        return names[name]
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
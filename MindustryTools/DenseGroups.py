@@ -0,0 +1,720 @@
+from typing import Dict, Iterable, Optional, List
+from math import ceil, inf
+from heapq import heappush, heappop
+from itertools import count
+
+import numpy as np
+
+from MindustryTools.MindustryObject import MindustryException, REGISTRY
+from MindustryTools.Factories import Factory, FactoryGroup, _check_supply, _rates
+from MindustryTools.Solvers import get_model, plan_integer
+import MindustryTools.Materials as M
+import MindustryTools.Tracing as Tracing
+
+# Vectors are indexed by the REGISTRY, so every material and building has a fixed position
+MATERIAL_INDEX = REGISTRY.materials
+BUILDING_INDEX = REGISTRY.buildings
+SMALL = 16 # Below this many entries, adding and dividing element by element is faster than NumPy's fancy indexing
+
+def _fit(array: np.ndarray, size: int, fill=0) -> np.ndarray:
+    'Pads a vector to the current size of its index.'
+    if len(array) >= size:
+        return array
+    return np.concatenate([array, np.full(size - len(array), fill, dtype=array.dtype)])
+
+def _positions(order: Dict[int, object]) -> np.ndarray:
+    'The positions of the entries of a group, in the order they were added.'
+    return np.fromiter(order, dtype=np.intp, count=len(order))
+
+class DenseFactoryGroup(FactoryGroup):
+    '''
+    A FactoryGroup backed by NumPy vectors instead of dictionaries. It supports the same initialization, operators and functions as FactoryGroup, and prints identically.
+    The IOMap and factories attributes are still available as dictionaries, but are built on access; use rates and counts directly in performance sensitive code.
+
+    ATTRIBUTES:
+        rates (np.ndarray): The rate of each material, by REGISTRY index, in materials / second. Positive values are outputs, negative values are inputs.
+        counts (np.ndarray): The count of each factory, by REGISTRY index.
+
+    Entries keep track of the order they were added in, the object they were added with, and whether they are whole numbers, so that printing matches a regular FactoryGroup.
+    '''
+    _dtype = float # The type of the rates and counts vectors
+
+    def __init__(self, factories: Dict[Factory, float] | List[Factory] = None, *, materials: Optional[Dict[M.Material, float]] | List[M.Material] = None, factory_group: Optional[FactoryGroup] = None):
+        if type(factory_group) is type(self):
+            factory_group._fit()
+            self.rates = factory_group.rates.copy()
+            self.counts = factory_group.counts.copy()
+            self._integral_rates = factory_group._integral_rates.copy()
+            self._integral_counts = factory_group._integral_counts.copy()
+            self._material_order = factory_group._material_order.copy()
+            self._factory_order = factory_group._factory_order.copy()
+        else:
+            self.rates = np.zeros(len(MATERIAL_INDEX), dtype=self._dtype)
+            self.counts = np.zeros(len(BUILDING_INDEX), dtype=self._dtype)
+            self._integral_rates = np.ones(len(MATERIAL_INDEX), dtype=bool)
+            self._integral_counts = np.ones(len(BUILDING_INDEX), dtype=bool)
+            self._material_order = {}
+            self._factory_order = {}
+            if factory_group is not None:
+                for factory, count in factory_group.factories.items():
+                    self._add_count(factory, count)
+                for material, rate in factory_group.IOMap.items():
+                    self._add_rate(material, rate)
+
+        if isinstance(factories, list):
+            factories = {factory: 1 for factory in factories}
+        if isinstance(materials, list):
+            materials = {material: 1 for material in materials}
+
+        if factories is not None:
+            for factory, count in factories.items():
+                self._add_factory(factory, count)
+        if materials is not None:
+            for material, rate in materials.items():
+                self._add_rate(material, rate)
+
+    def _fit(self):
+        'Grows the vectors if new materials or factories have been indexed since they were created.'
+        if len(self.rates) < len(MATERIAL_INDEX):
+            self.rates = _fit(self.rates, len(MATERIAL_INDEX))
+            self._integral_rates = _fit(self._integral_rates, len(MATERIAL_INDEX), True)
+        if len(self.counts) < len(BUILDING_INDEX):
+            self.counts = _fit(self.counts, len(BUILDING_INDEX))
+            self._integral_counts = _fit(self._integral_counts, len(BUILDING_INDEX), True)
+
+    def _add_count(self, factory: Factory, count: float):
+        position = factory.index
+        self._fit()
+        self.counts[position] += count
+        self._integral_counts[position] &= isinstance(count, int)
+        self._factory_order.setdefault(position, factory)
+
+    def _add_rate(self, material: M.Material, rate: float):
+        position = material.index
+        self._fit()
+        self.rates[position] += rate
+        self._integral_rates[position] &= isinstance(rate, int)
+        self._material_order.setdefault(position, material)
+
+    def _add_factory(self, factory: Factory, count: float):
+        'Adds a count of a factory, with its inputs, outputs and power.'
+        self._add_count(factory, count)
+        for material, rate in factory.outputs.items():
+            self._add_rate(material, count * rate)
+        for material, rate in factory.inputs.items():
+            self._add_rate(material, -count * rate)
+        self._add_rate(M.POWER, count * factory.power)
+
+    def _accumulate(self, other: 'DenseFactoryGroup', scale: float = 1, prune: bool = True) -> 'DenseFactoryGroup':
+        '''
+        Adds scale * other to this group in place, dropping any material the addition brings to zero if prune is set.
+        This fuses the scaling and the addition, so neither allocates a new group.
+        '''
+        other = self._as_dense(other)
+        self._fit()
+        other._fit()
+        return self._accumulate_at(other, _positions(other._factory_order), _positions(other._material_order), scale, prune)
+
+    def _accumulate_at(self, other: 'DenseFactoryGroup', factories: np.ndarray, materials: np.ndarray, scale: float = 1, prune: bool = True) -> 'DenseFactoryGroup':
+        "As _accumulate(), given the positions of the factories and materials of other, whose vectors must be the same size as this group's."
+        integral = isinstance(scale, int)
+        if len(factories) + len(materials) < SMALL:
+            counts, rates = self.counts, self.rates
+            for position, factory in other._factory_order.items():
+                counts[position] += scale * other.counts.item(position)
+                if not (integral and other._integral_counts.item(position)):
+                    self._integral_counts[position] = False
+                self._factory_order.setdefault(position, factory)
+            for position, material in other._material_order.items():
+                rate = rates.item(position) + scale * other.rates.item(position)
+                if prune and rate < 0.0001 and rate > -0.0001: # If is zero
+                    rates[position] = 0
+                    self._integral_rates[position] = True
+                    self._material_order.pop(position, None)
+                    continue
+                rates[position] = rate
+                if not (integral and other._integral_rates.item(position)):
+                    self._integral_rates[position] = False
+                self._material_order.setdefault(position, material)
+            return self
+
+        positions = factories
+        self.counts[positions] += scale * other.counts[positions]
+        self._integral_counts[positions] &= other._integral_counts[positions] & integral
+        for position, factory in other._factory_order.items():
+            self._factory_order.setdefault(position, factory)
+
+        positions = materials
+        self.rates[positions] += scale * other.rates[positions]
+        self._integral_rates[positions] &= other._integral_rates[positions] & integral
+        for position, material in other._material_order.items():
+            self._material_order.setdefault(position, material)
+        if prune:
+            for position in positions[np.abs(self.rates[positions]) < 0.0001]: # If is zero
+                self.rates[position] = 0
+                self._integral_rates[position] = True
+                del self._material_order[position]
+        return self
+
+    def _combine(self, other: 'DenseFactoryGroup', scale: float = 1) -> 'DenseFactoryGroup':
+        'Returns self + scale * other, dropping any material the addition brings to zero.'
+        return type(self)(factory_group = self)._accumulate(other, scale)
+
+    @classmethod
+    def _as_dense(cls, other) -> 'DenseFactoryGroup':
+        'Converts factories, materials and factory groups to this class, or returns None.'
+        if type(other) is cls:
+            return other
+        if isinstance(other, FactoryGroup):
+            return cls(factory_group = other)
+        if isinstance(other, Factory):
+            return cls(factories = [other])
+        if isinstance(other, M.Material):
+            return cls(materials = [other])
+        return None
+
+    @property
+    def IOMap(self) -> Dict[M.Material, float]:
+        return {material: int(self.rates[position]) if self._integral_rates[position] else float(self.rates[position]) for position, material in self._material_order.items()}
+
+    @IOMap.setter
+    def IOMap(self, IOMap: Dict[M.Material, float]):
+        self.rates = np.zeros(len(MATERIAL_INDEX), dtype=self._dtype)
+        self._integral_rates = np.ones(len(MATERIAL_INDEX), dtype=bool)
+        self._material_order = {}
+        for material, rate in IOMap.items():
+            self._add_rate(material, rate)
+
+    @property
+    def factories(self) -> Dict[Factory, float]:
+        return {factory: int(self.counts[position]) if self._integral_counts[position] else float(self.counts[position]) for position, factory in self._factory_order.items()}
+
+    @factories.setter
+    def factories(self, factories: Dict[Factory, float]):
+        self.counts = np.zeros(len(BUILDING_INDEX), dtype=self._dtype)
+        self._integral_counts = np.ones(len(BUILDING_INDEX), dtype=bool)
+        self._factory_order = {}
+        for factory, count in factories.items():
+            self._add_count(factory, count)
+
+    def __add__(self, other):
+        if isinstance(other, (Factory, M.Material, FactoryGroup)):
+            return self._combine(self._as_dense(other))
+        return NotImplemented
+
+    def __iadd__(self, other):
+        if isinstance(other, (Factory, M.Material, FactoryGroup)):
+            return self._accumulate(self._as_dense(other))
+        return NotImplemented
+
+    def __sub__(self, other):
+        if isinstance(other, (Factory, M.Material, FactoryGroup)):
+            return self._combine(self._as_dense(other), -1)
+        return NotImplemented
+
+    def __isub__(self, other):
+        if isinstance(other, (Factory, M.Material, FactoryGroup)):
+            return self._accumulate(self._as_dense(other), -1)
+        return NotImplemented
+
+    def __mul__(self, other):
+        if isinstance(other, int) or isinstance(other, float):
+            return type(self)(factory_group = self).__imul__(other)
+        return NotImplemented
+
+    def __imul__(self, other):
+        if isinstance(other, int) or isinstance(other, float):
+            self.counts *= other
+            self.rates *= other
+            if not isinstance(other, int):
+                self._integral_counts[:] = False
+                self._integral_rates[:] = False
+            return self
+        return NotImplemented
+
+    def __matmul__(self, other):
+        '''
+        Combines two factories / factory groups.
+        The second entity is scaled such that its output material rate matches the first entity's input rate for the corresponding material.
+        If there are multiple shared materials, the second entity is scaled by the largest ratio (to ensure all materials are supplied).
+
+        If there are no shared materials, the second entity is ignored.
+        '''
+        if isinstance(other, Factory) or isinstance(other, FactoryGroup):
+            other = self._as_dense(other)
+            try:
+                return self._combine(other, self / other)
+            except MindustryException:
+                return self
+        return NotImplemented
+
+    def __rmatmul__(self, other):
+        'Reverses the @ operator'
+        if isinstance(other, Factory):
+            return type(self)(factories = [other]).__matmul__(self)
+        return NotImplemented
+
+    def __imatmul__(self, other):
+        'Combines another factory / factory group into this one in place. See __matmul__.'
+        if isinstance(other, Factory) or isinstance(other, FactoryGroup):
+            other = self._as_dense(other)
+            try:
+                self._accumulate(other, self / other)
+            except MindustryException:
+                return self
+            self._settle(other, np.flatnonzero(other.rates > 0))
+            return self
+        return NotImplemented
+
+    def __truediv__(self, other):
+        '''
+        If "other" is a FactoryGroup, returns the number of "other" factory groups required to supply this factory group.
+        Dividing factories with no shared inputs/outputs will result in an error.
+
+        If "other" is a number, scales the factory group by that amount (equivalent to multiplying by 1/other).
+        '''
+        if isinstance(other, int) or isinstance(other, float):
+            return self.__mul__(1/other)
+        dense = self._as_dense(other)
+        if dense is None:
+            return NotImplemented
+        self._fit()
+        dense._fit()
+        return self._ratio_at(dense, np.flatnonzero(dense.rates > 0))
+
+    def _ratio_at(self, other: 'DenseFactoryGroup', outputs: np.ndarray) -> float:
+        "As self / other, given the positions of the outputs of other, whose vectors must be the same size as this group's."
+        if len(outputs) < SMALL:
+            ratios = [-self.rates.item(position) / other.rates.item(position) for position in outputs.tolist() if self.rates.item(position) < 0]
+            if not ratios:
+                raise MindustryException(f"Cannot divide {self} by {other}; entity 1 produces none of entity 2's inputs.")
+            return max(ratios)
+        shared = outputs[self.rates[outputs] < 0]
+        if not len(shared):
+            raise MindustryException(f"Cannot divide {self} by {other}; entity 1 produces none of entity 2's inputs.")
+        return float(np.max(-self.rates[shared] / other.rates[shared]))
+
+    def _settle(self, other: 'DenseFactoryGroup', outputs: np.ndarray):
+        'Called after other has been added to supply this group, given the positions of its outputs. Rates are only approximate here, so there is nothing to do.'
+
+    def _inputs(self) -> Dict[M.Material, float]:
+        'The materials with a negative rate, in the order they were added, as in FactoryGroup.'
+        return {material: rate for material, rate in self.IOMap.items() if rate < 0}
+
+    def _outputs(self) -> Dict[M.Material, float]:
+        'The materials with a positive rate, in the order they were added, as in FactoryGroup.'
+        return {material: rate for material, rate in self.IOMap.items() if rate > 0}
+
+    def _supply(self, materials: Iterable[M.Material], sources: Dict[M.Material, Factory], rounded: bool | List[Factory] = False, added: Optional[Dict[Factory, float]] = None) -> 'DenseFactoryGroup':
+        '''
+        The iterative solver of get_upstream(). See FactoryGroup._supply().
+        Reads each rate from the rates vector by its REGISTRY index, instead of building the IOMap, and converts each source to this class once, instead of at every step.
+        '''
+        tracer = Tracing.ACTIVE.get()
+        rounded = [] if not rounded else rounded
+        unsupplied = {material for material, source in sources.items() if source is None}
+        from MindustryTools.Catalog import default_catalog
+        catalog = default_catalog()
+        catalog_sources = catalog.sources
+        graph = catalog.graph.including(source for source in sources.values() if isinstance(source, Factory))
+        converted = {} # Each source as this class, with the positions of its factories, materials and outputs
+        self._fit()
+
+        queued = count()
+        pending = []
+        def enqueue(materials):
+            for material in materials:
+                rank = graph.rank(material)
+                heappush(pending, (inf if rank is None else rank, -next(queued), material))
+        enqueue(materials)
+
+        steps = 0
+        while pending:
+            material = heappop(pending)[2]
+            if material.index not in self._material_order or not self._needs_supply(self.rates[material.index]) or not (material in sources or not material.is_natural) or material in unsupplied:
+                continue
+            if tracer is not None:
+                tracer.count('iterations')
+                start = tracer.now()
+            if material in sources:
+                source = sources[material]
+            elif material in catalog_sources:
+                source = catalog_sources[material][-1]
+            else:
+                raise MindustryException(f"No source found for {material.name}")
+            entry = converted.get(source)
+            if entry is None:
+                dense = self._as_dense(source)
+                dense._fit()
+                entry = converted[source] = (dense, _positions(dense._factory_order), _positions(dense._material_order), np.flatnonzero(dense.rates > 0))
+            dense, factory_positions, material_positions, outputs = entry
+
+            try:
+                ratio = self._ratio_at(dense, outputs)
+            except MindustryException:
+                unsupplied.add(material)
+                if tracer is not None:
+                    tracer.event('iteration', start, material = material, source = source, ratio = None, iomap_size = len(self._material_order))
+                continue
+            steps += 1
+            _check_supply(material, ratio, steps)
+            if rounded is True or source in rounded:
+                ratio = ceil(ratio)
+            self._accumulate_at(dense, factory_positions, material_positions, ratio)
+            self._settle(dense, outputs)
+            if added is not None:
+                added[source] = added.get(source, 0) + ratio
+            enqueue(source.IOMap if isinstance(source, FactoryGroup) else _rates(source))
+            if tracer is not None:
+                tracer.event('iteration', start, material = material, source = source, ratio = ratio, iomap_size = len(self._material_order))
+        return self
+
+    def to_factory_group(self) -> FactoryGroup:
+        '''
+        Converts this group to a regular, dictionary based FactoryGroup.
+
+        Returns:
+            FactoryGroup: A group with the same factories and rates.
+        '''
+        return FactoryGroup(factory_group = self)
+
+class FixedPointFactoryGroup(DenseFactoryGroup):
+    '''
+    A DenseFactoryGroup that stores rates and counts as exact integers in int64 vectors, so that adding, subtracting and scaling never drift, and zero means exactly zero.
+    get_upstream() then only supplies real deficits, instead of chasing rounding error within a tolerance.
+
+    Rates are whole items per TICKS game ticks (60 ticks are one second, so TICKS is 1000 hours), and counts are whole thousandths of a building (PARTS).
+    The rates of a single building are rounded to whole items per hour when it is added, so any number of thousandths of it still makes a whole number of items.
+    The rounding is less than 0.0003 items / second per building, which is far below the precision of the catalog's rates.
+
+    Dividing by another group gives the nearest number of thousandths needed. When @ and get_upstream() add a group to supply this one, what is left within half a thousandth of it is only that rounding, and is dropped.
+    Scaling by a whole number is exact, and so is scaling a building by a whole number of thousandths, as @ and get_upstream() do. Any other scaling rounds to the nearest unit.
+    The IOMap and factories attributes convert back to materials / second and buildings, as ints or floats wherever a FactoryGroup would have them.
+
+    ATTRIBUTES:
+        rates (np.ndarray): The rate of each material, by REGISTRY index, in items per TICKS ticks. Positive values are outputs, negative values are inputs.
+        counts (np.ndarray): The count of each factory, by REGISTRY index, in thousandths of a building.
+    '''
+    _dtype = np.int64
+    TICKS = 60 * 60 * 60 * 1000 # Ticks in the period rates are measured over: 1000 hours
+    PARTS = 1000 # Counts are in thousandths of a building
+    UNIT = TICKS // 60 # Rate units in one item / second
+
+    def _add_count(self, factory: Factory, count: float):
+        super()._add_count(factory, round(count * self.PARTS))
+        self._integral_counts[factory.index] &= isinstance(count, int)
+
+    def _add_rate(self, material: M.Material, rate: float):
+        super()._add_rate(material, round(rate * self.UNIT))
+        self._integral_rates[material.index] &= isinstance(rate, int)
+
+    def _add_factory(self, factory: Factory, count: float):
+        parts = round(count * self.PARTS)
+        super()._add_count(factory, parts)
+        self._integral_counts[factory.index] &= isinstance(count, int)
+        for material, rate in _rates(factory).items():
+            super()._add_rate(material, parts * round(rate * self.UNIT / self.PARTS))
+            self._integral_rates[material.index] &= isinstance(count, int) and isinstance(rate, int)
+
+    def _scaled(self, values: np.ndarray, scale: float) -> np.ndarray:
+        'Values times a scale, in integer arithmetic if the scale is a whole number of thousandths, and otherwise rounded to the nearest unit.'
+        if isinstance(scale, (int, np.integer)):
+            return values * scale
+        parts = scale * self.PARTS
+        if parts == round(parts):
+            return (values * round(parts) + self.PARTS // 2) // self.PARTS # Exact when the values are whole thousandths of a building
+        return np.rint(values * scale).astype(np.int64)
+
+    def _scaled_value(self, value: int, scale: float) -> int:
+        'One value times a scale, as _scaled() does for a vector.'
+        if isinstance(scale, (int, np.integer)):
+            return value * scale
+        parts = scale * self.PARTS
+        if parts == round(parts):
+            return (value * round(parts) + self.PARTS // 2) // self.PARTS
+        return round(value * scale)
+
+    def _accumulate(self, other: 'FixedPointFactoryGroup', scale: float = 1, prune: bool = True) -> 'FixedPointFactoryGroup':
+        'Adds scale * other to this group in place, dropping any material the addition brings to exactly zero if prune is set.'
+        other = self._as_dense(other)
+        self._fit()
+        other._fit()
+        return self._accumulate_at(other, _positions(other._factory_order), _positions(other._material_order), scale, prune)
+
+    def _accumulate_at(self, other: 'FixedPointFactoryGroup', factories: np.ndarray, materials: np.ndarray, scale: float = 1, prune: bool = True) -> 'FixedPointFactoryGroup':
+        integral = isinstance(scale, int)
+        if len(factories) + len(materials) < SMALL:
+            counts, rates = self.counts, self.rates
+            for position, factory in other._factory_order.items():
+                counts[position] += self._scaled_value(other.counts.item(position), scale)
+                if not (integral and other._integral_counts.item(position)):
+                    self._integral_counts[position] = False
+                self._factory_order.setdefault(position, factory)
+            for position, material in other._material_order.items():
+                rate = rates.item(position) + self._scaled_value(other.rates.item(position), scale)
+                rates[position] = rate
+                if prune and rate == 0:
+                    self._integral_rates[position] = True
+                    self._material_order.pop(position, None)
+                    continue
+                if not (integral and other._integral_rates.item(position)):
+                    self._integral_rates[position] = False
+                self._material_order.setdefault(position, material)
+            return self
+
+        positions = factories
+        self.counts[positions] += self._scaled(other.counts[positions], scale)
+        self._integral_counts[positions] &= other._integral_counts[positions] & integral
+        for position, factory in other._factory_order.items():
+            self._factory_order.setdefault(position, factory)
+
+        positions = materials
+        self.rates[positions] += self._scaled(other.rates[positions], scale)
+        self._integral_rates[positions] &= other._integral_rates[positions] & integral
+        for position, material in other._material_order.items():
+            self._material_order.setdefault(position, material)
+        if prune:
+            for position in positions[self.rates[positions] == 0]:
+                self._integral_rates[position] = True
+                del self._material_order[position]
+        return self
+
+    def __imul__(self, other):
+        if isinstance(other, int) or isinstance(other, float):
+            self.counts = self._scaled(self.counts, other)
+            self.rates = self._scaled(self.rates, other)
+            if not isinstance(other, int):
+                self._integral_counts[:] = False
+                self._integral_rates[:] = False
+            return self
+        return NotImplemented
+
+    def __truediv__(self, other):
+        '''
+        If "other" is a FactoryGroup, returns the number of "other" factory groups required to supply this factory group, rounded to the nearest thousandth.
+        Dividing factories with no shared inputs/outputs will result in an error.
+
+        If "other" is a number, scales the factory group by that amount (equivalent to multiplying by 1/other).
+        '''
+        if isinstance(other, int) or isinstance(other, float):
+            return self.__mul__(1/other)
+        fixed = self._as_dense(other)
+        if fixed is None:
+            return NotImplemented
+        self._fit()
+        fixed._fit()
+        return self._ratio_at(fixed, np.flatnonzero(fixed.rates > 0))
+
+    def _ratio_at(self, other: 'FixedPointFactoryGroup', outputs: np.ndarray) -> float:
+        shared = [position for position in outputs.tolist() if self.rates.item(position) < 0]
+        if not shared:
+            raise MindustryException(f"Cannot divide {self} by {other}; entity 1 produces none of entity 2's inputs.")
+        # round(-rate * PARTS / supplied), halves up, with Python integers so that the product cannot overflow
+        parts = max((-2 * self.rates.item(position) * self.PARTS + other.rates.item(position)) // (2 * other.rates.item(position)) for position in shared)
+        return parts / self.PARTS
+
+    def _settle(self, other: 'FixedPointFactoryGroup', outputs: np.ndarray):
+        '''
+        Drops any output of other that is left within half a thousandth of other's rate of it, which is only the rounding of the count of other.
+        Otherwise a deficit too small to supply with a thousandth of a building, or the surplus of rounding up, would stay in the group.
+        '''
+        for position in outputs.tolist():
+            rate = self.rates.item(position)
+            if rate and 2 * self.PARTS * abs(rate) <= other.rates.item(position) and position in self._material_order:
+                self.rates[position] = 0
+                self._integral_rates[position] = True
+                del self._material_order[position]
+
+    def _needs_supply(self, rate: float) -> bool:
+        return rate < 0
+
+    @staticmethod
+    def _value(value: np.integer, unit: int, integral: bool) -> float:
+        'A stored value in regular units, as an int if it was only added and scaled in whole numbers, as in a FactoryGroup.'
+        return int(value) // unit if integral else int(value) / unit
+
+    @property
+    def IOMap(self) -> Dict[M.Material, float]:
+        return {material: self._value(self.rates[position], self.UNIT, self._integral_rates[position]) for position, material in self._material_order.items()}
+
+    @IOMap.setter
+    def IOMap(self, IOMap: Dict[M.Material, float]):
+        DenseFactoryGroup.IOMap.fset(self, IOMap)
+
+    @property
+    def factories(self) -> Dict[Factory, float]:
+        return {factory: self._value(self.counts[position], self.PARTS, self._integral_counts[position]) for position, factory in self._factory_order.items()}
+
+    @factories.setter
+    def factories(self, factories: Dict[Factory, float]):
+        DenseFactoryGroup.factories.fset(self, factories)
+
+class FactoryGroupBatch():
+    '''
+    Many factory groups (plans) stored together as 2-D arrays, so that every plan is operated on in one vectorized call.
+    Plans can be converted to and from individual FactoryGroups with from_groups(), to_groups() and indexing.
+
+    ATTRIBUTES:
+        rates (np.ndarray): The rate of each material, by REGISTRY index (columns), for each plan (rows), in materials / second. Positive values are outputs, negative values are inputs.
+        counts (np.ndarray): The count of each factory, by REGISTRY index (columns), for each plan (rows).
+
+    OPERATORS:
+        These work as they do for FactoryGroup, but apply to every plan. The other operand can be a FactoryGroupBatch with the same number of plans, or a FactoryGroup, Factory or Material, which is applied to every plan.
+        ADDITION (+): FactoryGroupBatch, FactoryGroup, Factory, Material
+        MULTIPLICATION (*): int, float, or an array with one value per plan
+        MATRIX MULTIPLICATION (@): FactoryGroupBatch, FactoryGroup, Factory
+        DIVISION (/): FactoryGroupBatch, FactoryGroup, Factory, Material
+            Returns an array with the ratio for each plan. Plans that share no materials with "other" give NaN instead of raising an error, and are left unchanged by @.
+            If "other" is a number or an array, scales the plans by 1/other.
+    '''
+    def __init__(self, rates: np.ndarray, counts: np.ndarray):
+        self.rates = np.asarray(rates, dtype=float)
+        self.counts = np.asarray(counts, dtype=float)
+        self._fit()
+
+    @classmethod
+    def from_groups(cls, groups: List[FactoryGroup | Factory]) -> 'FactoryGroupBatch':
+        '''
+        Stacks factory groups into a batch.
+
+        Args:
+            groups (List[FactoryGroup | Factory]): The plans.
+
+        Returns:
+            FactoryGroupBatch: A batch with one plan per group.
+        '''
+        groups = [DenseFactoryGroup._as_dense(group) for group in groups]
+        rates = np.zeros((len(groups), len(MATERIAL_INDEX)))
+        counts = np.zeros((len(groups), len(BUILDING_INDEX)))
+        for plan, group in enumerate(groups):
+            rates[plan, :len(group.rates)] = group.rates
+            counts[plan, :len(group.counts)] = group.counts
+        return cls(rates, counts)
+
+    def to_groups(self) -> List[FactoryGroup]:
+        '''
+        Splits the batch into individual factory groups.
+
+        Returns:
+            List[FactoryGroup]: One factory group per plan.
+        '''
+        return [self[plan] for plan in range(len(self))]
+
+    def __len__(self):
+        return len(self.rates)
+
+    def __getitem__(self, plan: int) -> FactoryGroup:
+        result = FactoryGroup()
+        for position in np.flatnonzero(self.counts[plan]):
+            count = float(self.counts[plan, position])
+            result.factories[BUILDING_INDEX[position]] = int(count) if count.is_integer() else count
+        for position in np.flatnonzero(self.rates[plan]):
+            result.IOMap[MATERIAL_INDEX[position]] = float(self.rates[plan, position])
+        return result
+
+    def __repr__(self):
+        return f'FactoryGroupBatch({len(self)} plans)'
+
+    def _fit(self):
+        'Grows the arrays if new materials or factories have been indexed since they were created.'
+        if self.rates.shape[1] < len(MATERIAL_INDEX):
+            self.rates = np.pad(self.rates, ((0, 0), (0, len(MATERIAL_INDEX) - self.rates.shape[1])))
+        if self.counts.shape[1] < len(BUILDING_INDEX):
+            self.counts = np.pad(self.counts, ((0, 0), (0, len(BUILDING_INDEX) - self.counts.shape[1])))
+
+    def _as_arrays(self, other):
+        'The rates and counts of the other operand, broadcastable against this batch, or None.'
+        if isinstance(other, FactoryGroupBatch):
+            if len(other) != len(self):
+                raise ValueError(f"Cannot combine batches of {len(self)} and {len(other)} plans")
+            other._fit()
+            self._fit()
+            return other.rates, other.counts
+        dense = DenseFactoryGroup._as_dense(other)
+        if dense is None:
+            return None
+        dense._fit()
+        self._fit()
+        return dense.rates[None, :], dense.counts[None, :]
+
+    def _combine(self, rates: np.ndarray, counts: np.ndarray, scale = 1) -> 'FactoryGroupBatch':
+        'Returns self + scale * other, dropping any material the addition brings to zero.'
+        scale = np.asarray(scale, dtype=float).reshape(-1, 1)
+        result = FactoryGroupBatch(self.rates + scale * rates, self.counts + scale * counts)
+        result.rates[np.abs(result.rates) < 0.0001] = 0 # If is zero
+        return result
+
+    def __add__(self, other):
+        arrays = self._as_arrays(other)
+        if arrays is None:
+            return NotImplemented
+        return self._combine(*arrays)
+
+    def __radd__(self, other):
+        return self.__add__(other)
+
+    def __mul__(self, other):
+        if isinstance(other, int) or isinstance(other, float) or isinstance(other, np.ndarray):
+            scale = np.asarray(other, dtype=float).reshape(-1, 1)
+            return FactoryGroupBatch(self.rates * scale, self.counts * scale)
+        return NotImplemented
+
+    def __rmul__(self, other):
+        return self.__mul__(other)
+
+    def __truediv__(self, other):
+        if isinstance(other, int) or isinstance(other, float) or isinstance(other, np.ndarray):
+            return self.__mul__(1 / np.asarray(other, dtype=float))
+        arrays = self._as_arrays(other)
+        if arrays is None:
+            return NotImplemented
+        rates = np.broadcast_to(arrays[0], self.rates.shape)
+        shared = (self.rates < 0) & (rates > 0)
+        ratios = np.where(shared, -self.rates / np.where(shared, rates, 1), -np.inf).max(axis=1)
+        ratios[~shared.any(axis=1)] = np.nan
+        return ratios
+
+    def __matmul__(self, other):
+        '''
+        Combines every plan with "other", scaled such that its outputs cover the plan's inputs. Plans that share no materials with "other" are left unchanged.
+        '''
+        arrays = self._as_arrays(other)
+        if arrays is None or isinstance(other, M.Material):
+            return NotImplemented
+        ratios = self / other
+        return self._combine(*arrays, np.nan_to_num(ratios, nan=0))
+
+    def get_inputs(self) -> np.ndarray:
+        'Returns the rates of every plan, with everything but the inputs set to zero.'
+        return np.where(self.rates < 0, self.rates, 0)
+
+    def get_outputs(self) -> np.ndarray:
+        'Returns the rates of every plan, with everything but the outputs set to zero.'
+        return np.where(self.rates > 0, self.rates, 0)
+
+    def get_upstream(self, sources: Optional[Dict[M.Material, Factory]] = None, rounded: bool | List[Factory] = False) -> 'FactoryGroupBatch':
+        '''
+        Adds factories to every plan until all inputs are satisfied, using the linear solver (see Solvers.solve_upstream()).
+        Plans are solved together, so a batch of similar plans costs about as much as one.
+
+        Args:
+            sources (Dict[M.Material, Factory]): A dictionary of materials and their sources. If a material is not included, the most advanced factory that produces that material is used.
+            rounded (bool | list): Whether to use whole numbers of factories. Defaults to False. Rounded plans are solved one at a time with Solvers.plan_integer().
+
+        Returns:
+            FactoryGroupBatch: A batch with all inputs satisfied.
+        '''
+        if rounded:
+            return FactoryGroupBatch.from_groups([plan_integer(group, sources, rounded) for group in self.to_groups()])
+        self._fit()
+        present = np.flatnonzero(np.abs(self.rates).max(axis=0, initial=0) > 0)
+        model = get_model(sources, [MATERIAL_INDEX[position] for position in present])
+        materials = np.array([material.index for material in model.materials], dtype=np.intp)
+        factories = np.array([factory.index for factory in model.factories], dtype=np.intp)
+
+        counts = model.solve_batch(self.rates[:, materials])
+        rates = np.zeros_like(self.rates)
+        rates[:, materials] = counts @ model.matrix.T
+        upstream = np.zeros_like(self.counts)
+        upstream[:, factories] = counts
+        return self._combine(rates, upstream)
@@ -0,0 +1,296 @@
+from abc import ABC, abstractmethod
+from math import ceil
+from typing import Dict, List, Tuple
+
+from MindustryTools.Factories import Factory, FactoryGroup
+import MindustryTools.Materials as M
+
+class Expression(ABC):
+    '''
+    A lazily evaluated chain of factory arithmetic. Create one with lazy().
+
+    Expressions support the same operators as FactoryGroup, but build a graph instead of a new group at every step. Any factory, material or factory group combined with an expression becomes part of it.
+    Chains of sums, differences and scaling fuse into a single linear combination, and identical subexpressions are only evaluated once.
+    It is evaluated the first time a result is needed (by printing it, dividing by it, or using any FactoryGroup attribute or function), and the result is kept.
+
+    Factory groups used in an expression are read when it is evaluated, not when it is built, and are never modified.
+    '''
+    __slots__ = ('_result',)
+
+    def __init__(self):
+        self._result = None
+
+    def children(self) -> List['Expression']:
+        'The expressions this one is built from.'
+        return []
+
+    @abstractmethod
+    def _key(self, keys: Dict['Expression', int]) -> tuple:
+        'The structure of this expression, given the keys of its children. Expressions with equal keys have the same result.'
+
+    @abstractmethod
+    def _evaluate(self, values: Dict[int, object], keys: Dict['Expression', int], uses: Dict[int, int]) -> FactoryGroup:
+        'Computes the result of this expression from the values of its children, which are computed as needed.'
+
+    def _compute(self, values: Dict[int, object], keys: Dict['Expression', int], uses: Dict[int, int]):
+        'Evaluates this expression, only the first time its key is used.'
+        key = keys[self]
+        value = values.get(key)
+        if value is None:
+            value = values[key] = self._result if self._result is not None else self._evaluate(values, keys, uses)
+        return value
+
+    def _take(self, values: Dict[int, object], keys: Dict['Expression', int], uses: Dict[int, int]) -> FactoryGroup:
+        'Evaluates this expression into a group the caller may modify, copying it only if something else could see the changes.'
+        value = self._compute(values, keys, uses)
+        if isinstance(self, Leaf) or self._result is not None or uses[keys[self]] > 1:
+            return _copy(value)
+        return value
+
+    def evaluate(self) -> FactoryGroup:
+        '''
+        Computes the result of the expression. Later calls return the same result.
+
+        Returns:
+            FactoryGroup: The result, as if the operators had been applied directly.
+        '''
+        if self._result is None:
+            # Number each distinct structure, children first, and count how many times it is used
+            keys, numbers, uses, order, nested = {}, {}, {}, [], set()
+            pending = [(self, False)]
+            while pending:
+                expression, expanded = pending.pop()
+                if expression in keys:
+                    continue
+                if not expanded:
+                    pending.append((expression, True))
+                    if expression._result is None:
+                        pending.extend((child, False) for child in expression.children() if child not in keys)
+                    continue
+                key = expression._key(keys) if expression._result is None else ('result', id(expression))
+                keys[expression] = numbers.setdefault(key, len(numbers))
+                order.append(expression)
+                if expression._result is None:
+                    for child in expression.children():
+                        uses[keys[child]] = uses.get(keys[child], 0) + 1
+                    if isinstance(expression, LinearCombination) and isinstance(expression.terms[0][0], LinearCombination):
+                        nested.add(expression.terms[0][0])
+            uses[keys[self]] = 1
+
+            # Evaluate children first, skipping combinations that are fused into the combination using them
+            values = {}
+            for expression in order[:-1]:
+                if keys[expression] not in values and not (expression in nested and expression._inlined(keys, uses)):
+                    expression._compute(values, keys, uses)
+            self._result = self._take(values, keys, uses)
+        return self._result
+
+    def __add__(self, other):
+        other = _operand(other)
+        if other is None:
+            return NotImplemented
+        return _combination([(self, 1), (other, 1)])
+
+    def __radd__(self, other):
+        other = _operand(other)
+        if other is None:
+            return NotImplemented
+        if _is_material(other): # As materials have no operators, FactoryGroup.__radd__ puts the group first
+            return _combination([(self, 1), (other, 1)])
+        return _combination([(other, 1), (self, 1)])
+
+    def __sub__(self, other):
+        other = _operand(other)
+        if other is None:
+            return NotImplemented
+        return _combination([(self, 1), (other, -1)])
+
+    def __rsub__(self, other):
+        other = _operand(other)
+        if other is None:
+            return NotImplemented
+        if _is_material(other):
+            return _combination([(self, -1), (other, 1)])
+        return _combination([(other, 1), (self, -1)])
+
+    def __mul__(self, other):
+        if isinstance(other, int) or isinstance(other, float):
+            return _combination([(self, other)])
+        return NotImplemented
+
+    def __rmul__(self, other):
+        return self.__mul__(other)
+
+    def __matmul__(self, other):
+        other = _operand(other)
+        if other is None or _is_material(other):
+            return NotImplemented
+        return MatMul(self, other)
+
+    def __rmatmul__(self, other):
+        other = _operand(other)
+        if other is None or _is_material(other):
+            return NotImplemented
+        return MatMul(other, self)
+
+    def __truediv__(self, other):
+        if isinstance(other, int) or isinstance(other, float):
+            return self.__mul__(1/other)
+        if isinstance(other, Expression):
+            other = other.evaluate()
+        return self.evaluate() / other
+
+    def __rtruediv__(self, other):
+        return other / self.evaluate()
+
+    def __floordiv__(self, other):
+        return ceil(self.__truediv__(other)) # Rounds up, as with FactoryGroup
+
+    def __rfloordiv__(self, other):
+        return ceil(self.__rtruediv__(other))
+
+    def __repr__(self):
+        return repr(self.evaluate())
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.evaluate(), name)
+
+class Leaf(Expression):
+    '''
+    A single factory, material or factory group in an expression.
+
+    Attributes:
+        value (Factory | M.Material | FactoryGroup): The entity.
+    '''
+    __slots__ = ('value',)
+
+    def __init__(self, value: Factory | M.Material | FactoryGroup):
+        super().__init__()
+        self.value = value
+
+    def _key(self, keys):
+        return ('leaf', id(self.value)) # Only the same object is shared, as groups are mutable
+
+    def _evaluate(self, values, keys, uses):
+        return self.value
+
+class LinearCombination(Expression):
+    '''
+    The sum of several expressions, each scaled by a coefficient. Sums, differences and scaling are all combined into one of these.
+    It is evaluated into a single new group, adding each term to it in place.
+
+    Attributes:
+        terms (Tuple[Tuple[Expression, float], ...]): The expressions and their coefficients, in the order they were added.
+    '''
+    __slots__ = ('terms',)
+
+    def __init__(self, terms: Tuple[Tuple[Expression, float], ...]):
+        super().__init__()
+        self.terms = terms
+
+    def children(self):
+        return [term for term, coefficient in self.terms]
+
+    def _key(self, keys):
+        return ('sum',) + tuple((keys[term], coefficient) for term, coefficient in self.terms)
+
+    def _inlined(self, keys, uses) -> bool:
+        'Whether this combination is only used as the first term of another combination, which adds its terms directly.'
+        return self._result is None and uses[keys[self]] == 1
+
+    def _expand(self, keys, uses) -> List[Tuple[Expression, float]]:
+        '''
+        The terms of this combination, in the order the operators would add them, with an inlined first term replaced by its own terms.
+        Only a first term is inlined, as the operators drop any material that cancels out part way through and add it again at the end of the group, so adding the terms of a later one could give a different order.
+        '''
+        chain = [(self, 1)]
+        first, coefficient = self.terms[0]
+        while isinstance(first, LinearCombination) and first._inlined(keys, uses):
+            chain.append((first, chain[-1][1] * coefficient))
+            first, coefficient = first.terms[0]
+        terms = [(first, chain[-1][1] * coefficient)]
+        for combination, scale in reversed(chain):
+            terms.extend((term, scale * coefficient) for term, coefficient in combination.terms[1:])
+        return terms
+
+    def _evaluate(self, values, keys, uses):
+        (first, coefficient), *rest = self._expand(keys, uses)
+        result = first._take(values, keys, uses)
+        if coefficient != 1:
+            result *= coefficient
+        for term, coefficient in rest:
+            result._accumulate(term._compute(values, keys, uses), coefficient)
+        return result
+
+class MatMul(Expression):
+    '''
+    The @ operator: left, plus as many of right as are needed to supply it. See FactoryGroup.__matmul__.
+
+    Attributes:
+        left (Expression): The expression being supplied.
+        right (Expression): The supplier.
+    '''
+    __slots__ = ('left', 'right')
+
+    def __init__(self, left: Expression, right: Expression):
+        super().__init__()
+        self.left = left
+        self.right = right
+
+    def children(self):
+        return [self.left, self.right]
+
+    def _key(self, keys):
+        return ('matmul', keys[self.left], keys[self.right])
+
+    def _evaluate(self, values, keys, uses):
+        result = self.left._take(values, keys, uses)
+        result @= self.right._compute(values, keys, uses)
+        return result
+
+def _copy(value: Factory | M.Material | FactoryGroup) -> FactoryGroup:
+    if isinstance(value, Factory):
+        return FactoryGroup([value])
+    if isinstance(value, M.Material):
+        return FactoryGroup(materials = [value])
+    return type(value)(factory_group = value)
+
+def _is_material(expression: Expression) -> bool:
+    return isinstance(expression, Leaf) and isinstance(expression.value, M.Material)
+
+def _operand(other) -> Expression:
+    'Converts factories, materials and factory groups to expressions, or returns None.'
+    if isinstance(other, Expression):
+        return other
+    if isinstance(other, (Factory, M.Material, FactoryGroup)):
+        return Leaf(other)
+    return None
+
+def _combination(terms: List[Tuple[Expression, float]]) -> Expression:
+    'Builds a linear combination. Nested combinations are merged when it is evaluated.'
+    if len(terms) == 1:
+        (term, coefficient), = terms
+        if coefficient == 1:
+            return term
+    return LinearCombination(tuple(terms))
+
+def lazy(entity: Factory | M.Material | FactoryGroup | Expression) -> Expression:
+    '''
+    Starts a lazily evaluated expression. See Expression.
+
+    Args:
+        entity (Factory | M.Material | FactoryGroup): The entity to start from.
+
+    Returns:
+        Expression: An expression that evaluates to the entity as a factory group.
+
+    Example:
+        >>> plan = (lazy(SurgeSmelter()) * 4 + lazy(Kiln()) * 2) @ SiliconSmelter() @ PyratiteMixer()
+        >>> print(plan) # Evaluated here, into a single new group
+    '''
+    result = _operand(entity)
+    if result is None:
+        raise TypeError(f"Cannot make a lazy expression from '{type(entity)}'")
+    return result
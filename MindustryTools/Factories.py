@@ -1,9 +1,17 @@
-from dataclasses import dataclass, field
-from typing import Dict, Optional, List, Self
-from math import ceil
+from dataclasses import dataclass, field, replace
+from typing import Dict, Iterable, Optional, List, Self
+from math import ceil, inf, isfinite
+from heapq import heappush, heappop
+from itertools import count
 
 from MindustryTools.MindustryObject import Building, MindustryException
 import MindustryTools.Materials as M
+import MindustryTools.Tracing as Tracing
+import MindustryTools.Caches as Caches
+
+# The iterative solver decides that it is chasing a recipe cycle that does not converge after this many sources, or if it needs more than MAX_SUPPLY_RATIO of one source at once
+MAX_SUPPLY_STEPS = 10000
+MAX_SUPPLY_RATIO = 1e12
 
 @dataclass(frozen=True)
 class Factory(Building):
@@ -39,15 +47,22 @@ class Factory(Building):
 
     #     return instance
 
+    _variant_fields = ('efficiency',)
+
     def __post_init__(self):
+        object.__setattr__(self, '_unscaled', (self.inputs, self.outputs)) # Kept so that variants scale from the original rates
         object.__setattr__(self, 'inputs', {material: self.efficiency * rate for material, rate in self.inputs.items()})
         object.__setattr__(self, 'outputs', {material: self.efficiency * rate for material, rate in self.outputs.items()})
-        
-    def __hash__(self):
-        return self.id
-    
-    def __eq__(self, other):
-        return isinstance(other, Factory) and self.id == other.id
+        rates = dict(self.outputs)
+        for material, rate in self.inputs.items():
+            rates[material] = rates.get(material, 0) - rate
+        rates[M.POWER] = rates.get(M.POWER, 0) + self.power
+        object.__setattr__(self, '_rates', rates)
+        super().__post_init__()
+
+    def _vary(self, **changes) -> Self:
+        inputs, outputs = self._unscaled
+        return replace(self, inputs = inputs, outputs = outputs, **changes)
     
     def __add__(self, other):
         return FactoryGroup([self]).__add__(other)
@@ -74,373 +89,82 @@ class Factory(Building):
         return FactoryGroup([self]).__truediv__(other)
 
 
-### 2. DRILLS ###
-# I know these are resources gathering, but they function much more like factories than drills
-@dataclass(frozen=True)
-class WaterExtractor(Factory):
-    name: str = 'Water Extractor'
-    id: int = 205
-    size: int = 2
-    inputs: Dict[M.Material, float] = field(default_factory=dict)
-    outputs: Dict[M.Material, float] = field(default_factory=lambda: {M.WATER: 6.6})
-    power: int = -90
-    modal_efficiency: bool = True
-    __hash__ = Factory.__hash__
-    __eq__ = Factory.__eq__
-
-@dataclass(frozen=True)
-class Cultivator(Factory):
-    name: str = 'Cultivator'
-    id: int = 206
-    size: int = 2
-    inputs: Dict[M.Material, float] = field(default_factory=lambda: {M.WATER: 18})
-    outputs: Dict[M.Material, float] = field(default_factory=lambda: {M.SPORE_POD: .6})
-    power: int = -80
-    modal_efficiency: bool = True
-    __hash__ = Factory.__hash__
-    __eq__ = Factory.__eq__
-
-@dataclass(frozen=True)
-class OilExtractor(Factory):
-    name: str = 'Oil Extractor'
-    id: int = 207
-    size: int = 3
-    inputs: Dict[M.Material, float] = field(default_factory=lambda: {M.SAND:1, M.WATER: 9})
-    outputs: Dict[M.Material, float] = field(default_factory=lambda: {M.OIL: 15})
-    power: int = -180
-    modal_efficiency: bool = True
-    __hash__ = Factory.__hash__
-    __eq__ = Factory.__eq__
-
-
-### 7. FACTORIES ###
-@dataclass(frozen=True)
-class GraphitePress(Factory):
-    name: str = 'Graphite Press'
-    id: int = 701
-    size: int = 2
-    inputs: Dict[M.Material, float] = field(default_factory=lambda: {M.COAL: 1.33})
-    outputs: Dict[M.Material, float] = field(default_factory=lambda: {M.GRAPHITE: .66})
-    power: int = 0
-    __hash__ = Factory.__hash__
-    __eq__ = Factory.__eq__
-
-@dataclass(frozen=True)
-class MultiPress(Factory):
-    name: str = 'Multi Press'
-    id: int = 702
-    size: int = 3
-    inputs: Dict[M.Material, float] = field(default_factory=lambda: {M.COAL: 6, M.WATER: 6})
-    outputs: Dict[M.Material, float] = field(default_factory=lambda: {M.GRAPHITE: 4})
-    power: int = -108
-    __hash__ = Factory.__hash__
-    __eq__ = Factory.__eq__
-
-@dataclass(frozen=True)
-class SiliconSmelter(Factory):
-    name: str = 'Silicon Smelter'
-    id: int = 703
-    size: int = 2
-    inputs: Dict[M.Material, float] = field(default_factory=lambda: {M.COAL: 1.5, M.SAND: 3})
-    outputs: Dict[M.Material, float] = field(default_factory=lambda: {M.SILICON: 1.5})
-    power: int = -30
-    __hash__ = Factory.__hash__
-    __eq__ = Factory.__eq__
-
-@dataclass(frozen=True)
-class SiliconCrucible(Factory):
-    name: str = 'Silicon Crucible'
-    id: int = 704
-    size: int = 3
-    inputs: Dict[M.Material, float] = field(default_factory=lambda: {M.COAL: 2.66, M.SAND: 4, M.PYRATITE: 0.66})
-    outputs: Dict[M.Material, float] = field(default_factory=lambda: {M.SILICON: 5.33})
-    power: int = -240
-    modal_efficiency: bool = True
-    __hash__ = Factory.__hash__
-    __eq__ = Factory.__eq__
-
-@dataclass(frozen=True)
-class Kiln(Factory):
-    name: str = 'Kiln'
-    id: int = 705
-    size: int = 2
-    inputs: Dict[M.Material, float] = field(default_factory=lambda: {M.LEAD: 2, M.SAND: 2})
-    outputs: Dict[M.Material, float] = field(default_factory=lambda: {M.METAGLASS: 2})
-    power: int = -36
-    __hash__ = Factory.__hash__
-    __eq__ = Factory.__eq__
-
-@dataclass(frozen=True)
-class PlastaniumCompressor(Factory):
-    name: str = 'Plastanium Compressor'
-    id: int = 706
-    size: int = 2
-    inputs: Dict[M.Material, float] = field(default_factory=lambda: {M.TITANIUM: 2, M.OIL: 15})
-    outputs: Dict[M.Material, float] = field(default_factory=lambda: {M.PLASTANIUM: 1})
-    power: int = -180
-    __hash__ = Factory.__hash__
-    __eq__ = Factory.__eq__
-
-@dataclass(frozen=True)
-class PhaseWeaver(Factory):
-    name: str = 'Phase Weaver'
-    id: int = 707
-    size: int = 2
-    inputs: Dict[M.Material, float] = field(default_factory=lambda: {M.THORIUM: 2, M.SAND: 5})
-    outputs: Dict[M.Material, float] = field(default_factory=lambda: {M.PHASE_FABRIC: 0.5})
-    power: int = -300
-    __hash__ = Factory.__hash__
-    __eq__ = Factory.__eq__
-
-@dataclass(frozen=True)
-class SurgeSmelter(Factory):
-    name: str = 'Surge Smelter'
-    id: int = 708
-    size: int = 3
-    inputs: Dict[M.Material, float] = field(default_factory=lambda: {M.COPPER: 2.4, M.LEAD: 3.2, M.SILICON: 2.4, M.TITANIUM: 1.6})
-    outputs: Dict[M.Material, float] = field(default_factory=lambda: {M.SURGE_ALLOY: 0.8})
-    power: int = -240
-    __hash__ = Factory.__hash__
-    __eq__ = Factory.__eq__
-
-@dataclass(frozen=True)
-class CryofluidMixer(Factory):
-    name: str = 'Cryofluid Mixer'
-    id: int = 709
-    size: int = 2
-    inputs: Dict[M.Material, float] = field(default_factory=lambda: {M.WATER: 12, M.TITANIUM: .5})
-    outputs: Dict[M.Material, float] = field(default_factory=lambda: {M.CRYOFLUID: 12})
-    power: int = -60
-    __hash__ = Factory.__hash__
-    __eq__ = Factory.__eq__
-
-@dataclass(frozen=True)
-class PyratiteMixer(Factory):
-    name: str = 'Pyratite Mixer'
-    id: int = 710
-    size: int = 2
-    inputs: Dict[M.Material, float] = field(default_factory=lambda: {M.COAL: .75, M.LEAD: 1.5, M.SAND: 1.5})
-    outputs: Dict[M.Material, float] = field(default_factory=lambda: {M.PYRATITE: .75})
-    power: int = -12
-    __hash__ = Factory.__hash__
-    __eq__ = Factory.__eq__
-
-@dataclass(frozen=True)
-class BlastMixer(Factory):
-    name: str = 'Blast Mixer'
-    id: int = 711
-    size: int = 2
-    inputs: Dict[M.Material, float] = field(default_factory=lambda: {M.PYRATITE: .75, M.SPORE_POD: .75})
-    outputs: Dict[M.Material, float] = field(default_factory=lambda: {M.BLAST_COMPOUND: .75})
-    power: int = -24
-    __hash__ = Factory.__hash__
-    __eq__ = Factory.__eq__
-
-@dataclass(frozen=True)
-class Melter(Factory):
-    name: str = 'Melter'
-    id: int = 712
-    size: int = 1
-    inputs: Dict[M.Material, float] = field(default_factory=lambda: {M.SCRAP: 6 })
-    outputs: Dict[M.Material, float] = field(default_factory=lambda: {M.SLAG: 12})
-    power: int = -60
-    __hash__ = Factory.__hash__
-    __eq__ = Factory.__eq__
-
-# TODO: implement these
-@dataclass(frozen=True)
-class Separator(Factory):
-    name: str = 'Separator'
-    id: int = 713
-    size: int = 2
-    inputs: Dict[M.Material, float] = field(default_factory=lambda: {M.SLAG: 4})
-    # Output ratio is 5:3:2:2
-    # .58 per second overall
-    # output = .58/12 * ratio, or .0483 * ratio
-    outputs: Dict[M.Material, float] = field(default_factory=lambda: {M.COPPER: 5*.0483, M.LEAD: 3*.0483, M.TITANIUM: 2*.0483, M.GRAPHITE: 2*.0483})
-    power: int = 0
-    __hash__ = Factory.__hash__
-    __eq__ = Factory.__eq__
-
-@dataclass(frozen=True)
-class Dissassembler(Factory):
-    name: str = 'Dissassembler'
-    id: int = 714
-    size: int = 3
-    inputs: Dict[M.Material, float] = field(default_factory=lambda: {M.SCRAP: 4, M.SLAG: 7.2})
-    # Output ratio is 2:4:2:1
-    # .25 per second overall
-    # output = .25/9 * ratio, or .0278 * ratio
-    outputs: Dict[M.Material, float] = field(default_factory=lambda: {M.GRAPHITE: 2*.0278, M.SAND: 4*.0278, M.TITANIUM: 2*.0278, M.THORIUM: 1*.0278})
-    power: int = 0
-    __hash__ = Factory.__hash__
-    __eq__ = Factory.__eq__
-
-@dataclass(frozen=True)
-class SporePress(Factory):
-    name: str = 'Spore Press'
-    id: int = 715
-    size: int = 2
-    inputs: Dict[M.Material, float] = field(default_factory=lambda: {M.SPORE_POD: 3})
-    outputs: Dict[M.Material, float] = field(default_factory=lambda: {M.OIL: 18})
-    power: int = -42
-    __hash__ = Factory.__hash__
-    __eq__ = Factory.__eq__
-
-@dataclass(frozen=True)
-class Pulverizer(Factory):
-    name: str = 'Pulverizer'
-    id: int = 716
-    size: int = 1
-    inputs: Dict[M.Material, float] = field(default_factory=lambda: {M.SCRAP: 1.5})
-    outputs: Dict[M.Material, float] = field(default_factory=lambda: {M.SAND: 1.5})
-    power: int = -30
-    __hash__ = Factory.__hash__
-    __eq__ = Factory.__eq__
-
-@dataclass(frozen=True)
-class CoalCentrifuge(Factory):
-    name: str = 'Coal Centrifuge'
-    id: int = 717
-    size: int = 2
-    inputs: Dict[M.Material, float] = field(default_factory=lambda: {M.OIL: 6})
-    outputs: Dict[M.Material, float] = field(default_factory=lambda: {M.COAL: 2})
-    power: int = -42
-    __hash__ = Factory.__hash__
-    __eq__ = Factory.__eq__
-
-# TODO: I haven't figured out optional inputs yet
-# @dataclass(frozen=True)
-# class Incinerator(Factory):
-#     name: str = 'Incinerator'
-#     id: int = 718
-#     size: int = 1
-#     inputs: Dict[M.Material, float] = field(default_factory=lambda: {M.SLAG: 1})
-#     outputs: Dict[M.Material, float] = field(default_factory=lambda: {})
-#     power: int = 0
-# )
-
-### 5. GENERATORS ###
-
-@dataclass(frozen=True)
-class CombustionGenerator(Factory):
-    name: str = 'Combustion Generator'
-    id: int = 507
-    size: int = 1
-    inputs: Dict[M.Material, float] = field(default_factory=lambda: {M.COAL: .5}) #TODO: I haven't figured out optional inputs yet
-    outputs: Dict[M.Material, float] = field(default_factory=lambda: {})
-    power: int = 60
-    __hash__ = Factory.__hash__
-    __eq__ = Factory.__eq__
-
-@dataclass(frozen=True)
-class ThermalGenerator(Factory):
-    name: str = 'Thermal Generator'
-    id: int = 508
-    size: int = 2
-    inputs: Dict[M.Material, float] = field(default_factory=lambda: {M.WATER: 1})
-    outputs: Dict[M.Material, float] = field(default_factory=lambda: {})
-    power: int = 60
-    modal_efficiency: bool = True
-    __hash__ = Factory.__hash__
-    __eq__ = Factory.__eq__
-
-@dataclass(frozen=True)
-class SteamGenerator(Factory):
-    name: str = 'Steam Generator'
-    id: int = 509
-    size: int = 2
-    inputs: Dict[M.Material, float] = field(default_factory=lambda: {M.SPORE_POD: 1/1.5, M.WATER: 6}) # TODO: I haven't figured out optional inputs yet
-    outputs: Dict[M.Material, float] = field(default_factory=lambda: {})
-    power: int = 330
-    __hash__ = Factory.__hash__
-    __eq__ = Factory.__eq__
-
-@dataclass(frozen=True)
-class DifferentailGenerator(Factory):
-    name: str = 'Differentail Generator'
-    id: int = 510
-    size: int = 3
-    inputs: Dict[M.Material, float] = field(default_factory=lambda: {M.PYRATITE: 1/3.66, M.CRYOFLUID: 6})
-    outputs: Dict[M.Material, float] = field(default_factory=lambda: {})
-    power: int = 1080
-    __hash__ = Factory.__hash__
-    __eq__ = Factory.__eq__
-
-@dataclass(frozen=True)
-class RTGGenerator(Factory):
-    name: str = 'RTG Generator'
-    id: int = 511
-    size: int = 2
-    inputs: Dict[M.Material, float] = field(default_factory=lambda: {M.THORIUM: 1/14})
-    outputs: Dict[M.Material, float] = field(default_factory=lambda: {})
-    power: int = 270
-    __hash__ = Factory.__hash__
-    __eq__ = Factory.__eq__
-
-@dataclass(frozen=True)
-class SolarPanel(Factory):
-    name: str = 'Solar Panel'
-    id: int = 512
-    size: int = 1
-    inputs: Dict[M.Material, float] = field(default_factory=lambda: {})
-    outputs: Dict[M.Material, float] = field(default_factory=lambda: {})
-    power: int = 6
-    __hash__ = Factory.__hash__
-    __eq__ = Factory.__eq__
-
-@dataclass(frozen=True)
-class LargeSolarPanel(Factory):
-    name: str = 'Large Solar Panel'
-    id: int = 513
-    size: int = 3
-    inputs: Dict[M.Material, float] = field(default_factory=lambda: {})
-    outputs: Dict[M.Material, float] = field(default_factory=lambda: {})
-    power: int = 78
-    __hash__ = Factory.__hash__
-    __eq__ = Factory.__eq__
+def _rates(factory: Factory) -> Dict[M.Material, float]:
+    'The net rate of each material a single factory produces (positive) or consumes (negative), including power. Computed once per factory; must not be modified.'
+    return factory._rates
 
-@dataclass(frozen=True)
-class ThoriumReactor(Factory):
-    name: str = 'Thorium Reactor'
-    id: int = 514
-    size: int = 3
-    inputs: Dict[M.Material, float] = field(default_factory=lambda: {M.THORIUM: 1/6, M.CRYOFLUID: 2.5}) # Should be 2.4, but did this for safety!
-    outputs: Dict[M.Material, float] = field(default_factory=lambda: {})
-    power: int = 900
-    __hash__ = Factory.__hash__
-    __eq__ = Factory.__eq__
+class IOMap(dict):
+    '''
+    A dictionary of materials and their rates, in materials / second. Positive values are outputs, negative values are inputs.
+    The inputs and outputs are kept partitioned as rates are changed, so they never need to be filtered out of the whole map.
 
-@dataclass(frozen=True)
-class ImpactReactor(Factory):
-    name: str = 'Impact Reactor'
-    id: int = 515
-    size: int = 4
-    inputs: Dict[M.Material, float] = field(default_factory=lambda: {M.BLAST_COMPOUND: 1/2.33, M.CRYOFLUID: 15})
-    outputs: Dict[M.Material, float] = field(default_factory=lambda: {})
-    power: int = 7800
-    __hash__ = Factory.__hash__
-    __eq__ = Factory.__eq__
-
-# Quick lists for easy access
-FACTORIES = {
-    factory.id: factory for factory in [
-    WaterExtractor(), Cultivator(), OilExtractor(),
-    GraphitePress(), MultiPress(), SiliconSmelter(), SiliconCrucible(), Kiln(), PlastaniumCompressor(), PhaseWeaver(), SurgeSmelter(), CryofluidMixer(), PyratiteMixer(), BlastMixer(), Melter(), SporePress(), Pulverizer(), CoalCentrifuge(),
-    CombustionGenerator(), ThermalGenerator(), SteamGenerator(), DifferentailGenerator(), RTGGenerator(), SolarPanel(), LargeSolarPanel(), ThoriumReactor(), ImpactReactor(),
-    ]
-}
-
-GENERATORS = {
-    factory.id: factory for factory in [
-    CombustionGenerator(), ThermalGenerator(), SteamGenerator(), DifferentailGenerator(), RTGGenerator(), SolarPanel(), LargeSolarPanel(), ThoriumReactor(), ImpactReactor(),
-    ]
-}
-
-SOURCES = {M.POWER: list(GENERATORS.values())}
-for factory in FACTORIES.values():
-    for material in factory.outputs:
-        SOURCES[material] = SOURCES.get(material, []) + [factory]
+    Attributes:
+        inputs (Dict[M.Material, float]): The materials with a negative rate.
+        outputs (Dict[M.Material, float]): The materials with a positive rate.
+    '''
+    __slots__ = ('inputs', 'outputs')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self.inputs = {}
+        self.outputs = {}
+        self.update(*args, **kwargs)
+
+    def __setitem__(self, material, rate):
+        dict.__setitem__(self, material, rate)
+        if rate < 0:
+            self.inputs[material] = rate
+            self.outputs.pop(material, None)
+        elif rate > 0:
+            self.outputs[material] = rate
+            self.inputs.pop(material, None)
+        else:
+            self.inputs.pop(material, None)
+            self.outputs.pop(material, None)
+
+    def __delitem__(self, material):
+        dict.__delitem__(self, material)
+        self.inputs.pop(material, None)
+        self.outputs.pop(material, None)
+
+    def update(self, *args, **kwargs):
+        for material, rate in dict(*args, **kwargs).items():
+            self[material] = rate
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def setdefault(self, material, rate=0):
+        if material not in self:
+            self[material] = rate
+        return self[material]
+
+    def pop(self, material, *default):
+        self.inputs.pop(material, None)
+        self.outputs.pop(material, None)
+        return dict.pop(self, material, *default)
+
+    def popitem(self):
+        material, rate = dict.popitem(self)
+        self.inputs.pop(material, None)
+        self.outputs.pop(material, None)
+        return material, rate
+
+    def clear(self):
+        dict.clear(self)
+        self.inputs.clear()
+        self.outputs.clear()
+
+    def copy(self):
+        result = IOMap()
+        dict.update(result, self)
+        result.inputs = self.inputs.copy()
+        result.outputs = self.outputs.copy()
+        return result
+
+    def __reduce__(self):
+        return (IOMap, (dict(self),))
 
 class FactoryGroup():
     '''
@@ -448,7 +172,7 @@ class FactoryGroup():
 
     ATTRIBUTES:
         factories (Dict[Factory, float]): A dictionary of factories and their counts. Decimal values represent partial factory inputs / outputs. They are useful in calculation, but are not always reliable (ex. Impact reactors do not function with insufficient input).
-        IOMap (Dict[M.Material, float]): A dictionary of the input/output materials and their rate in materials / second. Positive values are outputs, negative values are inputs.
+        IOMap (IOMap): A dictionary of the input/output materials and their rate in materials / second. Positive values are outputs, negative values are inputs. Assigning a regular dictionary converts it.
 
     INITIALIZATION:
         The Factory group can be initialized with any of the following parameters. If multiple arguments are provided, all are combined; none are overridden.
@@ -477,10 +201,13 @@ class FactoryGroup():
         
         DIVISION (/): FactoryGroup, Factory, Material
             If "other" is a FactoryGroup, returns the number of "other" factory groups required to supply this factory group. Dividing factories with no shared inputs/outputs will result in an error. If "other" is a number, scales the factory group by that amount (equivalent to multiplying by 1/other).
+
+        IN-PLACE (+=, -=, *=, @=):
+            Give the same result as the operators above, but modify the factory group instead of copying it. Prefer these in loops and long chains.
     '''
     def __init__(self, factories: Dict[Factory, float] | List[Factory]= None, *,  materials: Optional[Dict[M.Material, float]] | List[M.Material] = None, factory_group: Optional['FactoryGroup'] = None):
         self.factories = factory_group.factories.copy() if factory_group is not None else dict()
-        self.IOMap = factory_group.IOMap.copy() if factory_group is not None else dict()
+        self.IOMap = factory_group.IOMap.copy() if factory_group is not None else IOMap()
 
         if isinstance(factories, list):
             factories = {factory: 1 for factory in factories}
@@ -508,41 +235,90 @@ class FactoryGroup():
         return output + '\n}' if output != '{' else '{}'
         
 
-    def __add__(self, other):
+    @property
+    def IOMap(self) -> IOMap:
+        return self._IOMap
+
+    @IOMap.setter
+    def IOMap(self, value: Dict[M.Material, float]):
+        self._IOMap = value if isinstance(value, IOMap) else IOMap(value)
+
+    def _copy(self) -> Self:
+        return type(self)(factory_group = self)
+
+    def _accumulate(self, other, scale: float = 1, prune: bool = True) -> Self:
+        '''
+        Adds a scaled factory, material or factory group to this group in place.
+
+        Args:
+            other (Factory | M.Material | FactoryGroup): The entity to add.
+            scale (float): The number of times to add the entity. Defaults to 1.
+            prune (bool): Whether to remove materials whose rate becomes zero. Defaults to True.
+
+        Returns:
+            This factory group.
+        '''
+        factories, IOMap = self.factories, self.IOMap
         if isinstance(other, Factory):
-            return FactoryGroup(factories = [other], factory_group = self)
-        if isinstance(other, M.Material):
-            return FactoryGroup(materials = [other], factory_group = self)
-        if isinstance(other, FactoryGroup):
-            result = FactoryGroup(factory_group = self)
-            for factory_id, count in other.factories.items():
-                result.factories[factory_id] = result.factories.get(factory_id, 0) + count
-            for material, rate in other.IOMap.items():
-                result.IOMap[material] = result.IOMap.get(material, 0) + rate
-                if result.IOMap[material] < 0.0001 and result.IOMap[material] > -0.0001: # If is zero
-                    del result.IOMap[material]
-            return result
-        raise TypeError(f"unsupported operand type(s) for +: 'FactoryGroup' and '{type(other)}'")
+            factories[other] = factories.get(other, 0) + scale
+            rates = _rates(other).items()
+        elif isinstance(other, M.Material):
+            rates = [(other, 1)]
+        elif isinstance(other, FactoryGroup):
+            for factory, count in other.factories.items():
+                factories[factory] = factories.get(factory, 0) + scale * count
+            rates = other.IOMap.items()
+        else:
+            raise TypeError(f"unsupported operand type: '{type(other)}'")
+
+        for material, rate in rates:
+            rate = IOMap.get(material, 0) + scale * rate
+            if prune and rate < 0.0001 and rate > -0.0001: # If is zero
+                IOMap.pop(material, None)
+            else:
+                IOMap[material] = rate
+        return self
+
+    def __add__(self, other):
+        if isinstance(other, (Factory, M.Material, FactoryGroup)):
+            return self._copy().__iadd__(other)
+        return NotImplemented
     
     def __radd__(self, other):
         return self.__add__(other)
+
+    def __iadd__(self, other):
+        if isinstance(other, (Factory, M.Material, FactoryGroup)):
+            return self._accumulate(other)
+        return NotImplemented
     
     def __sub__(self, other):
-        return (-1 * self).__add__(other)
+        if isinstance(other, (Factory, M.Material, FactoryGroup)):
+            return self._copy().__isub__(other)
+        return NotImplemented
         
     def __rsub__(self, other):
-        return self.__sub__(other)
+        return (-1 * self).__iadd__(other)
+
+    def __isub__(self, other):
+        if isinstance(other, (Factory, M.Material, FactoryGroup)):
+            return self._accumulate(other, -1)
+        return NotImplemented
     
     def __mul__(self, other):
         if isinstance(other, int) or isinstance(other, float):
-            result = FactoryGroup(factory_group = self)
-            result.factories = {factory_id: count * other for factory_id, count in result.factories.items()}
-            result.IOMap = {material: rate * other for material, rate in result.IOMap.items()}
-            return result
-        raise TypeError(f"unsupported operand type(s) for *: 'FactoryGroup' and '{type(other)}'")
+            return self._copy().__imul__(other)
+        return NotImplemented
 
     def __rmul__(self, other):
         return self.__mul__(other)
+
+    def __imul__(self, other):
+        if isinstance(other, int) or isinstance(other, float):
+            self.factories = {factory_id: count * other for factory_id, count in self.factories.items()}
+            self.IOMap = {material: rate * other for material, rate in self.IOMap.items()}
+            return self
+        return NotImplemented
     
     def __matmul__(self, other):
         '''
@@ -553,16 +329,24 @@ class FactoryGroup():
         If there are no shared materials, the second entity is ignored.
         '''
         if isinstance(other, Factory) or isinstance(other, FactoryGroup):
-            try:
-                return self + (self/other) * other # Can't tell if this is elegant or a stupid idea
-            except MindustryException:
-                return self
-        raise TypeError(f"unsupported operand type(s) for @: 'FactoryGroup' and '{type(other)}'")
+            return self._copy().__imatmul__(other)
+        return NotImplemented
 
     def __rmatmul__(self, other):
         'Reverses the @ operator'
         if isinstance(other, Factory):
             return FactoryGroup(factories = [other]).__matmul__(self)
+        return NotImplemented
+
+    def __imatmul__(self, other):
+        'Combines another factory / factory group into this one in place. See __matmul__.'
+        if isinstance(other, Factory) or isinstance(other, FactoryGroup):
+            try:
+                ratio = self / other
+            except MindustryException:
+                return self
+            return self._accumulate(other, ratio)
+        return NotImplemented
         
     def __truediv__(self, other):
         '''
@@ -574,15 +358,16 @@ class FactoryGroup():
         if isinstance(other, int) or isinstance(other, float):
             return self.__mul__(1/other)
         if isinstance(other, Factory):
-            other = FactoryGroup(factories = [other])
-        if isinstance(other, M.Material):
-            other = FactoryGroup(materials = [other])
-        if not isinstance(other, FactoryGroup):
-            raise TypeError(f"unsupported operand type(s) for /: 'FactoryGroup' and '{type(other)}'")
+            outputs = _rates(other)
+        elif isinstance(other, M.Material):
+            outputs = {other: 1}
+        elif isinstance(other, FactoryGroup):
+            outputs = other._outputs()
+        else:
+            return NotImplemented
         
-        inputs = {material: rate for material, rate in self.IOMap.items() if rate < 0}
-        outputs = {material: rate for material, rate in other.IOMap.items() if rate > 0}
-        shared_keys = set(inputs.keys()) & set(outputs.keys())
+        inputs = self._inputs()
+        shared_keys = [material for material in outputs if material in inputs and outputs[material] > 0]
         if not shared_keys:
             raise MindustryException(f"Cannot divide {self} by {other}; entity 1 produces none of entity 2's inputs.")
         ratio = max(-inputs[material]/outputs[material] for material in shared_keys)
@@ -595,48 +380,182 @@ class FactoryGroup():
         Rounds up to the nearest whole number.
         '''
         ratio = self.__truediv__(other)
+        if ratio is NotImplemented:
+            return NotImplemented
         return ceil(ratio) # Yes, I know that floor division should round down, but this is by far the most useful behavior
+
+    def _inputs(self) -> Dict[M.Material, float]:
+        'The input partition of the IOMap. Must not be modified.'
+        return self.IOMap.inputs
+
+    def _outputs(self) -> Dict[M.Material, float]:
+        'The output partition of the IOMap. Must not be modified.'
+        return self.IOMap.outputs
     
+    def _needs_supply(self, rate: float) -> bool:
+        'Whether get_upstream() should supply a material with this rate. Allows for rounding error, so that tiny deficits are treated as met; groups with exact rates compare with zero instead.'
+        return rate < 0.001
+
     def get_inputs(self):
-        return {material: rate for material, rate in self.IOMap.items() if rate < 0}
+        return dict(self._inputs())
     
     def get_outputs(self):
-        return {material: rate for material, rate in self.IOMap.items() if rate > 0}
+        return dict(self._outputs())
 
-    def get_upstream(self, sources: Optional[Dict[M.Material, Factory]] = None, rounded: bool | List[Factory] = False) -> Self:
+    @Caches.memoized
+    def get_upstream(self, sources: Optional[Dict[M.Material, Factory]] = None, rounded: bool | List[Factory] = False, solver: str = 'iterative', objective = 'power', power: str = 'supply') -> Self:
         '''
         Adds factories to the group until all inputs are satisfied.
         Ignores natural materials by default, but can be overridden by including them in the sources argument.
 
         Args:
             sources (Dict[M.Material, Factory | Collector]): A dictionary of materials and their sources. If a material is not included, the most advanced factory that produces that material is used.
+                A source of None leaves the material unsupplied.
             rounded (bool | list): Whether to round the output rates to the nearest whole number. Defaults to False. If a list is provided, it will round only the selected factories.
+            solver (str): How to find the upstream factories. Defaults to 'iterative'.
+                'iterative': Repeats the @ operator one material at a time, in the order of the catalog's RecipeGraph (most downstream first).
+                'linear': Solves the whole supply chain at once as a linear system, and raises a SolverException for recipe cycles that cannot be satisfied. See Solvers.solve_upstream().
+                    If rounded, finds the fewest whole factories that satisfy all inputs at once. See Solvers.plan_integer().
+                'optimal': Chooses the sources of all materials at once to minimize the objective, instead of using the most advanced source. See Solvers.optimize_upstream().
+                    If rounded, the chosen sources are then rounded as with the linear solver.
+            objective (str | Callable[[Factory], float]): What the optimal solver minimizes: 'power', 'footprint', 'ore', 'fuel' or 'buildings'. Defaults to 'power'.
+            power (str): How to supply power. Defaults to 'supply'.
+                'supply': Like any other material, with the most advanced generator (or the solver's choice).
+                'exclude': Not at all, leaving the power deficit as an input.
+                'balance': With the mix of generators and fuel chains that uses the least fuel. See Solvers.balance_power() for other objectives, limits and fuel availability.
 
         Returns:
             A factory group with all inputs satisfied.
+
+        Raises:
+            MindustryException: If a recipe cycle consumes more than it produces, so its materials cannot be supplied. The linear solvers raise a SolverException, which is a MindustryException.
+
+        Tracing:
+            Inside a Tracing.Tracer, each call is recorded as a span, and each iteration of the iterative solver as an event with the material, source, ratio, IOMap size and elapsed time.
+
+        Caching:
+            Inside a Caches.ResultCache, results are read from and stored in the cache, so repeated calls are not solved again, even in other processes.
         '''
-        result = FactoryGroup(factory_group = self)
-        sources = sources if sources is not None else {}
-        rounded = [] if not rounded else rounded
+        if power != 'supply':
+            if power not in ('exclude', 'balance'):
+                raise ValueError(f"Unknown power mode '{power}'")
+            sources = {**(sources or {}), M.POWER: None}
+            if power == 'balance':
+                from MindustryTools.Solvers import balance_power
+                return balance_power(self.get_upstream(sources, rounded, solver, objective), sources = sources, rounded = rounded is not False)
+
+        tracer = Tracing.ACTIVE.get()
+        if tracer is not None:
+            tracer.count('get_upstream')
+            span = tracer.begin('get_upstream', solver = solver, rounded = rounded is not False, factories = len(self.factories))
+
+        if solver == 'linear':
+            from MindustryTools.Solvers import solve_upstream, plan_integer
+            result = plan_integer(self, sources, rounded) if rounded else solve_upstream(self, sources)
+            if tracer is not None:
+                tracer.end(span, factories_added = len(result.factories) - len(self.factories))
+            return result
+        if solver == 'optimal':
+            from MindustryTools.Solvers import optimize_upstream, optimize_sources, plan_integer
+            result = plan_integer(self, optimize_sources(self, objective, sources), rounded) if rounded else optimize_upstream(self, objective, sources)
+            if tracer is not None:
+                tracer.end(span, factories_added = len(result.factories) - len(self.factories))
+            return result
+        if solver != 'iterative':
+            raise ValueError(f"Unknown solver '{solver}'")
 
-        # filter = lambda material: result.IOMap.get(material, 0) < -0.001 in sources or not material.is_natural
+        result = type(self)(factory_group = self)
+        result._supply(result.IOMap, sources if sources is not None else {}, rounded)
 
-        while target_materials := [material for material, rate in result.IOMap.items() if rate < 0.001 and (material in sources or not material.is_natural)]:
-            material = target_materials.pop()
+        if tracer is not None:
+            tracer.end(span, factories_added = len(result.factories) - len(self.factories))
+        return result
+
+    def _supply(self, materials: Iterable[M.Material], sources: Dict[M.Material, Factory], rounded: bool | List[Factory] = False, added: Optional[Dict[Factory, float]] = None) -> Self:
+        '''
+        The iterative solver of get_upstream(): supplies any deficit in the given materials in place, and any deficit that supplying them creates.
+        Deficits in other materials are left alone, so a group that was already supplied only needs the materials that have changed since.
+
+        Args:
+            materials (Iterable[M.Material]): The materials that may be in deficit.
+            sources (Dict[M.Material, Factory]): As for get_upstream().
+            rounded (bool | list): As for get_upstream().
+            added (Dict[Factory, float], optional): Receives the count of each factory added.
+
+        Returns:
+            This factory group.
+
+        Raises:
+            MindustryException: If a material has no source, or is part of a recipe cycle that consumes more than it produces.
+        '''
+        tracer = Tracing.ACTIVE.get()
+        rounded = [] if not rounded else rounded
+        unsupplied = {material for material, source in sources.items() if source is None} # Materials whose source cannot supply them, such as materials that are not consumed, or that are left unsupplied on purpose
+        from MindustryTools.Catalog import default_catalog
+        catalog = default_catalog()
+        catalog_sources = catalog.sources
+        graph = catalog.graph.including(source for source in sources.values() if isinstance(source, Factory))
+
+        # Supply the most downstream material first, so that outside of cycles each material is only supplied once, after everything that consumes it.
+        # Only materials whose rate has changed can become targets, so they are queued instead of scanning the whole IOMap each time.
+        queued = count()
+        pending = []
+        def enqueue(materials):
+            for material in materials:
+                rank = graph.rank(material)
+                heappush(pending, (inf if rank is None else rank, -next(queued), material)) # Unknown materials are treated as raw
+        enqueue(materials)
+
+        steps = 0
+        while pending:
+            material = heappop(pending)[2]
+            rate = self.IOMap.get(material)
+            if rate is None or not self._needs_supply(rate) or not (material in sources or not material.is_natural) or material in unsupplied:
+                continue
+            if tracer is not None:
+                tracer.count('iterations')
+                start = tracer.now()
             if material in sources:
                 source = sources[material]
-            elif material in SOURCES:
-                source = SOURCES[material][-1] # Default to the most advanced source
+            elif material in catalog_sources:
+                source = catalog_sources[material][-1] # Default to the most advanced source
             else:
                 raise MindustryException(f"No source found for {material.name}") # This should never happen
             
+            try:
+                ratio = self / source
+            except MindustryException:
+                unsupplied.add(material)
+                if tracer is not None:
+                    tracer.event('iteration', start, material = material, source = source, ratio = None, iomap_size = len(self.IOMap))
+                continue
+            steps += 1
+            _check_supply(material, ratio, steps)
             if rounded is True or source in rounded:
-                try:
-                    ratio = ceil(result / source)
-                    result += ratio * source
-                except MindustryException:
-                    continue
-            else:
-                result @= source
-        
-        return result
\ No newline at end of file
+                ratio = ceil(ratio)
+            self._accumulate(source, ratio) # Equivalent to self @= source
+            if added is not None:
+                added[source] = added.get(source, 0) + ratio
+            enqueue(source.IOMap if isinstance(source, FactoryGroup) else _rates(source))
+            if tracer is not None:
+                tracer.event('iteration', start, material = material, source = source, ratio = ratio, iomap_size = len(self.IOMap))
+        return self
+
+def _check_supply(material: M.Material, ratio: float, steps: int):
+    'Raises an exception if the iterative solver is chasing a recipe cycle that consumes more than it produces, as the linear solver would.'
+    if steps > MAX_SUPPLY_STEPS or not isfinite(ratio) or ratio > MAX_SUPPLY_RATIO:
+        raise MindustryException(f"Supplying {material.name} does not converge; it is part of a recipe cycle that consumes more than it produces.")
+
+def __getattr__(name: str):
+    # Loads the default catalog the first time one of its buildings, FACTORIES, GENERATORS or SOURCES is used. See Catalog.py.
+    if name == '__all__': # Asked for by from MindustryTools.Factories import *, which does not otherwise see the catalog's names
+        from MindustryTools.Catalog import default_catalog
+        default_catalog()
+        return [key for key in globals() if not key.startswith('_')]
+    if name.startswith('__'):
+        raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+    from MindustryTools.Catalog import default_catalog
+    names = default_catalog().exports()[__name__]
+    if name in names:
+        return names[name]
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
@@ -0,0 +1,207 @@
+from typing import Callable, Dict, Hashable, Iterable, List, Optional
+
+from MindustryTools.Factories import Factory
+import MindustryTools.Materials as M
+
+class RecipeGraph():
+    '''
+    An index of the factories that produce and consume each material, kept up to date as factories are registered.
+
+    A material depends on every material consumed by any of its producers, including power. The graph keeps the materials in dependency order, with each material before the materials it depends on (downstream first),
+    and groups materials that depend on each other into strongly connected components. In Serpulo, power is in a component with the fuels and coolants of the generators that make it.
+    Planners can supply materials in this order, so that each material is only supplied once outside of cycles.
+
+    Registering a factory only adds its own edges. The order is kept as long as the new edges agree with it, which is the usual case for new recipes (a new product goes first, a new raw material last), and is otherwise recomputed the next time it is used.
+
+    Attributes:
+        producers (Dict[M.Material, List[Factory]]): The factories that produce each material, in the order they were registered (the most advanced last). Power is produced by every factory that generates it.
+        consumers (Dict[M.Material, List[Factory]]): The factories that consume each material, including power.
+        factories (Dict[int, Factory]): Every registered factory, by id.
+        version (int): Incremented whenever a factory is registered, so that anything computed from the graph can tell when it is out of date.
+    '''
+    def __init__(self, factories: Iterable[Factory] = ()):
+        self.producers = {M.POWER: []}
+        self.consumers = {M.POWER: []}
+        self.factories = {}
+        self.version = 0
+        self._ranks = {} # material: the position of its component in the order
+        self._components = None # rank: the materials of the component, or None if the order must be recomputed
+        for factory in factories:
+            self.register_factory(factory)
+
+    def register_factory(self, factory: Factory):
+        '''
+        Add a factory to the graph. A factory with the same id as a registered one replaces it, keeping its position.
+
+        Args:
+            factory (Factory): The factory to add.
+        '''
+        previous = self.factories.get(factory.id)
+        self.factories[factory.id] = factory
+        if previous is not None:
+            for index in (self.producers, self.consumers):
+                for factories in index.values():
+                    factories[:] = [factory if entry is previous else entry for entry in factories]
+            if set(_consumed(previous)) != set(_consumed(factory)) or set(_produced(previous)) != set(_produced(factory)):
+                self._components = None
+            self.version += 1
+            return
+
+        produced, consumed = _produced(factory), _consumed(factory)
+        for material in produced:
+            self.producers.setdefault(material, []).append(factory)
+        for material in consumed:
+            self.consumers.setdefault(material, []).append(factory)
+        self.version += 1
+        if self._components is not None:
+            self._extend(produced, consumed)
+
+    def including(self, factories: Iterable[Factory]) -> 'RecipeGraph':
+        '''
+        Get a graph that also includes the given factories. Returns this graph if they are all registered already, and otherwise a copy.
+
+        Args:
+            factories (Iterable[Factory]): The factories to include.
+
+        Returns:
+            RecipeGraph: The graph.
+        '''
+        missing = [factory for factory in factories if self.factories.get(factory.id) is not factory]
+        if not missing:
+            return self
+        graph = RecipeGraph.__new__(RecipeGraph)
+        graph.producers = {material: list(factories) for material, factories in self.producers.items()}
+        graph.consumers = {material: list(factories) for material, factories in self.consumers.items()}
+        graph.factories = dict(self.factories)
+        graph.version = self.version
+        graph._ranks = dict(self._ranks)
+        graph._components = None if self._components is None else {rank: list(members) for rank, members in self._components.items()}
+        for factory in missing:
+            graph.register_factory(factory)
+        return graph
+
+    def rank(self, material: M.Material) -> Optional[int]:
+        '''
+        The position of a material's component in the order. Materials in the same component share a rank, and a material always has a lower rank than the materials it depends on.
+
+        Returns:
+            int: The rank, or None if the material is not in the graph.
+        '''
+        if self._components is None:
+            self._rebuild()
+        return self._ranks.get(material)
+
+    def components(self) -> List[List[M.Material]]:
+        '''
+        The strongly connected components of the graph, in dependency order (downstream first).
+        A component with more than one material is a cycle, whose materials cannot be supplied one at a time.
+
+        Returns:
+            List[List[M.Material]]: The components.
+        '''
+        if self._components is None:
+            self._rebuild()
+        return [list(self._components[rank]) for rank in sorted(self._components)]
+
+    def order(self) -> List[M.Material]:
+        '''
+        Every material in the graph, in dependency order (downstream first). Materials in the same component are adjacent.
+
+        Returns:
+            List[M.Material]: The materials.
+        '''
+        return [material for component in self.components() for material in component]
+
+    def cycles(self) -> List[List[M.Material]]:
+        'The components with more than one material, or a material that its own producers consume.'
+        return [component for component in self.components() if len(component) > 1 or any(component[0] in _consumed(factory) for factory in self.producers.get(component[0], []))]
+
+    def dependencies(self, material: M.Material) -> List[M.Material]:
+        'The materials consumed by the producers of a material.'
+        return list(dict.fromkeys(input for factory in self.producers.get(material, []) for input in _consumed(factory)))
+
+    def _extend(self, produced: List[M.Material], consumed: List[M.Material]):
+        'Updates the order for a new factory, or marks it to be recomputed if the new edges disagree with it.'
+        ranks = self._ranks
+        new_products = [material for material in produced if material not in ranks]
+        new_inputs = [material for material in consumed if material not in ranks]
+        if set(new_products) & set(new_inputs):
+            self._components = None
+            return
+        first = min(self._components, default = 0)
+        last = max(self._components, default = -1)
+        for material in new_products: # Nothing depends on a new material yet, so it can go first
+            first -= 1
+            ranks[material] = first
+            self._components[first] = [material]
+        for material in new_inputs: # A new material depends on nothing yet, so it can go last
+            last += 1
+            ranks[material] = last
+            self._components[last] = [material]
+        if any(ranks[output] > ranks[input] for output in produced for input in consumed):
+            self._components = None
+
+    def _rebuild(self):
+        'Recomputes the components and their order.'
+        materials = list(dict.fromkeys([*self.producers, *self.consumers]))
+        found = _strongly_connected(materials, self.dependencies)
+        # Tarjan's algorithm finds each component after everything it depends on
+        self._components = {rank: component for rank, component in enumerate(reversed(found))}
+        self._ranks = {material: rank for rank, component in self._components.items() for material in component}
+
+    def __repr__(self):
+        return f'RecipeGraph({len(self.factories)} factories, {len(self._ranks) if self._components is not None else len(set(self.producers) | set(self.consumers))} materials)'
+
+def _produced(factory: Factory) -> List[M.Material]:
+    'The materials a factory produces, including power.'
+    return list(factory.outputs) + ([M.POWER] if factory.power > 0 else [])
+
+def _consumed(factory: Factory) -> List[M.Material]:
+    'The materials a factory consumes, including power.'
+    return list(factory.inputs) + ([M.POWER] if factory.power < 0 else [])
+
+def _strongly_connected(nodes: Iterable[Hashable], edges: Callable[[Hashable], Iterable[Hashable]]) -> List[List[Hashable]]:
+    '''
+    Finds the strongly connected components of a graph, with an iterative version of Tarjan's algorithm.
+
+    Args:
+        nodes (Iterable[Hashable]): The nodes to start from. Nodes reached from them are included too.
+        edges (Callable[[Hashable], Iterable[Hashable]]): The nodes each node points to.
+
+    Returns:
+        List[List[Hashable]]: The components, each after every component it points to, and each listing its nodes in the order they were reached.
+    '''
+    index, lowlink, on_stack, stack, found = {}, {}, set(), [], []
+    for root in nodes:
+        if root in index:
+            continue
+        work = [(root, iter(edges(root)))]
+        index[root] = lowlink[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        while work:
+            node, children = work[-1]
+            for child in children:
+                if child not in index:
+                    index[child] = lowlink[child] = len(index)
+                    stack.append(child)
+                    on_stack.add(child)
+                    work.append((child, iter(edges(child))))
+                    break
+                if child in on_stack:
+                    lowlink[node] = min(lowlink[node], index[child])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+                if lowlink[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    found.append(component[::-1])
+    return found
@@ -0,0 +1,181 @@
+from typing import Dict, Iterable, Optional, Sequence
+
+import numpy as np
+
+from MindustryTools.MindustryObject import MindustryException, REGISTRY
+from MindustryTools.Collectors import Collector, Drill
+import MindustryTools.Materials as M
+
+EMPTY = -1 # The value of a tile with no ore
+
+class OreGrid():
+    '''
+    A 2-D map of the ore (or liquid) on each tile, for finding how fast collectors would gather at every position.
+
+    Tiles hold the REGISTRY index of their material, or EMPTY. A summed-area table of each material is built the first time it is needed,
+    so the number of its tiles under a collector at any position is found with four lookups, however large the collector or the map.
+
+    Positions are the top left tile of a collector: a collector of size s at (row, column) covers tiles[row:row + s, column:column + s].
+    Maps for a collector of size s therefore have shape (rows - s + 1, columns - s + 1).
+
+    Args:
+        tiles (np.ndarray): The material index of each tile, or EMPTY.
+
+    Attributes:
+        tiles (np.ndarray): The material index of each tile, or EMPTY.
+        materials (List[M.Material]): The materials found on the map.
+    '''
+    def __init__(self, tiles: np.ndarray):
+        self.tiles = np.asarray(tiles, dtype=np.int32)
+        if self.tiles.ndim != 2:
+            raise MindustryException(f"An ore grid must be 2-D, not {self.tiles.ndim}-D.")
+        indexes = np.unique(self.tiles)
+        indexes = indexes[indexes != EMPTY]
+        if len(indexes) and (indexes.min() < 0 or indexes.max() >= len(REGISTRY.materials)):
+            raise MindustryException("The ore grid contains tiles that are not material indexes.")
+        self.materials = [REGISTRY.materials[int(index)] for index in indexes]
+        self._tables = {}
+
+    @classmethod
+    def from_materials(cls, rows: Sequence[Sequence[Optional[M.Material]]]) -> 'OreGrid':
+        '''
+        Build an ore grid from rows of materials.
+
+        Args:
+            rows (Sequence[Sequence[M.Material]]): The material on each tile, or None for no ore.
+
+        Returns:
+            OreGrid: The grid.
+        '''
+        return cls(np.array([[EMPTY if material is None else material.index for material in row] for row in rows], dtype=np.int32).reshape(len(rows), -1))
+
+    @property
+    def shape(self):
+        return self.tiles.shape
+
+    def table(self, material: M.Material) -> np.ndarray:
+        '''
+        The summed-area table of a material: entry [r, c] is the number of its tiles above and to the left of tile (r, c), with a leading row and column of zeros.
+
+        Returns:
+            np.ndarray: The table, of shape (rows + 1, columns + 1).
+        '''
+        table = self._tables.get(material.index)
+        if table is None:
+            table = self._tables[material.index] = np.zeros((self.shape[0] + 1, self.shape[1] + 1), dtype=np.int32)
+            np.cumsum(np.cumsum(self.tiles == material.index, axis=0, dtype=np.int32), axis=1, out=table[1:, 1:])
+        return table
+
+    def counts(self, material: M.Material, size: int) -> np.ndarray:
+        '''
+        The number of tiles of a material under a square of the given size, at every position.
+
+        Args:
+            material (M.Material): The material.
+            size (int): The length of one side of the square.
+
+        Returns:
+            np.ndarray: The tile counts, of shape (rows - size + 1, columns - size + 1).
+        '''
+        if size > self.shape[0] or size > self.shape[1]:
+            return np.zeros((max(self.shape[0] - size + 1, 0), max(self.shape[1] - size + 1, 0)), dtype=np.int32)
+        table = self.table(material)
+        return table[size:, size:] - table[:-size, size:] - table[size:, :-size] + table[:-size, :-size]
+
+    def throughput(self, collector: Collector, boosted: bool = False) -> 'ThroughputMap':
+        '''
+        How fast a collector would gather at every position.
+        Like in-game, a collector gathers the material with the most tiles under it, out of those it can collect (so drills ignore ore that is too hard). Ties go to the material with the highest index.
+
+        Args:
+            collector (Collector): The drill or pump.
+            boosted (bool): Whether drills are boosted with water. Defaults to False.
+
+        Returns:
+            ThroughputMap: The rate, material and tile count at every position.
+        '''
+        if boosted and isinstance(collector, Drill) and not collector.boosted:
+            collector = collector.variant(boosted = True)
+        size = collector.size
+        shape = (max(self.shape[0] - size + 1, 0), max(self.shape[1] - size + 1, 0))
+        candidates = [material for material in reversed(self.materials) if collector.can_collect(material)]
+        if not candidates:
+            return ThroughputMap(collector, np.zeros(shape), np.full(shape, EMPTY, dtype=np.int32), np.zeros(shape, dtype=np.int32))
+
+        counts = np.stack([self.counts(material, size) for material in candidates])
+        best = np.argmax(counts, axis=0)
+        tiles = np.take_along_axis(counts, best[None], axis=0)[0]
+        per_tile = np.array([collector.get_speed(material, tiles = 1) for material in candidates]) # Speed is proportional to the tile count
+        indexes = np.array([material.index for material in candidates], dtype=np.int32)
+        present = tiles > 0
+        return ThroughputMap(collector, np.where(present, per_tile[best] * tiles, 0.0), np.where(present, indexes[best], EMPTY), tiles)
+
+    def throughput_maps(self, collectors: Optional[Iterable[Collector]] = None, boosted: bool = False) -> Dict[Collector, 'ThroughputMap']:
+        '''
+        How fast each collector would gather at every position. See throughput().
+
+        Args:
+            collectors (Iterable[Collector], optional): The collectors. Defaults to every drill in DRILLS and pump in PUMPS.
+            boosted (bool): Whether drills are boosted with water. Defaults to False.
+
+        Returns:
+            Dict[Collector, ThroughputMap]: The map of each collector.
+        '''
+        if collectors is None:
+            import MindustryTools.Collectors as C
+            collectors = [*C.DRILLS.values(), *C.PUMPS.values()]
+        return {collector: self.throughput(collector, boosted) for collector in collectors}
+
+    def __repr__(self):
+        return f"OreGrid({self.shape[0]}x{self.shape[1]}, {', '.join(material.name for material in self.materials)})"
+
+def throughput_maps(tiles: np.ndarray | OreGrid, collectors: Optional[Iterable[Collector]] = None, boosted: bool = False) -> Dict[Collector, 'ThroughputMap']:
+    '''
+    How fast each collector would gather at every position of a map. See OreGrid.throughput().
+
+    Args:
+        tiles (np.ndarray | OreGrid): The REGISTRY index of the material on each tile (or EMPTY), or an ore grid.
+        collectors (Iterable[Collector], optional): The collectors. Defaults to every drill in DRILLS and pump in PUMPS.
+        boosted (bool): Whether drills are boosted with water. Defaults to False.
+
+    Returns:
+        Dict[Collector, ThroughputMap]: The map of each collector.
+    '''
+    grid = tiles if isinstance(tiles, OreGrid) else OreGrid(tiles)
+    return grid.throughput_maps(collectors, boosted)
+
+class ThroughputMap():
+    '''
+    How fast one collector would gather at every position of an ore grid. See OreGrid.throughput().
+
+    Attributes:
+        collector (Collector): The collector, boosted if the map is.
+        rates (np.ndarray): The rate the collector would gather at each position, in materials / second.
+        materials (np.ndarray): The REGISTRY index of the material it would gather at each position, or EMPTY.
+        tiles (np.ndarray): The number of tiles of that material under it at each position.
+    '''
+    def __init__(self, collector: Collector, rates: np.ndarray, materials: np.ndarray, tiles: np.ndarray):
+        self.collector = collector
+        self.rates = rates
+        self.materials = materials
+        self.tiles = tiles
+
+    def material(self, row: int, column: int) -> Optional[M.Material]:
+        'The material gathered at a position, or None.'
+        index = int(self.materials[row, column])
+        return None if index == EMPTY else REGISTRY.materials[index]
+
+    def best(self, material: Optional[M.Material] = None) -> tuple:
+        '''
+        The position with the highest rate, optionally only where a given material is gathered.
+
+        Returns:
+            tuple: The (row, column) of the position, or None if the collector gathers nothing there.
+        '''
+        rates = self.rates if material is None else np.where(self.materials == material.index, self.rates, 0)
+        if not rates.size or rates.max() <= 0:
+            return None
+        return tuple(int(index) for index in np.unravel_index(np.argmax(rates), rates.shape))
+
+    def __repr__(self):
+        return f'ThroughputMap({self.collector.name}, {self.rates.shape[0]}x{self.rates.shape[1]}, best {self.rates.max(initial=0):.3g}/s)'
@@ -1,7 +1,7 @@
 from dataclasses import dataclass, field
 from typing import List
 
-from .MindustryObject import MindustryObject, Building
+from .MindustryObject import MindustryObject, Building, REGISTRY
 
 @dataclass(frozen=True)
 class Material(MindustryObject):
@@ -25,6 +25,8 @@ class Material(MindustryObject):
     sources: List[Building] = field(default_factory=list)
     source: Building = None
 
+    _interner = REGISTRY.materials
+
     # def set_source(self, source: Building) -> None:
     #     '''
     #     Set the preferred source of the material.
@@ -36,39 +38,25 @@ class Material(MindustryObject):
     #         self.sources.append(source)
     #     self.source = source
     
-    def __hash__(self):
-        return hash(self.id)
-    
-    def __eq__(self, other):
-        return isinstance(other, Material) and self.id == other.id
-
     def __str__(self):
         return self.name
     
     def __repr__(self):
         return self.name
 
+# Power is built in, as every catalog uses it. All other materials come from the catalog (see Catalog.py).
 POWER = Material(name='Power', id=0)
-COPPER = Material(name='Copper', id=1, hardness=1, is_natural=True)
-LEAD = Material(name='Lead', id=1, hardness=1, is_natural=True)
-GRAPHITE = Material(name='Graphite', id=2)
-SILICON = Material(name='Silicon', id=3)
-COAL = Material(name='Coal', id=4, hardness=2, is_natural=True)
-SAND = Material(name='Sand', id=5, hardness=0, is_natural=True)
-METAGLASS = Material(name='Metaglass', id=6)
-TITANIUM = Material(name='Titanium', id=7, hardness=3, is_natural=True)
-PLASTANIUM = Material(name='Plastanium', id=8)
-THORIUM = Material(name='Thorium', id=9, hardness=4, is_natural=True)
-PHASE_FABRIC = Material(name='Phase_fabric', id=10)
-SURGE_ALLOY = Material(name='Surge_alloy', id=11)
-SCRAP = Material(name='Scrap', id=12, hardness=0, is_natural=True)
-SPORE_POD = Material(name='Spore_pod', id=13)
-PYRATITE = Material(name='Pyratite', id=14)
-BLAST_COMPOUND = Material(name='Blast_compound', id=15)
-
-WATER = Material(name='Water', id=16, is_liquid=True, is_natural=True)
-SLAG = Material(name='Slag', id=17, is_liquid=True)
-OIL = Material(name='Oil', id=18, is_liquid=True, is_natural=True)
-CRYOFLUID = Material(name='Cryofluid', id=19, is_liquid=True)
 
-MATERIALS = [COPPER, LEAD, GRAPHITE, SILICON, COAL, SAND, METAGLASS, TITANIUM, PLASTANIUM, THORIUM, PHASE_FABRIC, SURGE_ALLOY, SCRAP, SPORE_POD, PYRATITE, BLAST_COMPOUND, WATER, SLAG, OIL, CRYOFLUID]
\ No newline at end of file
+def __getattr__(name: str):
+    # Loads the default catalog the first time one of its materials is used
+    if name == '__all__': # Asked for by from MindustryTools.Materials import *, which does not otherwise see the catalog's names
+        from MindustryTools.Catalog import default_catalog
+        default_catalog()
+        return [key for key in globals() if not key.startswith('_')]
+    if name.startswith('__'):
+        raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+    from MindustryTools.Catalog import default_catalog
+    names = default_catalog().exports()[__name__]
+    if name in names:
+        return names[name]
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
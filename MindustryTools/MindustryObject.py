@@ -1,31 +1,178 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
+from typing import List, Self
+
+class Interner():
+    '''
+    Gives each object of one kind (materials or buildings) a unique, dense integer index, in the order they are first created.
+    Objects with the same id share an index, so they compare equal and can be looked up by id, name or index in constant time.
+
+    Attributes:
+        kind (str): The kind of object, used in error messages.
+        items (List[MindustryObject]): The first object created with each index, in index order.
+    '''
+    def __init__(self, kind: str):
+        self.kind = kind
+        self.items = []
+        self._keys = {}
+        self._ids = {}
+        self._names = {}
+
+    def intern(self, item: 'MindustryObject') -> int:
+        '''
+        Get the index of an object, adding it if it is new.
+
+        Args:
+            item (MindustryObject): The object to intern.
+
+        Returns:
+            int: The index of the object.
+
+        Raises:
+            MindustryException: If a different object already uses the same id.
+        '''
+        key = item._intern_key()
+        index = self._keys.get(key)
+        if index is None:
+            existing = self._ids.get(item.id)
+            if existing is not None and existing.name != item.name:
+                raise MindustryException(f"{self.kind.capitalize()} id {item.id} is already used by {existing.name}, so cannot be used by {item.name}.")
+            index = self._keys[key] = len(self.items)
+            self.items.append(item)
+            self._ids.setdefault(item.id, item)
+            self._names.setdefault(item.name, item)
+        return index
+
+    def by_id(self, id) -> 'MindustryObject':
+        'Get the object with the given id. Raises a KeyError if there is none.'
+        return self._ids[id]
+
+    def by_name(self, name: str) -> 'MindustryObject':
+        'Get the object with the given name. Raises a KeyError if there is none.'
+        return self._names[name]
+
+    def __getitem__(self, index: int) -> 'MindustryObject':
+        return self.items[index]
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+class Registry():
+    '''
+    The registry of every material and building that has been created.
+    Array-backed engines, serializers and caches use the indexes it assigns as stable positions.
+
+    Attributes:
+        materials (Interner): All materials.
+        buildings (Interner): All buildings.
+    '''
+    def __init__(self):
+        self.materials = Interner('material')
+        self.buildings = Interner('building')
+
+REGISTRY = Registry()
+VARIANTS = {} # (class, id, variant field values): the shared instance of each building variant. See Building.variant().
 
 @dataclass(frozen=True)
 class MindustryObject:
     '''
     The base for all mindustry objects.
+    Every object is interned in the REGISTRY when it is created, and is hashed and compared by the index it is given.
 
     Attributes:
         id (str): The id of the object, as given by the keyboard shortcuts in-game (no leading zeros)
         name (str): The object name
+        index (int): The unique index of the object in the REGISTRY. Set automatically.
     '''
     id: str
     name: str
 
+    _interner = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Otherwise @dataclass generates a field-by-field __eq__ and __hash__ for every subclass
+        if '__eq__' not in cls.__dict__:
+            cls.__eq__ = MindustryObject.__eq__
+        if '__hash__' not in cls.__dict__:
+            cls.__hash__ = MindustryObject.__hash__
+
+    def __post_init__(self):
+        if self._interner is not None:
+            object.__setattr__(self, 'index', self._interner.intern(self))
+
+    def _intern_key(self):
+        'Objects with the same key share an index.'
+        return self.id
+
+    def __hash__(self):
+        return hash(self.index)
+
+    def __eq__(self, other):
+        return isinstance(other, MindustryObject) and self._interner is other._interner and self.index == other.index
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop('index', None) # Indexes are only valid within one process
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        MindustryObject.__post_init__(self) # Only re-intern; subclasses may have already adjusted the state
+
 @dataclass(frozen=True)
 class Building(MindustryObject):
     '''
-    The base for any Mindustry building. This includes collectors, factories, and power generators.    
+    The base for any Mindustry building. This includes collectors, factories, and power generators.
 
     Attributes:
         power (int): The amount of power the building consumes.
         size (int): The size of the building, given as the length of one side (all buildings are square).
     '''
     power: int
-    size: int 
+    size: int
 
-    def __hash__(self):
-        return self.id
+    _interner = REGISTRY.buildings
+    _variant_fields = () # Fields that change what the building does, such as efficiency. Each combination of their values is a separate variant, with its own index.
+
+    def _intern_key(self):
+        if not self._variant_fields:
+            return self.id
+        return (self.id, *(getattr(self, name) for name in self._variant_fields))
+
+    def variant(self, **changes) -> Self:
+        '''
+        Get this building with different values of its variant fields, such as efficiency or boosted.
+        Each variant is only created once, and then shared: asking for it again is a dictionary lookup, and does not scale its rates again.
+
+            >>> SurgeSmelter().variant(efficiency = 0.5) is SurgeSmelter().variant(efficiency = 0.5)
+            True
+
+        Args:
+            **changes: The new value of each variant field.
+
+        Returns:
+            Building: The variant.
+
+        Raises:
+            MindustryException: If a field is not a variant field of this building.
+        '''
+        for name in changes:
+            if name not in self._variant_fields:
+                raise MindustryException(f"{name} is not a variant field of {self.name}; use one of {list(self._variant_fields)}.")
+        values = tuple(changes.get(name, getattr(self, name)) for name in self._variant_fields)
+        key = (type(self), self.id, values)
+        variant = VARIANTS.get(key)
+        if variant is None:
+            same = all(value == getattr(self, name) for name, value in zip(self._variant_fields, values))
+            variant = VARIANTS.setdefault(key, self if same else self._vary(**changes))
+        return variant
+
+    def _vary(self, **changes) -> Self:
+        'A new instance with different variant fields. Overridden by buildings whose other fields are derived from them.'
+        return replace(self, **changes)
 
 class MindustryException(Exception):
     '''
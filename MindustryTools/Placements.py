@@ -0,0 +1,172 @@
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from MindustryTools.Collectors import Collector, Drill
+from MindustryTools.Factories import FactoryGroup
+from MindustryTools.Maps import OreGrid, EMPTY
+import MindustryTools.Materials as M
+
+@dataclass(frozen=True)
+class Placement:
+    '''
+    A collector placed on an ore grid.
+
+    Attributes:
+        collector (Collector): The drill or pump, boosted if the placement is.
+        row (int): The row of its top left tile.
+        column (int): The column of its top left tile.
+        material (M.Material): The material it gathers.
+        rate (float): The rate it gathers at, in materials / second.
+    '''
+    collector: Collector
+    row: int
+    column: int
+    material: M.Material
+    rate: float
+
+# The cost of one collector for each objective of place_collectors(). Every collector costs at least 1, so collectors that need no power are not free.
+COSTS = {
+    'buildings': lambda collector: 1.0,
+    'power': lambda collector: 1.0 + max(0, -collector.power),
+}
+
+def place_collectors(tiles: np.ndarray | OreGrid, targets: Dict[M.Material, float], collectors: Optional[Iterable[Collector]] = None, objective: str = 'buildings',
+                     boosted: bool = False, tile_size: int = 128, processes: Optional[int] = None, executor: Optional[Executor] = None) -> Tuple[List[Placement], FactoryGroup]:
+    '''
+    Places non-overlapping collectors on a map to gather target rates of materials, using as few buildings (or as little power) as possible.
+
+    The map is split into square tiles, which are solved in parallel: each tile greedily places the collectors that gather the most per unit of cost, until it alone could meet the targets.
+    The results are then merged, again best first, skipping placements that overlap one placed by a neighbouring tile across the border, until the targets are met.
+    If the border conflicts leave a target short, the rest of the map is searched again for it. If the map cannot supply a target, as much of it as possible is placed.
+
+    Args:
+        tiles (np.ndarray | OreGrid): The REGISTRY index of the material on each tile (or EMPTY), or an ore grid.
+        targets (Dict[M.Material, float]): The rate of each material to gather, in materials / second.
+        collectors (Iterable[Collector], optional): The collectors that may be used. Defaults to every drill in DRILLS and pump in PUMPS.
+        objective (str): What to minimize: 'buildings' (the number of collectors) or 'power' (the power they draw). Defaults to 'buildings'.
+        boosted (bool): Whether drills are boosted with water. Defaults to False.
+        tile_size (int): The length of one side of each tile. Defaults to 128.
+        processes (int, optional): The number of worker processes. Defaults to one per CPU. Maps that fit in one tile are solved in this process.
+        executor (Executor, optional): An executor to solve the tiles with, instead of a new process pool.
+
+    Returns:
+        Tuple[List[Placement], FactoryGroup]: The placements, and a factory group of the rates they gather, the power they draw and the water they use if boosted.
+    '''
+    grid = tiles if isinstance(tiles, OreGrid) else OreGrid(tiles)
+    if collectors is None:
+        import MindustryTools.Collectors as C
+        collectors = [*C.DRILLS.values(), *C.PUMPS.values()]
+    if objective not in COSTS:
+        raise ValueError(f"Unknown objective '{objective}'; use one of {list(COSTS)}.")
+    collectors = [collector.variant(boosted = True) if boosted and isinstance(collector, Drill) and not collector.boosted else collector for collector in collectors]
+    targets = {material: rate for material, rate in targets.items() if rate > 0}
+    if not targets or not collectors:
+        return [], FactoryGroup()
+
+    # Tiles are sent as compact local codes, as REGISTRY indexes are only valid within one process
+    materials = grid.materials
+    codes = np.full(grid.shape, EMPTY, dtype=np.int16)
+    for code, material in enumerate(materials):
+        codes[grid.tiles == material.index] = code
+    needed = {materials.index(material): rate for material, rate in targets.items() if material in materials}
+
+    halo = max(collector.size for collector in collectors) - 1 # Collectors may reach past the edge of the tile they are placed from
+    jobs = [(codes[row:row + tile_size + halo, column:column + tile_size + halo], row, column, tile_size, materials, collectors, needed, objective)
+            for row in range(0, grid.shape[0], tile_size) for column in range(0, grid.shape[1], tile_size)]
+    if not needed:
+        found = []
+    elif executor is not None:
+        found = [placement for result in executor.map(_place_tile, jobs) for placement in result]
+    elif len(jobs) == 1 or processes == 1:
+        found = [placement for job in jobs for placement in _place_tile(job)]
+    else:
+        with ProcessPoolExecutor(max_workers = processes) as pool:
+            found = [placement for result in pool.map(_place_tile, jobs) for placement in result]
+
+    # Merge the tiles, best first, dropping placements that overlap across borders
+    occupied = np.zeros(grid.shape, dtype=bool)
+    remaining = dict(needed)
+    placed = _select(sorted(found, reverse = True), collectors, occupied, remaining)
+    if any(rate > 1e-9 for rate in remaining.values()):
+        short = {code: rate for code, rate in remaining.items() if rate > 1e-9}
+        placed += _select(_candidates(codes, materials, collectors, short, objective, grid.shape), collectors, occupied, remaining)
+
+    placements = [Placement(collectors[collector], row, column, materials[code], rate) for score, row, column, collector, code, rate in placed]
+    summary = {}
+    for placement in placements:
+        summary[placement.material] = summary.get(placement.material, 0) + placement.rate
+        summary[M.POWER] = summary.get(M.POWER, 0) + placement.collector.power
+        if isinstance(placement.collector, Drill) and placement.collector.boosted:
+            summary[M.WATER] = summary.get(M.WATER, 0) - placement.collector.water_intake
+    return placements, FactoryGroup(materials = {material: rate for material, rate in summary.items() if rate != 0})
+
+def _place_tile(job: tuple) -> List[tuple]:
+    '''
+    Greedily places collectors in one tile, until they gather every target on their own. Runs in a worker process.
+
+    Returns:
+        List[tuple]: (score, row, column, collector position, material code, rate) for each placement, with the row and column on the whole map.
+    '''
+    codes, row, column, tile_size, materials, collectors, needed, objective = job
+    candidates = _candidates(codes, materials, collectors, needed, objective, (tile_size, tile_size))
+    placed = _select(candidates, collectors, np.zeros(codes.shape, dtype=bool), dict(needed))
+    return [(score, row + r, column + c, collector, code, rate) for score, r, c, collector, code, rate in placed]
+
+def _candidates(codes: np.ndarray, materials: List[M.Material], collectors: List[Collector], needed: Dict[int, float], objective: str, limit: Tuple[int, int]) -> List[tuple]:
+    '''
+    Every position where a collector would gather a needed material, best first. Only positions whose top left tile is within limit are included.
+
+    Args:
+        codes (np.ndarray): The position in materials of the material on each tile, or EMPTY.
+        materials (List[M.Material]): The materials on the map.
+
+    Returns:
+        List[tuple]: (score, row, column, collector position, material code, rate), where score is the rate per unit of cost.
+    '''
+    indexes = np.array([material.index for material in materials] + [EMPTY], dtype=np.int32) # codes of EMPTY (-1) pick the last entry
+    grid = OreGrid(indexes[codes])
+    to_code = np.full(max(indexes.max(initial = 0) + 2, 1), EMPTY, dtype=np.int32) # to_code[-1] is EMPTY
+    for code in needed:
+        to_code[materials[code].index] = code # Materials that are not needed map to EMPTY
+    cost = COSTS[objective]
+
+    found = []
+    for position, collector in enumerate(collectors):
+        throughput = grid.throughput(collector)
+        rates = throughput.rates[:limit[0], :limit[1]]
+        gathered = to_code[throughput.materials[:limit[0], :limit[1]]]
+        rows, columns = np.nonzero((gathered != EMPTY) & (rates > 0))
+        found.append((rates[rows, columns] / cost(collector), rows, columns, np.full(len(rows), position), gathered[rows, columns], rates[rows, columns]))
+    scores, rows, columns, positions, gathered, rates = (np.concatenate(values) for values in zip(*found))
+    order = np.lexsort((columns, rows, -scores)) # Best first, then top to bottom and left to right
+    return list(zip(scores[order].tolist(), rows[order].tolist(), columns[order].tolist(), positions[order].tolist(), gathered[order].tolist(), rates[order].tolist()))
+
+def _select(candidates: List[tuple], collectors: List[Collector], occupied: np.ndarray, remaining: Dict[int, float]) -> List[tuple]:
+    '''
+    Places candidates in order, skipping any that overlap an earlier placement or gather a material that is no longer needed.
+    Updates occupied and remaining in place.
+
+    Returns:
+        List[tuple]: The candidates that were placed.
+    '''
+    placed = []
+    left = sum(1 for rate in remaining.values() if rate > 1e-9)
+    for candidate in candidates:
+        if not left:
+            break
+        score, row, column, collector, code, rate = candidate
+        if remaining.get(code, 0) <= 1e-9:
+            continue
+        size = collectors[collector].size
+        footprint = occupied[row:row + size, column:column + size]
+        if footprint.any():
+            continue
+        footprint[:] = True
+        placed.append(candidate)
+        remaining[code] -= rate
+        if remaining[code] <= 1e-9:
+            left -= 1
+    return placed
@@ -0,0 +1,172 @@
+from heapq import heappush, heappop
+from itertools import count
+from math import floor, inf
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from MindustryTools.Factories import Factory, FactoryGroup, _rates
+import MindustryTools.Materials as M
+
+class IncrementalPlanner():
+    '''
+    Holds a resolved plan and updates it for small what-if changes, without solving it again from scratch.
+
+        >>> planner = IncrementalPlanner(FactoryGroup({SurgeSmelter(): 2}))
+        >>> plan, diff = planner.add(PlastaniumCompressor())
+        >>> plan, diff = planner.set_source(M.SILICON, SiliconCrucible())
+
+    Each change only visits the materials it touches and the parts of the plan upstream of them:
+        1. The change is applied: targets are added or removed, and the factories supplying a material whose source changed are removed.
+        2. Surpluses are trimmed, most downstream material first, by removing factories that only the plan added to supply them. Removing a factory frees its inputs, which are trimmed in turn.
+        3. Deficits are supplied with the iterative solver of get_upstream(), starting from the materials whose rates changed.
+    The plan is the same as get_upstream() would give for the new targets, except where rounding or cycles leave a choice of how to supply a material.
+
+    Args:
+        targets (FactoryGroup | Factory, optional): The factories and materials to plan for. Defaults to none.
+        sources (Dict[M.Material, Factory], optional): The source of each material, as for get_upstream(). A source of None leaves the material unsupplied.
+        rounded (bool | list): Whether to round the factories added to whole numbers, as for get_upstream(). Defaults to False.
+
+    Attributes:
+        targets (FactoryGroup): The factories and materials planned for.
+        plan (FactoryGroup): The targets and the factories that supply them. Updated in place by each change; copy it to keep an earlier plan.
+        upstream (Dict[Factory, float]): The count of each source the plan added to the targets.
+    '''
+    def __init__(self, targets: Optional[FactoryGroup | Factory] = None, sources: Optional[Dict[M.Material, Factory]] = None, rounded: bool | List[Factory] = False):
+        self.targets = FactoryGroup(factory_group = _as_group(targets)) if targets is not None else FactoryGroup()
+        self.sources = dict(sources or {})
+        self.rounded = rounded
+        self.upstream = {}
+        self.plan = FactoryGroup(factory_group = self.targets)
+        self.plan._supply(self.plan.IOMap, self.sources, rounded, added = self.upstream)
+
+    def add(self, other: FactoryGroup | Factory | M.Material, count: float = 1) -> Tuple[FactoryGroup, FactoryGroup]:
+        'Adds factories or materials to the targets. See apply().'
+        return self.apply(_as_group(other) * count)
+
+    def remove(self, other: FactoryGroup | Factory | M.Material, count: float = 1) -> Tuple[FactoryGroup, FactoryGroup]:
+        'Removes factories or materials from the targets. See apply().'
+        return self.apply(_as_group(other) * -count)
+
+    def set_source(self, material: M.Material, source: Optional[Factory]) -> Tuple[FactoryGroup, FactoryGroup]:
+        'Changes the source of a material, or leaves it unsupplied if the source is None. See apply().'
+        return self.apply(sources = {material: source})
+
+    def reset_source(self, material: M.Material) -> Tuple[FactoryGroup, FactoryGroup]:
+        'Returns a material to its default source. See apply().'
+        return self.apply(reset = [material])
+
+    def apply(self, delta: Optional[FactoryGroup | Factory | M.Material] = None, sources: Optional[Dict[M.Material, Factory]] = None,
+              reset: Iterable[M.Material] = ()) -> Tuple[FactoryGroup, FactoryGroup]:
+        '''
+        Applies a change to the targets and sources, and updates the plan to match.
+
+        Args:
+            delta (FactoryGroup | Factory | M.Material, optional): Added to the targets. Negative counts and rates remove them.
+            sources (Dict[M.Material, Factory], optional): New sources for materials. A source of None leaves the material unsupplied.
+            reset (Iterable[M.Material]): Materials to return to their default source.
+
+        Returns:
+            Tuple[FactoryGroup, FactoryGroup]: The plan, and the change to it: the factories added (positive) or removed (negative), and the change in each rate.
+        '''
+        plan, diff = self.plan, FactoryGroup()
+        touched = set()
+        if delta is not None:
+            delta = _as_group(delta)
+            self.targets._accumulate(delta)
+            plan._accumulate(delta)
+            diff._accumulate(delta, prune = False)
+            touched.update(delta.IOMap)
+
+        # Remove the factories that supplied a material whose source changed, as they may not be needed any more
+        reset = list(reset)
+        previous = {material: self._source(material) for material in [*(sources or {}), *reset]}
+        self.sources.update(sources or {})
+        for material in reset:
+            self.sources.pop(material, None)
+        for material, source in previous.items():
+            if source is not None and self._source(material) != source and self.upstream.get(source):
+                touched.update(self._change(source, -self.upstream[source], diff))
+
+        graph = self._graph()
+        touched.update(self._trim(touched, graph, diff))
+
+        added = {}
+        plan._supply(touched, self.sources, self.rounded, added = added)
+        for source, ratio in added.items():
+            self.upstream[source] = self.upstream.get(source, 0) + ratio
+            diff._accumulate(source, ratio, prune = False)
+
+        for factory in list(diff.factories):
+            if abs(diff.factories[factory]) < 1e-9:
+                del diff.factories[factory]
+            if abs(plan.factories.get(factory, 1)) < 1e-9:
+                del plan.factories[factory]
+        for source in [source for source, ratio in self.upstream.items() if ratio < 1e-9]:
+            del self.upstream[source]
+        diff.IOMap = {material: rate for material, rate in diff.IOMap.items() if abs(rate) >= 0.0001}
+        return plan, diff
+
+    def _source(self, material: M.Material) -> Optional[Factory]:
+        'The source _supply() would use for a material, or None if it is left unsupplied.'
+        if material in self.sources:
+            return self.sources[material]
+        from MindustryTools.Catalog import default_catalog
+        sources = default_catalog().sources.get(material)
+        return sources[-1] if sources else None
+
+    def _graph(self):
+        from MindustryTools.Catalog import default_catalog
+        return default_catalog().graph.including(source for source in self.sources.values() if isinstance(source, Factory))
+
+    def _change(self, source: Factory | FactoryGroup, ratio: float, diff: FactoryGroup) -> Dict[M.Material, float]:
+        'Adds a number of a source to the upstream of the plan, and returns the rates of one source.'
+        self.plan._accumulate(source, ratio)
+        diff._accumulate(source, ratio, prune = False)
+        self.upstream[source] = self.upstream.get(source, 0) + ratio
+        return source.IOMap if isinstance(source, FactoryGroup) else _rates(source)
+
+    def _trim(self, materials: Iterable[M.Material], graph, diff: FactoryGroup) -> set:
+        '''
+        Removes upstream sources of any surplus in the given materials, and in the inputs that removing them frees, most downstream material first.
+
+        Returns:
+            set: The materials whose rates changed.
+        '''
+        rounded = self.rounded
+        queued = count()
+        pending = []
+        touched = set()
+        def enqueue(materials):
+            for material in materials:
+                touched.add(material)
+                rank = graph.rank(material)
+                heappush(pending, (inf if rank is None else rank, -next(queued), material))
+        enqueue(materials)
+
+        while pending:
+            material = heappop(pending)[2]
+            surplus = self.plan.IOMap.get(material, 0)
+            source = self._source(material)
+            if surplus <= 0 or source is None or not self.upstream.get(source):
+                continue
+            rate = (source.IOMap if isinstance(source, FactoryGroup) else _rates(source)).get(material, 0)
+            if rate <= 0:
+                continue
+            ratio = min(self.upstream[source], surplus / rate)
+            if rounded is True or (rounded and source in rounded):
+                ratio = floor(ratio + 1e-9)
+            if ratio < 1e-9:
+                continue
+            enqueue(self._change(source, -ratio, diff))
+        return touched
+
+    def __repr__(self):
+        return f'IncrementalPlanner({len(self.plan.factories)} factories, {len(self.upstream)} upstream sources)'
+
+def _as_group(other: FactoryGroup | Factory | M.Material) -> FactoryGroup:
+    if isinstance(other, FactoryGroup):
+        return other
+    if isinstance(other, Factory):
+        return FactoryGroup([other])
+    if isinstance(other, M.Material):
+        return FactoryGroup(materials = [other])
+    raise TypeError(f"unsupported operand type: '{type(other)}'")
@@ -0,0 +1,242 @@
+'''
+Planning queries as JSON, and the mindustry-tools command that answers them in batches.
+
+Usage:
+    mindustry-tools [FILE ...] [--processes N] [--output FILE] [--cache DATABASE]
+    mindustry-tools --serve ADDRESS [--processes N] [--cache DATABASE]
+    python -m MindustryTools [FILE ...] ...
+
+Reads one query per line from the files (or stdin, or "-"), and writes one result per line, in the same order, as soon as it is ready.
+The catalog is loaded once, however many queries there are. With --serve, queries are answered over HTTP instead, by a long-running service: see the Service module.
+Each query is a JSON object with:
+    id: Any value, copied to the result. Defaults to the position of the query, counting from 1 and skipping blank lines.
+    building (str): A building to plan for, by name ("Surge Smelter") or class name ("SurgeSmelter").
+    count (float): The number of that building. Defaults to 1.
+    factories (Dict[str, float]): More buildings to plan for, and their counts.
+    materials (Dict[str, float]): Rates of materials to produce, in materials / second, by name ("Silicon") or key ("SILICON").
+    sources (Dict[str, str]): The source of a material, by building name, or null to leave it unsupplied.
+    rounded (bool | List[str]): Whether to round to whole buildings, or the names of the buildings to round. Defaults to false.
+    solver, objective, power (str): As for FactoryGroup.get_upstream().
+Each result has the id, the counts of the buildings and the rates of the materials in the plan (inputs are negative), and the seconds it took,
+or an error if the query could not be answered:
+
+    $ echo '{"building": "Surge Smelter", "count": 2, "rounded": true}' | mindustry-tools
+    {"id": 1, "counts": {"Surge Smelter": 2, ...}, "rates": {"Surge_alloy": 1.6, ...}, "seconds": 0.0004}
+'''
+import argparse
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Callable, Iterable, Iterator, List, Optional
+
+from MindustryTools.MindustryObject import MindustryException, REGISTRY
+from MindustryTools.Factories import Factory, FactoryGroup
+import MindustryTools.Materials as M
+
+QUERY_OPTIONS = ('solver', 'objective', 'power') # Passed to get_upstream() as they are
+
+def run_query(query: dict | str, number: Optional[int] = None) -> dict:
+    '''
+    Answers one planning query. See the module documentation for the format.
+
+    Args:
+        query (dict | str): The query, or its JSON.
+        number (int, optional): The id of the result if the query has none.
+
+    Returns:
+        dict: The result, which can be written as JSON. Errors are returned, not raised.
+    '''
+    start = time.perf_counter()
+    result = {} if number is None else {'id': number}
+    try:
+        if isinstance(query, str):
+            query = json.loads(query)
+        if not isinstance(query, dict):
+            raise MindustryException("A query must be a JSON object.")
+        if 'id' in query:
+            result['id'] = query['id']
+        plan = build_query(query).get_upstream(**_options(query))
+        result['counts'] = {factory.name: count for factory, count in plan.factories.items()}
+        result['rates'] = {material.name: rate for material, rate in plan.IOMap.items()}
+    except Exception as exception:
+        result['error'] = f'{type(exception).__name__}: {exception}'
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+def build_query(query: dict) -> FactoryGroup:
+    '''
+    The factory group a query plans for, before its upstream is added.
+
+    Raises:
+        MindustryException: If the query names no target, or an unknown building or material.
+    '''
+    group = FactoryGroup()
+    if 'building' in query:
+        group._accumulate(find_building(query['building']), query.get('count', 1))
+    for name, count in (query.get('factories') or {}).items():
+        group._accumulate(find_building(name), count)
+    for name, rate in (query.get('materials') or {}).items():
+        group._accumulate(find_material(name), -rate) # A rate to produce is a demand for the upstream to supply
+    if not group.factories and not group.IOMap:
+        raise MindustryException("The query has no building, factories or materials to plan for.")
+    return group
+
+def find_building(name: str) -> Factory:
+    '''
+    Find a building of the default catalog, or a registered one, by name or class name.
+
+    Raises:
+        MindustryException: If there is none.
+    '''
+    from MindustryTools.Catalog import default_catalog
+    catalog = default_catalog()
+    building = catalog.buildings.get(name)
+    if building is None:
+        try:
+            building = REGISTRY.buildings.by_name(name)
+        except KeyError:
+            raise MindustryException(f"Unknown building '{name}'")
+    return building
+
+def find_material(name: str) -> M.Material:
+    '''
+    Find a material by name or key.
+
+    Raises:
+        MindustryException: If there is none.
+    '''
+    from MindustryTools.Catalog import default_catalog
+    material = default_catalog().materials.get(name.upper().replace(' ', '_'))
+    if material is None:
+        try:
+            material = REGISTRY.materials.by_name(name)
+        except KeyError:
+            raise MindustryException(f"Unknown material '{name}'")
+    return material
+
+def iter_results(queries: Iterable[dict | str], processes: Optional[int] = 1, executor: Optional[Executor] = None, window: Optional[int] = None) -> Iterator[dict]:
+    '''
+    Answers queries in order, yielding each result as soon as it and every earlier result are ready.
+    Queries are read as they are needed, so an endless stream (such as stdin) is answered as it arrives.
+
+    Args:
+        queries (Iterable[dict | str]): The queries, or their JSON. They are numbered from 1, for the results of queries without an id.
+        processes (int, optional): The number of worker processes. With 1, queries are answered in this process. Defaults to 1.
+            With an executor, the number of workers it has, which the default window is based on.
+        executor (Executor, optional): An executor to answer queries with, instead of a new process pool.
+        window (int, optional): The most queries in progress at once. Defaults to four per worker.
+
+    Yields:
+        dict: The result of each query, in order.
+    '''
+    if executor is None and processes == 1:
+        yield from map(_run_numbered, enumerate(queries, 1))
+        return
+    pool = executor if executor is not None else ProcessPoolExecutor(max_workers = processes, initializer = _warm_up)
+    try:
+        yield from _ordered(pool, _run_numbered, enumerate(queries, 1), window or 4 * (processes or os.cpu_count() or 1))
+    finally:
+        if executor is None:
+            pool.shutdown(cancel_futures = True)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    'The mindustry-tools command. See the module documentation.'
+    parser = argparse.ArgumentParser(prog = 'mindustry-tools', description = 'Answer planning queries, one JSON object per line, streaming one JSON result per line in the same order.')
+    parser.add_argument('files', nargs = '*', default = ['-'], help = 'Files of queries. Defaults to stdin ("-").')
+    parser.add_argument('-p', '--processes', type = int, help = 'The number of worker processes. Results stay in order. Defaults to 1, or the number of CPUs with --serve.')
+    parser.add_argument('-o', '--output', help = 'A file to write results to, instead of stdout.')
+    parser.add_argument('--cache', help = 'An on-disk result cache to use, shared with other runs. See Caches.ResultCache.')
+    parser.add_argument('--serve', metavar = 'ADDRESS', help = 'Serve queries over HTTP at "host:port", or at the path of a Unix socket, until interrupted, instead of reading files.')
+    arguments = parser.parse_args(argv)
+    if arguments.serve:
+        from MindustryTools.Service import run_service
+        run_service(arguments.serve, arguments.processes, arguments.cache)
+        return 0
+    processes = arguments.processes or 1
+    for name in arguments.files:
+        if name != '-' and not os.path.isfile(name):
+            parser.error(f"no such file: '{name}'")
+
+    _warm_up(arguments.cache)
+    output = open(arguments.output, 'w') if arguments.output else sys.stdout
+    try:
+        queries = (line for line in _lines(arguments.files) if line.strip())
+        executor = ProcessPoolExecutor(max_workers = processes, initializer = _warm_up, initargs = (arguments.cache,)) if processes != 1 else None
+        try:
+            for result in iter_results(queries, processes, executor):
+                output.write(json.dumps(result) + '\n')
+                output.flush() # So that each result can be read as soon as it is ready
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures = True)
+    except KeyboardInterrupt:
+        return 130
+    except BrokenPipeError: # The reader stopped early, as with | head
+        sys.stdout = None
+        os.dup2(os.open(os.devnull, os.O_WRONLY), 1)
+        return 1
+    finally:
+        if arguments.output:
+            output.close()
+    return 0
+
+def _warm_up(cache: Optional[str] = None):
+    'Loads the catalog (and activates the cache) once, before the first query. Also run in each worker process.'
+    if cache:
+        from MindustryTools.Caches import use_cache
+        use_cache(cache)
+    from MindustryTools.Catalog import default_catalog
+    default_catalog()
+
+def _lines(files: List[str]) -> Iterator[str]:
+    for name in files:
+        file = sys.stdin if name == '-' else open(name)
+        try:
+            yield from file
+        finally:
+            if file is not sys.stdin:
+                file.close()
+
+def _run_numbered(item: tuple) -> dict:
+    return run_query(item[1], item[0])
+
+def _ordered(executor: Executor, function: Callable, items: Iterable, window: int) -> Iterator[Any]:
+    '''
+    Maps a function over items with an executor, yielding the results in order, with at most about window items in progress.
+    The items are read in another thread, so that results are yielded while waiting for the next item, such as a line of stdin.
+    '''
+    futures = queue.Queue(window)
+    stopped = threading.Event()
+    def feed():
+        try:
+            for item in items:
+                if stopped.is_set():
+                    return
+                futures.put(executor.submit(function, item))
+        except BaseException as exception: # Raised again when its place is reached
+            futures.put(exception)
+        finally:
+            futures.put(None)
+    threading.Thread(target = feed, daemon = True).start()
+    try:
+        while (future := futures.get()) is not None:
+            if isinstance(future, BaseException):
+                raise future
+            yield future.result()
+    finally:
+        stopped.set()
+        while not futures.empty(): # Lets the feeder finish if it is waiting for room
+            futures.get_nowait()
+
+def _options(query: dict) -> dict:
+    'The keyword arguments of get_upstream() for a query.'
+    options = {name: query[name] for name in QUERY_OPTIONS if name in query}
+    if query.get('sources'):
+        options['sources'] = {find_material(material): None if source is None else find_building(source) for material, source in query['sources'].items()}
+    rounded = query.get('rounded', False)
+    options['rounded'] = [find_building(name) for name in rounded] if isinstance(rounded, list) else bool(rounded)
+    return options
@@ -0,0 +1,296 @@
+'''
+A long-running planning service, so that tools which plan many times a second share one warm process, its worker pool and its caches.
+
+Usage:
+    mindustry-tools --serve 127.0.0.1:8765 [--processes N] [--cache DATABASE]
+    mindustry-tools --serve /tmp/mindustry.sock ...
+
+Serves HTTP/1.1 over TCP, or over a Unix socket if the address is a path. Connections are kept alive between requests.
+    POST /plan: The body is one query, in the format of the Queries module, and the response is its result. Errors in the query are reported in the result, as in a batch.
+    GET /metrics: Counts of requests and solves, the number of solves in progress, latency percentiles and, with --cache, the cache statistics.
+    GET /health: {"status": "ok"}.
+
+    >>> with ServiceClient('127.0.0.1:8765') as client:
+    ...     client.plan({'building': 'Surge Smelter', 'rounded': True})['counts']
+    {'Surge Smelter': 1, ...}
+'''
+import asyncio
+import http.client
+import json
+import os
+import signal
+import socket
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Dict, Optional, Tuple
+
+from MindustryTools.Queries import run_query, _warm_up
+
+MAX_BODY = 2**20 # The largest query accepted, in bytes
+LATENCY_SAMPLES = 1024 # The number of recent requests the latency percentiles are taken over
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+class PlanningService():
+    '''
+    Answers planning queries without blocking its event loop: each query is solved in a worker process.
+    Identical queries (ignoring their ids) that arrive while one is being solved wait for that solve instead of starting another.
+
+        >>> service = PlanningService(processes = 4, cache = 'upstream.db')
+        >>> server = await service.serve('127.0.0.1:8765')
+
+    Args:
+        processes (int, optional): The number of worker processes. Defaults to the number of CPUs.
+        cache (str, optional): An on-disk result cache for the workers to share. See Caches.ResultCache.
+        executor (Executor, optional): An executor to solve queries with, instead of a new process pool. It is not shut down by close().
+
+    Attributes:
+        counters (Dict[str, int]): The requests, solves, coalesced requests and errors so far.
+        max_in_flight (int): The most solves that have been in progress at once.
+    '''
+    def __init__(self, processes: Optional[int] = None, cache: Optional[str] = None, executor: Optional[Executor] = None):
+        self.cache = cache
+        self.counters = {'requests': 0, 'solves': 0, 'coalesced': 0, 'errors': 0}
+        self.max_in_flight = 0
+        self._executor = executor if executor is not None else ProcessPoolExecutor(max_workers = processes, initializer = _warm_up, initargs = (cache,))
+        self._owned = executor is None
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._latencies = deque(maxlen = LATENCY_SAMPLES)
+        self._solve_times = deque(maxlen = LATENCY_SAMPLES)
+        self._connections = 0
+        self._started = time.monotonic()
+
+    async def plan(self, query: dict) -> dict:
+        '''
+        Answers one query. See Queries.run_query().
+
+        Args:
+            query (dict): The query.
+
+        Returns:
+            dict: The result, with the id of the query if it has one.
+        '''
+        start = time.perf_counter()
+        self.counters['requests'] += 1
+        question = {name: value for name, value in query.items() if name != 'id'}
+        key = json.dumps(question, sort_keys = True)
+        future = self._in_flight.get(key)
+        if future is None:
+            future = self._in_flight[key] = asyncio.ensure_future(self._solve(key, question))
+            self.max_in_flight = max(self.max_in_flight, len(self._in_flight))
+        else:
+            self.counters['coalesced'] += 1
+        result = await asyncio.shield(future) # A client that disconnects does not cancel the solve others are waiting for
+        result = {'id': query['id'], **result} if 'id' in query else dict(result)
+        self._latencies.append(time.perf_counter() - start)
+        return result
+
+    def metrics(self) -> dict:
+        '''
+        The state of the service.
+
+        Returns:
+            dict: The counters, the solves in progress now (in_flight) and at most (max_in_flight), the open connections, the uptime in seconds,
+                the latency of recent requests and the time of recent solves in seconds (count, mean, p50, p90, p99 and max), and the cache statistics.
+        '''
+        metrics = {**self.counters, 'in_flight': len(self._in_flight), 'max_in_flight': self.max_in_flight, 'connections': self._connections,
+                   'uptime': time.monotonic() - self._started, 'latency': _summary(self._latencies), 'solve_seconds': _summary(self._solve_times)}
+        if self.cache:
+            from MindustryTools.Caches import ResultCache
+            cache = ResultCache(self.cache)
+            try:
+                metrics['cache'] = cache.stats()
+            finally:
+                cache.close() # Worker processes started later must not inherit an open SQLite connection
+        return metrics
+
+    async def serve(self, address: str) -> asyncio.AbstractServer:
+        '''
+        Starts serving HTTP at an address. See the module documentation for the requests.
+
+        Args:
+            address (str): "host:port", or the path of a Unix socket.
+
+        Returns:
+            asyncio.AbstractServer: The server, already accepting connections.
+        '''
+        host, port = _parse_address(address)
+        if port is None:
+            return await asyncio.start_unix_server(self._handle, host)
+        return await asyncio.start_server(self._handle, host, port)
+
+    def close(self):
+        'Shuts down the worker pool, if the service created it.'
+        if self._owned:
+            self._executor.shutdown(cancel_futures = True)
+
+    async def _solve(self, key: str, query: dict) -> dict:
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(self._executor, run_query, query)
+        finally:
+            del self._in_flight[key]
+        self.counters['solves'] += 1
+        self.counters['errors'] += 'error' in result
+        self._solve_times.append(result['seconds'])
+        return result
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        'Answers the requests of one connection, until the client closes it or asks to.'
+        self._connections += 1
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    method, path, version = line.decode('latin-1').split()
+                except ValueError:
+                    await _respond(writer, 400, {'error': 'Malformed request line'}, False)
+                    break
+                headers = {}
+                while (line := await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get('content-length', 0) or 0)
+                if length > MAX_BODY:
+                    await _respond(writer, 413, {'error': f'Queries are limited to {MAX_BODY} bytes'}, False)
+                    break
+                body = await reader.readexactly(length)
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                status, payload = await self._route(method, path, body)
+                await _respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        except asyncio.CancelledError: # The server is shutting down while the connection is idle
+            pass
+        finally:
+            self._connections -= 1
+            writer.close()
+
+    async def _route(self, method: str, path: str, body: bytes) -> Tuple[int, dict]:
+        path = path.split('?', 1)[0]
+        routes = {'/plan': 'POST', '/metrics': 'GET', '/health': 'GET'}
+        if path not in routes:
+            return 404, {'error': f'No such path: {path}'}
+        if method != routes[path]:
+            return 405, {'error': f'{path} only accepts {routes[path]}'}
+        if path == '/metrics':
+            return 200, self.metrics()
+        if path == '/health':
+            return 200, {'status': 'ok'}
+        try:
+            query = json.loads(body)
+        except ValueError as exception:
+            return 400, {'error': f'Invalid JSON: {exception}'}
+        if not isinstance(query, dict):
+            return 400, {'error': 'A query must be a JSON object.'}
+        try:
+            return 200, await self.plan(query)
+        except Exception as exception: # Such as a worker process that died; errors in the query itself are in its result
+            return 500, {'error': f'{type(exception).__name__}: {exception}'}
+
+class ServiceClient():
+    '''
+    A blocking client for a planning service, which keeps its connection open between requests.
+
+    Args:
+        address (str): "host:port", or the path of a Unix socket.
+        timeout (float): How long to wait for each response, in seconds. Defaults to 60.
+    '''
+    def __init__(self, address: str, timeout: float = 60.0):
+        host, port = _parse_address(address)
+        self.address = address
+        self._connection = http.client.HTTPConnection(host, port, timeout = timeout) if port is not None else _UnixConnection(host, timeout)
+
+    def plan(self, query: dict) -> dict:
+        'The result of a query. See Queries.run_query().'
+        return self._request('POST', '/plan', query)
+
+    def metrics(self) -> dict:
+        'The metrics of the service. See PlanningService.metrics().'
+        return self._request('GET', '/metrics')
+
+    def close(self):
+        self._connection.close()
+
+    def __enter__(self) -> 'ServiceClient':
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+
+    def __repr__(self):
+        return f"ServiceClient('{self.address}')"
+
+    def _request(self, method: str, path: str, payload: Optional[dict] = None) -> dict:
+        body = json.dumps(payload).encode() if payload is not None else None
+        self._connection.request(method, path, body, {'Content-Type': 'application/json'} if body is not None else {})
+        response = self._connection.getresponse()
+        result = json.loads(response.read())
+        if response.status != 200:
+            raise http.client.HTTPException(f"{response.status} {response.reason}: {result.get('error')}")
+        return result
+
+class _UnixConnection(http.client.HTTPConnection):
+    def __init__(self, path: str, timeout: float):
+        super().__init__('localhost', timeout = timeout)
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.path)
+
+def run_service(address: str, processes: Optional[int] = None, cache: Optional[str] = None):
+    '''
+    Serves planning queries at an address until interrupted or terminated, then shuts down the worker processes. See PlanningService.
+
+    Args:
+        address (str): "host:port", or the path of a Unix socket.
+        processes (int, optional): The number of worker processes. Defaults to the number of CPUs.
+        cache (str, optional): An on-disk result cache for the workers to share.
+    '''
+    async def serve():
+        service = PlanningService(processes, cache)
+        try:
+            server = await service.serve(address)
+            for number in (signal.SIGINT, signal.SIGTERM):
+                try:
+                    asyncio.get_running_loop().add_signal_handler(number, asyncio.current_task().cancel)
+                except NotImplementedError: # Windows, where Ctrl+C raises KeyboardInterrupt instead
+                    pass
+            async with server:
+                await server.serve_forever()
+        except asyncio.CancelledError:
+            pass
+        finally:
+            service.close()
+            if _parse_address(address)[1] is None and os.path.exists(address):
+                os.unlink(address)
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+async def _respond(writer: asyncio.StreamWriter, status: int, payload: dict, keep_alive: bool):
+    data = json.dumps(payload).encode()
+    writer.write(f"HTTP/1.1 {status} {REASONS[status]}\r\nContent-Type: application/json\r\nContent-Length: {len(data)}\r\n"
+                 f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1') + data)
+    await writer.drain()
+
+def _parse_address(address: str) -> Tuple[str, Optional[int]]:
+    'The host and port of an address, or its path and None if it is a Unix socket.'
+    host, _, port = address.rpartition(':')
+    if os.sep in address or not port.isdigit():
+        return address, None
+    return host or '127.0.0.1', int(port)
+
+def _summary(samples: deque) -> Dict[str, float]:
+    if not samples:
+        return {'count': 0}
+    ordered = sorted(samples)
+    def percentile(fraction):
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+    return {'count': len(ordered), 'mean': sum(ordered) / len(ordered), 'p50': percentile(0.5), 'p90': percentile(0.9), 'p99': percentile(0.99), 'max': ordered[-1]}
@@ -0,0 +1,243 @@
+from math import ceil
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from MindustryTools.MindustryObject import MindustryException
+from MindustryTools.Factories import Factory, FactoryGroup
+import MindustryTools.Materials as M
+
+TICK = 1 / 60 # The length of one game tick, in seconds
+
+class Simulator():
+    '''
+    Simulates a plan over time, one tick at a time, to show what its steady-state rates hide: start-up transients, buffers filling up, and buildings starved by too little input or power.
+
+    Every factory type in the plan is one row of NumPy arrays, and every material one column, so each tick is a handful of vectorized operations however many buildings there are.
+    Each tick:
+        1. The supply is added to a shared storage, as if delivered by conveyors.
+        2. Storage is shared out between the input buffers of the buildings, in proportion to their free space.
+        3. Each building runs as much of the tick as its emptiest input buffer allows. Generators run first; buildings that use power then run at the fraction of their demand that is met.
+        4. Inputs are taken from the buffers, and outputs are added to storage.
+    Surplus power charges batteries, which are drawn on when generation falls short. Buildings never stop because their outputs are full.
+    A plan that powers itself, like one with an impact reactor, cannot start without power: give it some initial power and a battery to hold it.
+
+    Args:
+        plan (FactoryGroup): The plan to simulate. Only its factories are simulated; the materials it imports are its supply.
+        supply (Dict[M.Material, float], optional): The rate each material is delivered at, in materials / second. Defaults to the inputs of the plan, which includes any power it imports.
+        initial (Dict[M.Material, float], optional): The amount of each material in storage at the start, including power in batteries. Defaults to none.
+        capacity (float): The amount of each input a building can hold. Buildings can always hold one tick of input. Defaults to 10, as for most buildings in-game.
+        battery (float): The amount of power batteries can hold. Defaults to 0.
+        whole (bool): Whether to round partial counts up to whole buildings, as they must be in-game. Defaults to True.
+        tick (float): The length of one step, in seconds. Longer ticks simulate faster but blur transients. Defaults to one game tick.
+
+    Attributes:
+        factories (List[Factory]): The simulated factory types, in row order.
+        counts (np.ndarray): The number of buildings of each type.
+        materials (List[M.Material]): The simulated materials, in column order. Power is not included.
+        storage (np.ndarray): The amount of each material in shared storage.
+        buffers (np.ndarray): The amount of each material in the input buffers of each factory type.
+        charge (float): The amount of power in batteries.
+        time (float): The simulated time so far, in seconds.
+    '''
+    def __init__(self, plan: FactoryGroup, supply: Optional[Dict[M.Material, float]] = None, initial: Optional[Dict[M.Material, float]] = None,
+                 capacity: float = 10, battery: float = 0, whole: bool = True, tick: float = TICK):
+        if tick <= 0:
+            raise MindustryException("The tick length must be positive.")
+        if supply is None:
+            supply = {material: -rate for material, rate in plan.IOMap.inputs.items()}
+        initial = initial or {}
+
+        self.factories = [factory for factory, count in plan.factories.items() if isinstance(factory, Factory) and count > 0]
+        self.counts = np.array([ceil(plan.factories[factory] - 1e-9) if whole else plan.factories[factory] for factory in self.factories], dtype=float)
+        self.materials = list(dict.fromkeys([material for factory in self.factories for material in (*factory.inputs, *factory.outputs)] + [*supply, *initial]))
+        if M.POWER in self.materials:
+            self.materials.remove(M.POWER)
+        self.tick = tick
+        self.time = 0.0
+        self.battery = battery
+        self.charge = min(max(initial.get(M.POWER, 0), 0), battery)
+        columns = {material: column for column, material in enumerate(self.materials)}
+
+        # Rates of whole factory types, per tick
+        shape = (len(self.factories), len(self.materials))
+        self._needs = np.zeros(shape)
+        self._makes = np.zeros(shape)
+        for row, factory in enumerate(self.factories):
+            for material, rate in factory.inputs.items():
+                if material != M.POWER:
+                    self._needs[row, columns[material]] = rate * tick
+            for material, rate in factory.outputs.items():
+                if material != M.POWER:
+                    self._makes[row, columns[material]] = rate * tick
+        self._needs *= self.counts[:, None]
+        self._makes *= self.counts[:, None]
+        self._net = self._makes - self._needs
+        power = self.counts * np.array([factory.power for factory in self.factories], dtype=float) * tick
+        self._generation = np.where(power > 0, power, 0.0)
+        self._demand = np.where(power < 0, -power, 0.0)
+        self._users = power < 0
+        self._supply = np.array([supply.get(material, 0) for material in self.materials], dtype=float) * tick
+        self._power_supply = max(supply.get(M.POWER, 0), 0) * tick
+
+        # The fraction of a tick each buffer can run for is buffer * _per_unit; inputs a factory does not use are never its emptiest
+        uses = self._needs > 0
+        self._capacities = np.where(uses, np.maximum(capacity * self.counts[:, None], self._needs), 0.0)
+        self._per_unit = np.divide(1, self._needs, out=np.zeros(shape), where=uses)
+        self._unused = np.where(uses, 0.0, np.inf)
+        self.storage = np.array([initial.get(material, 0) for material in self.materials], dtype=float)
+        self.buffers = np.zeros(shape)
+
+    def step(self) -> np.ndarray:
+        '''
+        Advances the simulation by one tick.
+
+        Returns:
+            np.ndarray: The fraction of the tick each factory type ran for.
+        '''
+        storage, buffers = self.storage, self.buffers
+        storage += self._supply
+
+        free = self._capacities - buffers
+        wanted = free.sum(axis=0)
+        shares = np.divide(storage, wanted, out=np.ones_like(storage), where=wanted > storage)
+        delivered = free * shares
+        buffers += delivered
+        storage -= delivered.sum(axis=0)
+
+        activity = np.minimum((buffers * self._per_unit + self._unused).min(axis=1, initial=np.inf), 1.0)
+        demand = self._demand @ activity
+        available = self._generation @ activity + self._power_supply
+        if demand > available + self.charge:
+            activity *= np.where(self._users, (available + self.charge) / demand, 1.0)
+            self.charge = 0.0
+        else:
+            self.charge = min(self.charge + available - demand, self.battery)
+
+        buffers -= activity[:, None] * self._needs
+        np.maximum(buffers, 0, out=buffers) # Rounding error
+        storage += activity @ self._makes
+        self.time += self.tick
+        return activity
+
+    def run(self, duration: float, sample: float = 1.0) -> 'SimulationResult':
+        '''
+        Advances the simulation, recording the storage and activity at regular intervals.
+
+        Args:
+            duration (float): How long to simulate for, in seconds.
+            sample (float): The time between samples, in seconds. Rounded to a whole number of ticks. Defaults to 1.
+
+        Returns:
+            SimulationResult: The recorded time series.
+        '''
+        per_sample = max(round(sample / self.tick), 1)
+        samples = max(round(duration / self.tick) // per_sample, 1)
+        times = np.empty(samples)
+        storage = np.empty((samples, len(self.materials)))
+        rates = np.empty((samples, len(self.materials)))
+        activity = np.empty((samples, len(self.factories)))
+        power = np.empty(samples)
+
+        for index in range(samples):
+            active = np.zeros(len(self.factories))
+            for _ in range(per_sample):
+                active += self.step()
+            active /= per_sample
+            times[index] = self.time
+            storage[index] = self.storage
+            activity[index] = active
+            rates[index] = active @ self._net / self.tick
+            demand = self._demand @ active
+            power[index] = (self._generation @ active + self._power_supply - demand) / self.tick
+        return SimulationResult(self.factories, self.counts.copy(), self.materials, times, storage, rates, activity, power)
+
+    def __repr__(self):
+        return f'Simulator({len(self.factories)} factories, {len(self.materials)} materials, {self.time:.1f}s)'
+
+def simulate(plan: FactoryGroup, duration: float, sample: float = 1.0, **options) -> 'SimulationResult':
+    '''
+    Simulates a plan from empty buffers. See Simulator for how, and for the options.
+
+    Args:
+        plan (FactoryGroup): The plan to simulate.
+        duration (float): How long to simulate for, in seconds.
+        sample (float): The time between samples, in seconds. Defaults to 1.
+
+    Returns:
+        SimulationResult: The recorded time series.
+    '''
+    return Simulator(plan, **options).run(duration, sample)
+
+class SimulationResult():
+    '''
+    The time series recorded by Simulator.run(). Each row of an array is one sample, taken at the end of its interval.
+
+    Attributes:
+        factories (List[Factory]): The simulated factory types.
+        counts (np.ndarray): The number of buildings of each type.
+        materials (List[M.Material]): The simulated materials, not including power.
+        times (np.ndarray): The time of each sample, in seconds.
+        storage (np.ndarray): The amount of each material in shared storage.
+        rates (np.ndarray): The net rate each material was produced at by the buildings over each interval, in materials / second. Supply is not included.
+        activity (np.ndarray): The fraction of each interval each factory type ran for.
+        power (np.ndarray): The power surplus over each interval. Negative while buildings are short of power.
+    '''
+    def __init__(self, factories: List[Factory], counts: np.ndarray, materials: List[M.Material], times: np.ndarray, storage: np.ndarray, rates: np.ndarray, activity: np.ndarray, power: np.ndarray):
+        self.factories = factories
+        self.counts = counts
+        self.materials = materials
+        self.times = times
+        self.storage = storage
+        self.rates = rates
+        self.activity = activity
+        self.power = power
+
+    def series(self, material: M.Material) -> np.ndarray:
+        'The amount of a material in storage at each sample.'
+        if material not in self.materials:
+            raise MindustryException(f"{material.name} is not simulated.")
+        return self.storage[:, self.materials.index(material)]
+
+    def rate(self, material: M.Material) -> np.ndarray:
+        'The net rate a material was produced at over each interval. For power, the power surplus.'
+        if material == M.POWER:
+            return self.power
+        if material not in self.materials:
+            raise MindustryException(f"{material.name} is not simulated.")
+        return self.rates[:, self.materials.index(material)]
+
+    @property
+    def utilization(self) -> Dict[Factory, float]:
+        'The fraction of the whole run each factory type ran for.'
+        return {factory: float(self.activity[:, row].mean()) for row, factory in enumerate(self.factories)}
+
+    def starved(self, threshold: float = 0.99, settle: float = 0.5) -> Dict[Factory, float]:
+        '''
+        The factory types that ran for less than a threshold once the plan had settled.
+
+        Args:
+            threshold (float): The utilization below which a factory type is starved. Defaults to 0.99.
+            settle (float): The fraction of the run to skip, so that start-up is not counted. Defaults to half.
+
+        Returns:
+            Dict[Factory, float]: The utilization of each starved factory type after settling.
+        '''
+        settled = self.activity[int(len(self.times) * settle):]
+        utilization = settled.mean(axis=0) if len(settled) else np.zeros(len(self.factories))
+        return {factory: float(utilization[row]) for row, factory in enumerate(self.factories) if utilization[row] < threshold}
+
+    def startup_time(self, factory: Factory, threshold: float = 0.99) -> Optional[float]:
+        '''
+        When a factory type first ran for at least a threshold of an interval, which is roughly when its buffers have filled.
+
+        Returns:
+            float: The time of the first such sample, or None if it never did.
+        '''
+        if factory not in self.factories:
+            raise MindustryException(f"{factory.name} is not simulated.")
+        reached = np.nonzero(self.activity[:, self.factories.index(factory)] >= threshold)[0]
+        return float(self.times[reached[0]]) if len(reached) else None
+
+    def __repr__(self):
+        return f"SimulationResult({self.times[-1] if len(self.times) else 0:.1f}s, {len(self.factories)} factories, {len(self.materials)} materials)"
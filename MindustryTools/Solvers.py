@@ -0,0 +1,756 @@
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from collections import OrderedDict
+from math import ceil, floor
+import heapq
+import time
+
+import numpy as np
+
+from MindustryTools.MindustryObject import MindustryException
+from MindustryTools.Factories import Factory, FactoryGroup
+import MindustryTools.Factories as F # The catalog (F.SOURCES, F.FACTORIES) is only loaded when first used
+import MindustryTools.Materials as M
+from MindustryTools.Caches import memoized
+from MindustryTools.Catalog import catalog_version
+from MindustryTools.Graphs import _strongly_connected
+
+class SolverException(MindustryException):
+    '''
+    An exception thrown when a supply chain cannot be solved, such as when a recipe cycle consumes more than it produces.
+    '''
+
+def _pivot(tableau: np.ndarray, basis: List[int], row: int, column: int):
+    tableau[row] /= tableau[row, column]
+    others = np.arange(len(tableau)) != row
+    tableau[others] -= np.outer(tableau[others, column], tableau[row])
+    basis[row] = column
+
+def _simplex(tableau: np.ndarray, basis: List[int], columns: int, max_iterations: int) -> bool:
+    '''
+    Runs the simplex method on a tableau whose last row is the objective and last column the right hand side.
+    Uses the most negative reduced cost, switching to Bland's rule if it stalls, so it cannot cycle.
+
+    Returns:
+        bool: True if an optimum was found, False if the problem is unbounded.
+    '''
+    for iteration in range(max_iterations):
+        costs = tableau[-1, :columns]
+        if iteration < 50:
+            column = int(np.argmin(costs))
+            if costs[column] >= -1e-9:
+                return True
+        else:
+            candidates = np.flatnonzero(costs < -1e-9)
+            if not len(candidates):
+                return True
+            column = int(candidates[0])
+        entries = tableau[:-1, column]
+        positive = entries > 1e-9
+        if not positive.any():
+            return False
+        ratios = np.full(len(entries), np.inf)
+        ratios[positive] = tableau[:-1, -1][positive] / entries[positive]
+        best = ratios.min()
+        ties = np.flatnonzero(ratios <= best + 1e-12)
+        row = int(min(ties, key=lambda row: basis[row]))
+        _pivot(tableau, basis, row, column)
+    raise SolverException(f"The linear program did not converge after {max_iterations} iterations.")
+
+def linprog(costs: np.ndarray, A_ub: Optional[np.ndarray] = None, b_ub: Optional[np.ndarray] = None, A_eq: Optional[np.ndarray] = None, b_eq: Optional[np.ndarray] = None, max_iterations: int = 10000) -> Tuple[np.ndarray, float]:
+    '''
+    Solves a linear program with the two-phase simplex method:
+    minimize costs @ x, subject to A_ub @ x <= b_ub, A_eq @ x == b_eq and x >= 0.
+
+    This is intended for the small, dense problems found in supply chains; it does not need any solver beyond NumPy.
+
+    Args:
+        costs (np.ndarray): The cost of each variable.
+        A_ub, b_ub (np.ndarray, optional): The inequality constraints.
+        A_eq, b_eq (np.ndarray, optional): The equality constraints.
+        max_iterations (int, optional): The number of pivots allowed in each phase. Defaults to 10000.
+
+    Returns:
+        Tuple[np.ndarray, float]: The optimal variables, and the optimal cost.
+
+    Raises:
+        SolverException: If the problem is infeasible or unbounded.
+    '''
+    costs = np.asarray(costs, dtype=float)
+    variables = len(costs)
+    A_ub = np.zeros((0, variables)) if A_ub is None else np.asarray(A_ub, dtype=float).reshape(-1, variables)
+    A_eq = np.zeros((0, variables)) if A_eq is None else np.asarray(A_eq, dtype=float).reshape(-1, variables)
+    b_ub = np.zeros(0) if b_ub is None else np.asarray(b_ub, dtype=float)
+    b_eq = np.zeros(0) if b_eq is None else np.asarray(b_eq, dtype=float)
+    slacks, rows = len(A_ub), len(A_ub) + len(A_eq)
+    columns = variables + slacks
+
+    # Phase 1: find a feasible basis by minimizing the sum of artificial variables
+    tableau = np.zeros((rows + 1, columns + rows + 1))
+    tableau[:slacks, :variables] = A_ub
+    tableau[:slacks, variables:columns] = np.eye(slacks)
+    tableau[slacks:rows, :variables] = A_eq
+    tableau[:rows, -1] = np.concatenate([b_ub, b_eq])
+    negative = tableau[:rows, -1] < 0
+    tableau[:rows][negative] *= -1
+    tableau[:rows, columns:columns + rows] = np.eye(rows)
+    tableau[-1, :columns] = -tableau[:rows, :columns].sum(axis=0)
+    tableau[-1, -1] = -tableau[:rows, -1].sum()
+    basis = list(range(columns, columns + rows))
+    _simplex(tableau, basis, columns + rows, max_iterations)
+    if -tableau[-1, -1] > 1e-7 * max(1, np.abs(tableau[:rows, -1]).max(initial=0)):
+        raise SolverException("The linear program is infeasible.")
+
+    keep = []
+    for row, column in enumerate(basis):
+        if column >= columns: # Drive the remaining artificial variables out of the basis
+            candidates = np.flatnonzero(np.abs(tableau[row, :columns]) > 1e-9)
+            if not len(candidates):
+                continue # Redundant constraint
+            _pivot(tableau, basis, row, int(candidates[0]))
+        keep.append(row)
+
+    # Phase 2: optimize the real objective from the feasible basis
+    tableau = np.vstack([tableau[keep][:, list(range(columns)) + [-1]], np.zeros(columns + 1)])
+    basis = [basis[row] for row in keep]
+    tableau[-1, :variables] = costs
+    for row, column in enumerate(basis):
+        tableau[-1] -= tableau[-1, column] * tableau[row]
+    if not _simplex(tableau, basis, columns, max_iterations):
+        raise SolverException("The linear program is unbounded.")
+
+    solution = np.zeros(columns)
+    solution[basis] = tableau[:-1, -1]
+    return solution[:variables], float(costs @ solution[:variables])
+
+class RecipeModel():
+    '''
+    The supply chain defined by a choice of source for each material, written as a linear system.
+    Each column is a factory and each row a material; entries are the net rate of the material per factory, as in a FactoryGroup's IOMap.
+
+    Models are expensive to build but cheap to solve, and the inverse of each square system is cached, so use get_model() to share them between queries.
+
+    Args:
+        materials (Iterable[M.Material]): The materials that must be included. Any materials used by their sources are added automatically.
+        sources (Dict[M.Material, Factory], optional): A dictionary of materials and their sources. If a material is not included, the most advanced factory that produces that material is used. Natural materials are only supplied if they are included.
+            A source of None leaves its material unsupplied, like a natural material.
+
+    Attributes:
+        materials (List[M.Material]): The materials in the model (rows).
+        factories (List[Factory]): The factories in the model (columns).
+        sources (Dict[M.Material, Factory]): The factory supplying each material that must be supplied.
+        unsupplied (List[M.Material]): Materials that must be supplied, but have no source.
+        matrix (np.ndarray): The net rate of each material per factory.
+
+    Raises:
+        SolverException: If a source does not produce its material.
+    '''
+    INVERSE_CACHE_SIZE = 64
+
+    def __init__(self, materials: Iterable[M.Material], sources: Optional[Dict[M.Material, Factory]] = None):
+        sources = sources if sources is not None else {}
+        self.materials = []
+        self.factories = []
+        self.sources = {}
+        self.unsupplied = []
+        self.positions = {}
+        factory_positions = {}
+
+        queue = list(materials)
+        while queue:
+            material = queue.pop()
+            if material in self.positions:
+                continue
+            self.positions[material] = len(self.materials)
+            self.materials.append(material)
+            if material not in sources and material.is_natural:
+                continue
+            if material in sources:
+                source = sources[material]
+                if source is None: # Left unsupplied on purpose
+                    continue
+            elif material in F.SOURCES:
+                source = F.SOURCES[material][-1] # Default to the most advanced source
+            else:
+                self.unsupplied.append(material)
+                continue
+            self.sources[material] = source
+            if source not in factory_positions:
+                factory_positions[source] = len(self.factories)
+                self.factories.append(source)
+                queue.extend(source.outputs)
+                queue.extend(source.inputs)
+                queue.append(M.POWER)
+
+        self.matrix = np.zeros((len(self.materials), len(self.factories)))
+        for column, factory in enumerate(self.factories):
+            for material, rate in factory.outputs.items():
+                self.matrix[self.positions[material], column] += rate
+            for material, rate in factory.inputs.items():
+                self.matrix[self.positions[material], column] -= rate
+            self.matrix[self.positions[M.POWER], column] += factory.power
+
+        self._columns = {material: factory_positions[source] for material, source in self.sources.items()}
+        for material, column in self._columns.items():
+            if self.matrix[self.positions[material], column] <= 0:
+                raise SolverException(f"{self.factories[column].name} does not produce {material.name}.")
+        self._supplied = np.array([self.positions[material] for material in self.sources], dtype=np.intp)
+        self._inverses = OrderedDict()
+
+        # requires[m, n] is True if supplying material m (eventually) uses material n
+        self._requires = np.zeros((len(self.materials), len(self.materials)), dtype=bool)
+        for material, column in self._columns.items():
+            self._requires[self.positions[material]] = self.matrix[:, column] < 0
+        while True:
+            closure = self._requires | ((self._requires.astype(np.int64) @ self._requires.astype(np.int64)) > 0)
+            if (closure == self._requires).all():
+                break
+            self._requires = closure
+        self._unproductive = self._find_unproductive_cycles()
+
+    def _find_unproductive_cycles(self) -> List[Tuple[np.ndarray, str]]:
+        '''
+        Finds the recipe cycles that consume more than they produce.
+        A cycle is productive when the spectral radius of its consumption matrix (the amount of each material used up, per unit of each material produced) is less than 1.
+
+        Returns:
+            List[Tuple[np.ndarray, str]]: The rows of each unproductive cycle, and a description of the problem.
+        '''
+        graph = {material: [input for input in self.sources if self.matrix[self.positions[input], column] < 0]
+                 for material, column in self._columns.items()}
+        unproductive = []
+        for component in _strongly_connected(graph, lambda material: graph.get(material, ())):
+            if len(component) == 1 and component[0] not in graph[component[0]]:
+                continue
+            consumption = np.array([[max(0, -self.matrix[self.positions[used], self._columns[made]]) / self.matrix[self.positions[made], self._columns[made]]
+                                     for made in component] for used in component])
+            radius = max(abs(np.linalg.eigvals(consumption)))
+            if radius >= 1 - 1e-9:
+                factories = ' -> '.join(dict.fromkeys(self.sources[material].name for material in component))
+                unproductive.append((np.array([self.positions[material] for material in component], dtype=np.intp),
+                                     f"The recipe cycle {factories} is not productive; each unit of {', '.join(material.name for material in component)} requires {radius:.3g} units around the cycle."))
+        return unproductive
+
+    def _inverse(self, rows: np.ndarray, columns: np.ndarray) -> np.ndarray:
+        'Get the inverse of the square system with the given binding rows and factory columns, from the cache if possible.'
+        key = (rows.tobytes(), columns.tobytes())
+        inverse = self._inverses.get(key)
+        if inverse is not None:
+            self._inverses.move_to_end(key)
+            return inverse
+        try:
+            inverse = np.linalg.inv(self.matrix[np.ix_(rows, columns)])
+        except np.linalg.LinAlgError:
+            raise SolverException(f"The supply chain through {', '.join(self.factories[column].name for column in columns)} is singular.")
+        self._inverses[key] = inverse
+        if len(self._inverses) > self.INVERSE_CACHE_SIZE:
+            self._inverses.popitem(last=False)
+        return inverse
+
+    def vector(self, group: FactoryGroup) -> np.ndarray:
+        '''
+        Get the rates of a factory group as a vector over the model's materials.
+
+        Args:
+            group (FactoryGroup): The factory group. All of its materials must be in the model.
+
+        Returns:
+            np.ndarray: The rate of each material in the model.
+        '''
+        rates = np.zeros(len(self.materials))
+        for material, rate in group.IOMap.items():
+            rates[self.positions[material]] += rate
+        return rates
+
+    def needed(self, rates: np.ndarray) -> np.ndarray:
+        '''
+        Find the materials that are used, directly or further up the supply chain, to supply a vector of rates.
+
+        Args:
+            rates (np.ndarray): The rate of each material in the model, as returned by vector().
+
+        Returns:
+            np.ndarray: Whether each material in the model is needed.
+
+        Raises:
+            SolverException: If a needed material is part of a recipe cycle that is not productive.
+        '''
+        demanded = rates < -1e-9 * max(1, np.max(np.abs(rates), initial=0))
+        needed = demanded | self._requires[demanded].any(axis=0)
+        for rows, message in self._unproductive:
+            if needed[rows].any():
+                raise SolverException(message)
+        return needed
+
+    def _binding(self, needed: np.ndarray) -> Dict[int, int]:
+        'The starting binding row of each needed factory column.'
+        binding = {}
+        for material, column in self._columns.items():
+            if needed[self.positions[material]]:
+                binding.setdefault(column, self.positions[material])
+        return binding
+
+    def solve(self, rates: np.ndarray, max_iterations: int = 100) -> np.ndarray:
+        '''
+        Find the factory counts that supply every deficit in a vector of rates.
+
+        Each factory is scaled so that one of the materials it supplies (its binding material) exactly breaks even, which gives a square linear system.
+        Factories that are not needed are removed, and factories that supply several materials switch to whichever material is short, until every supplied material breaks even or has a surplus.
+        The inverse of each square system is cached, so repeated queries usually cost one matrix-vector product.
+
+        Args:
+            rates (np.ndarray): The rate of each material in the model, as returned by vector().
+            max_iterations (int, optional): The number of adjustments allowed before giving up. Defaults to 100.
+
+        Returns:
+            np.ndarray: The count of each factory in the model.
+
+        Raises:
+            SolverException: If the supply chain includes a recipe cycle that is not productive, or no solution is found.
+            MindustryException: If a material must be supplied, but has no source.
+        '''
+        tolerance = 1e-9 * max(1, np.max(np.abs(rates), initial=0))
+        binding = self._binding(self.needed(rates))
+        seen = set()
+
+        for _ in range(max_iterations):
+            state = tuple(sorted(binding.items()))
+            if state in seen:
+                raise SolverException(f"The solver did not converge; the supply of {', '.join(self.materials[row].name for row in binding.values())} keeps alternating.")
+            seen.add(state)
+
+            columns = np.array([column for column, _ in state], dtype=np.intp)
+            rows = np.array([row for _, row in state], dtype=np.intp)
+            counts = np.zeros(len(self.factories))
+            if len(state):
+                counts[columns] = self._inverse(rows, columns) @ -rates[rows]
+
+            if (counts[columns] < -tolerance).any():
+                del binding[columns[np.argmin(counts[columns])]] # Not needed; a surplus covers it
+                continue
+            net = rates + self.matrix @ counts
+            short = self._supplied[net[self._supplied] < -tolerance]
+            if not len(short):
+                break
+            for row in short:
+                binding[self._columns[self.materials[row]]] = row
+        else:
+            raise SolverException(f"No solution found after {max_iterations} iterations.")
+
+        counts = np.maximum(counts, 0)
+        for material in self.unsupplied:
+            if net[self.positions[material]] < -tolerance:
+                raise MindustryException(f"No source found for {material.name}")
+        return counts
+
+    def solve_batch(self, rates: np.ndarray) -> np.ndarray:
+        '''
+        Find the factory counts that supply every deficit, for many vectors of rates at once.
+        Plans that need the same materials are solved together with one matrix product; plans whose first guess is not feasible fall back to solve().
+
+        Args:
+            rates (np.ndarray): The rate of each material in the model (columns) for each plan (rows).
+
+        Returns:
+            np.ndarray: The count of each factory in the model (columns) for each plan (rows).
+
+        Raises:
+            SolverException: If any plan cannot be solved.
+        '''
+        counts = np.zeros((len(rates), len(self.factories)))
+        tolerance = 1e-9 * np.maximum(1, np.abs(rates).max(axis=1, initial=0))
+        demanded = rates < -tolerance[:, None]
+        needed = demanded | ((demanded.astype(np.int64) @ self._requires.astype(np.int64)) > 0)
+        for rows, message in self._unproductive:
+            if needed[:, rows].any():
+                raise SolverException(message)
+
+        patterns, groups = np.unique(needed, axis=0, return_inverse=True)
+        for pattern, plan_needed in enumerate(patterns):
+            plans = np.flatnonzero(groups.ravel() == pattern)
+            state = sorted(self._binding(plan_needed).items())
+            if state:
+                columns = np.array([column for column, _ in state], dtype=np.intp)
+                rows = np.array([row for _, row in state], dtype=np.intp)
+                counts[np.ix_(plans, columns)] = -rates[np.ix_(plans, rows)] @ self._inverse(rows, columns).T
+            net = rates[plans] + counts[plans] @ self.matrix.T
+            failed = (counts[plans] < -tolerance[plans, None]).any(axis=1) | (net[:, self._supplied] < -tolerance[plans, None]).any(axis=1)
+            for plan in plans[failed]:
+                counts[plan] = self.solve(rates[plan])
+            if self.unsupplied and not failed.all():
+                unsupplied = np.array([self.positions[material] for material in self.unsupplied], dtype=np.intp)
+                short = (net[~failed][:, unsupplied] < -tolerance[plans[~failed], None]).any(axis=0)
+                if short.any():
+                    raise MindustryException(f"No source found for {self.materials[unsupplied[np.argmax(short)]].name}")
+        return np.maximum(counts, 0)
+
+MODEL_CACHE_SIZE = 32
+_models = OrderedDict()
+
+def _source_key(material: M.Material, source: Factory, default: bool = False) -> Optional[Tuple]:
+    'The cache key for a chosen source, or None if it is the default source anyway.'
+    if source is None:
+        return (material.index, None)
+    key = (material.index, type(source), source.index, source.efficiency)
+    if not default and not material.is_natural and material in F.SOURCES and key == _source_key(material, F.SOURCES[material][-1], default=True):
+        return None
+    return key
+
+def get_model(sources: Optional[Dict[M.Material, Factory]] = None, materials: Iterable[M.Material] = ()) -> RecipeModel:
+    '''
+    Get the RecipeModel of the whole catalog for a choice of sources, building it only if it is not already cached.
+
+    Models are cached by the factory chosen for each material, so different sources dictionaries that choose the same factories share a model.
+    The MODEL_CACHE_SIZE most recently used models are kept, and the cache is cleared whenever the catalog changes, as told by Catalog.catalog_version(), such as when a factory is registered.
+
+    Args:
+        sources (Dict[M.Material, Factory], optional): A dictionary of materials and their sources. If a material is not included, the most advanced factory that produces that material is used.
+        materials (Iterable[M.Material], optional): Any materials that must be in the model, in addition to the catalog.
+
+    Returns:
+        RecipeModel: The model.
+    '''
+    global _catalog
+    sources = sources if sources is not None else {}
+    version = catalog_version()
+    if version != _catalog:
+        _models.clear()
+        _catalog = version
+
+    key = frozenset(key for material, source in sources.items() if (key := _source_key(material, source)) is not None)
+    model = _models.get(key)
+    if model is None:
+        model = _models[key] = RecipeModel([M.POWER] + M.MATERIALS + list(F.SOURCES) + list(sources), sources)
+        if len(_models) > MODEL_CACHE_SIZE:
+            _models.popitem(last=False)
+    else:
+        _models.move_to_end(key)
+
+    extra = [material for material in materials if material not in model.positions]
+    if extra: # Materials outside of the catalog get a model of their own
+        return RecipeModel([M.POWER] + M.MATERIALS + list(F.SOURCES) + list(sources) + extra, sources)
+    return model
+
+def clear_model_cache():
+    '''
+    Clears all cached models.
+    '''
+    _models.clear()
+
+_catalog = None # The catalog_version() the cached models were built for
+
+@memoized
+def solve_upstream(group: FactoryGroup, sources: Optional[Dict[M.Material, Factory]] = None) -> FactoryGroup:
+    '''
+    Adds factories to the group until all inputs are satisfied, by solving the whole supply chain as one linear system.
+    This gives the same result as FactoryGroup.get_upstream(), but does not iterate, and reports recipe cycles that cannot be satisfied.
+
+    Args:
+        group (FactoryGroup): The factory group to supply.
+        sources (Dict[M.Material, Factory], optional): A dictionary of materials and their sources. If a material is not included, the most advanced factory that produces that material is used.
+
+    Returns:
+        A factory group with all inputs satisfied.
+
+    Raises:
+        SolverException: If the supply chain cannot be solved.
+    '''
+    model = get_model(sources, group.IOMap)
+    counts = model.solve(model.vector(group))
+    upstream = {factory: float(count) for factory, count in zip(model.factories, counts) if count > 0}
+    if not upstream:
+        return type(group)(factory_group = group)
+    return group + type(group)(upstream)
+
+@memoized
+def plan_integer(group: FactoryGroup, sources: Optional[Dict[M.Material, Factory]] = None, rounded: bool | List[Factory] = True, time_budget: float = 1.0) -> FactoryGroup:
+    '''
+    Adds whole numbers of factories to the group until all inputs are satisfied, using as few factories as possible.
+    Unlike get_upstream(rounded=True), which rounds up one factory at a time, all deficits are solved together with branch and bound, so rounding does not compound down the chain.
+
+    Args:
+        group (FactoryGroup): The factory group to supply.
+        sources (Dict[M.Material, Factory], optional): A dictionary of materials and their sources. If a material is not included, the most advanced factory that produces that material is used.
+        rounded (bool | list): Whether every factory count must be a whole number. Defaults to True. If a list is provided, only the selected factories are rounded.
+        time_budget (float, optional): The number of seconds to search for. When it runs out, the best plan found so far is returned. Defaults to 1.
+
+    Returns:
+        A factory group with all inputs satisfied.
+
+    Raises:
+        SolverException: If the supply chain cannot be solved.
+    '''
+    deadline = time.perf_counter() + time_budget
+    model = get_model(sources, group.IOMap)
+    rates = model.vector(group)
+    relaxed = model.solve(rates)
+    integer = np.array([rounded is True or factory in rounded for factory in model.factories], dtype=bool)
+    if not integer.any():
+        return solve_upstream(group, sources)
+
+    # Only the factories and materials used by this group take part in the search
+    needed = model.needed(rates)
+    columns = np.array(sorted({model._columns[material] for material in model.sources if needed[model.positions[material]]}), dtype=np.intp)
+    supplied = np.array([model.positions[material] for material in model.sources if needed[model.positions[material]]], dtype=np.intp)
+    if not len(columns):
+        return type(group)(factory_group = group)
+    matrix, relaxed, integer = model.matrix[:, columns], relaxed[columns], integer[columns]
+    A_ub, b_ub = -matrix[supplied], rates[supplied] # rates + matrix @ counts >= 0
+    costs = np.ones(len(columns))
+    tolerance = 1e-6
+    positions = {column: position for position, column in enumerate(columns)}
+
+    # Start from the relaxed solution rounded up, then top up any deficit that rounding created
+    best = np.where(integer, np.ceil(relaxed - tolerance), relaxed)
+    for _ in range(1000):
+        net = rates + matrix @ best
+        short = supplied[net[supplied] < -tolerance]
+        if not len(short):
+            break
+        row = short[0]
+        column = positions[model._columns[model.materials[row]]]
+        extra = -net[row] / matrix[row, column]
+        best[column] += ceil(extra - tolerance) if integer[column] else extra
+    else:
+        raise SolverException("Could not find a whole number plan.")
+    best_cost = costs @ best
+
+    # Branch and bound, exploring the most promising nodes first
+    queue = [(costs @ relaxed, 0, np.zeros(len(costs)), np.full(len(costs), np.inf))]
+    counter = 1
+    while queue and time.perf_counter() < deadline:
+        bound, _, lower, upper = heapq.heappop(queue)
+        if bound >= best_cost - tolerance:
+            continue
+        bounded = np.isfinite(upper)
+        try:
+            counts, cost = linprog(costs,
+                                   np.vstack([A_ub, -np.eye(len(costs))[lower > 0], np.eye(len(costs))[bounded]]),
+                                   np.concatenate([b_ub, -lower[lower > 0], upper[bounded]]))
+        except SolverException:
+            continue
+        if cost >= best_cost - tolerance:
+            continue
+        fractional = integer & (np.abs(counts - np.round(counts)) > tolerance)
+        if not fractional.any():
+            best, best_cost = np.where(integer, np.round(counts), counts), cost
+            continue
+        column = int(np.argmax(np.where(fractional, np.abs(counts - np.round(counts)), -1)))
+        down, up = upper.copy(), lower.copy()
+        down[column] = floor(counts[column])
+        up[column] = ceil(counts[column])
+        heapq.heappush(queue, (cost, counter, lower, down))
+        heapq.heappush(queue, (cost, counter + 1, up, upper))
+        counter += 2
+
+    upstream = {model.factories[column]: int(count) if integer[position] else float(count) for position, (column, count) in enumerate(zip(columns, best)) if count > tolerance}
+    if not upstream:
+        return type(group)(factory_group = group)
+    return group + type(group)(upstream)
+
+# The cost of each building, and of each unit of its throughput (its count times its efficiency), for each objective of optimize_upstream()
+OBJECTIVES = {
+    'power': lambda factory: (max(0, -factory.power), 0),
+    'footprint': lambda factory: (factory.size ** 2, 0),
+    'ore': lambda factory: (0, sum(rate for material, rate in factory.inputs.items() if material.is_natural and not material.is_liquid)),
+    'fuel': lambda factory: (0, sum(rate for material, rate in factory.inputs.items() if material.is_natural)),
+    'buildings': lambda factory: (1, 0),
+}
+TIE_BREAK = 1e-6 # Added to the cost of each building, so that free buildings are not used needlessly
+
+@memoized
+def optimize_upstream(group: FactoryGroup, objective: str | Callable[[Factory], float] = 'power', sources: Optional[Dict[M.Material, Factory]] = None,
+                      exclude: Iterable[Factory] = (), efficiency: Tuple[float, float] | Dict[Factory, Tuple[float, float]] = (0.0, 1.0)) -> FactoryGroup:
+    '''
+    Adds factories to the group until all inputs are satisfied, choosing the producers of every material at once to minimize a cost.
+    Unlike get_upstream(), which always uses the most advanced source, any factory in the catalog may be used, and several may share a material.
+
+    The whole recipe graph is solved as one linear program. Buildings with modal_efficiency can run at any efficiency in a range:
+    their count and their throughput (count times efficiency) are separate variables, bounded by the range, which makes the problem linear without approximation.
+
+    Args:
+        group (FactoryGroup): The factory group to supply.
+        objective (str | Callable[[Factory], float]): What to minimize. Defaults to 'power'.
+            'power': The power drawn by the added buildings. Generated power is not counted.
+            'footprint': The tiles covered by the added buildings (size ** 2 each).
+            'ore': The natural ores (not liquids) consumed by the added buildings.
+            'fuel': The natural materials, ores and liquids, consumed by the added buildings.
+            'buildings': The number of added buildings.
+            A function: The cost of each building, given the building.
+        sources (Dict[M.Material, Factory], optional): Materials whose producer is fixed. Natural materials are only supplied if they are included.
+        exclude (Iterable[Factory], optional): Factories that must not be used, such as buildings that are not unlocked yet.
+        efficiency (Tuple[float, float] | Dict[Factory, Tuple[float, float]]): The range of efficiency for buildings with modal_efficiency, either for all of them or per building (others use 0 to 1). Defaults to 0 to 1.
+
+    Returns:
+        A factory group with all inputs satisfied. Buildings running below full efficiency are included at that efficiency.
+
+    Raises:
+        MindustryException: If a material must be supplied, but no allowed factory produces it.
+        SolverException: If the linear program cannot be solved.
+    '''
+    upstream, _ = _optimize(group, objective, sources, exclude, efficiency)
+    return _with_upstream(group, upstream)
+
+@memoized
+def optimize_sources(group: FactoryGroup, objective: str | Callable[[Factory], float] = 'power', sources: Optional[Dict[M.Material, Factory]] = None,
+                     exclude: Iterable[Factory] = (), efficiency: Tuple[float, float] | Dict[Factory, Tuple[float, float]] = (0.0, 1.0)) -> Dict[M.Material, Factory]:
+    '''
+    Chooses a producer for every material the group needs, to minimize a cost. The result can be passed as the sources of get_upstream() or plan_integer().
+    Takes the same arguments as optimize_upstream(). Where the optimum splits a material between several producers, the one supplying the most is chosen.
+    Materials given a source of None keep it, so that they stay unsupplied.
+
+    Returns:
+        Dict[M.Material, Factory]: The chosen producer of each material that is supplied.
+    '''
+    return _optimize(group, objective, sources, exclude, efficiency)[1]
+
+@memoized
+def balance_power(group: FactoryGroup, objective: str | Callable[[Factory], float] = 'fuel', generators: Optional[Iterable[Factory]] = None, limits: Optional[Dict[Factory, float]] = None,
+                  available: Optional[Dict[M.Material, float]] = None, sources: Optional[Dict[M.Material, Factory]] = None, exclude: Iterable[Factory] = (),
+                  efficiency: Tuple[float, float] | Dict[Factory, Tuple[float, float]] = (0.0, 1.0), rounded: bool = False) -> FactoryGroup:
+    '''
+    Covers the power deficit of a group with a mix of generators, chosen with their fuel chains to minimize a cost.
+    get_upstream() covers a deficit with the single most advanced generator; this weighs every generator against the others, including the power its fuel chain draws.
+    Only power is balanced: the group's other inputs are left as they are, and the fuel chain is supplied down to natural materials, which are left as inputs.
+
+        >>> plan = FactoryGroup([SurgeSmelter()]).get_upstream(power = 'exclude')
+        >>> balance_power(plan, 'footprint', available = {COAL: 2.0, SAND: 5.0})
+
+    Solved as one linear program, like optimize_upstream(), so it takes a few milliseconds.
+
+    Args:
+        group (FactoryGroup): The factory group to power.
+        objective (str | Callable[[Factory], float]): What to minimize. Defaults to 'fuel'.
+            'fuel': The natural materials (ore and liquids) consumed by the generators and their fuel chains.
+            'footprint', 'ore', 'buildings', 'power' or a function: As for optimize_upstream(). Use 'buildings' for the simplest fuel chains.
+        generators (Iterable[Factory], optional): The generators that may be used. Defaults to every factory that generates power.
+        limits (Dict[Factory, float], optional): The most of each generator that may be built.
+        available (Dict[M.Material, float], optional): The most of each natural material the generators and their fuel chains may consume, such as the fuel the drills on a map can gather.
+        sources (Dict[M.Material, Factory], optional): Materials in the fuel chains whose producer is fixed.
+        exclude (Iterable[Factory], optional): Factories that must not be used.
+        efficiency (Tuple[float, float] | Dict[Factory, Tuple[float, float]]): The range of efficiency for buildings with modal_efficiency. Defaults to 0 to 1.
+        rounded (bool): Whether to round the generators and their fuel chains up to whole buildings, topping up any deficit that rounding leaves. Defaults to False.
+
+    Returns:
+        The group with its power deficit covered.
+
+    Raises:
+        SolverException: If the deficit cannot be covered within the limits and the available fuel.
+    '''
+    deficit = -group.IOMap.get(M.POWER, 0)
+    if deficit <= 0:
+        return type(group)(factory_group = group)
+    sources = {material: source for material, source in (sources or {}).items() if material != M.POWER}
+    exclude = set(exclude)
+    if generators is not None:
+        generators = set(generators)
+        from MindustryTools.Catalog import default_catalog
+        exclude |= {factory for factory in default_catalog().graph.producers[M.POWER] if factory not in generators}
+    demand = FactoryGroup(materials = {M.POWER: -deficit})
+    upstream, chosen = _optimize(demand, objective, sources, exclude, efficiency, limits, available)
+    if rounded:
+        # Rounding every count up can still leave a deficit where a rounded-up building consumes more, so the chain is topped up with the chosen sources
+        chain = _with_upstream(demand, {factory: ceil(count - 1e-9) for factory, count in upstream.items()}).get_upstream({**chosen, **sources}, rounded = True)
+        upstream = chain.factories
+    return _with_upstream(group, upstream)
+
+def _with_upstream(group: FactoryGroup, upstream: Dict[Factory, float]) -> FactoryGroup:
+    'A copy of the group with the upstream factories added.'
+    if not upstream:
+        return type(group)(factory_group = group)
+    return group + type(group)(upstream)
+
+def _optimize(group, objective, sources, exclude, efficiency, limits = None, available = None) -> Tuple[Dict[Factory, float], Dict[M.Material, Factory]]:
+    '''
+    Solves the linear program of optimize_upstream(), returning the count of each added factory and the main producer of each material.
+    Limits cap the count of factories, and available caps the net consumption of natural materials, as for balance_power().
+    '''
+    from MindustryTools.Catalog import default_catalog
+    sources = sources if sources is not None else {}
+    cost = OBJECTIVES.get(objective) if isinstance(objective, str) else lambda factory: (objective(factory), 0)
+    if cost is None:
+        raise ValueError(f"Unknown objective '{objective}'; use one of {list(OBJECTIVES)} or a function.")
+
+    graph = default_catalog().graph.including(source for source in sources.values() if isinstance(source, Factory))
+    exclude = set(exclude)
+    replaced = {id(factory) for material, source in sources.items() for factory in graph.producers.get(material, []) if factory is not source} # A fixed source replaces every other producer of its material
+    factories = [factory for factory in graph.factories.values() if factory not in exclude and id(factory) not in replaced]
+
+    # Materials that must break even: everything that is not natural, unless it is given a source (or a source of None)
+    materials = list(dict.fromkeys([*group.IOMap, M.POWER, *(material for factory in factories for material in (*factory.inputs, *factory.outputs))]))
+    materials = [material for material in materials if (sources[material] is not None if material in sources else not material.is_natural)]
+    rows = {material: row for row, material in enumerate(materials)}
+
+    # Each factory has a count variable; modal factories also have a throughput variable, which is the count for other factories
+    count_columns, flow_columns, variables = [], [], 0
+    for factory in factories:
+        count_columns.append(variables)
+        flow_columns.append(variables + 1 if factory.modal_efficiency else variables)
+        variables += 2 if factory.modal_efficiency else 1
+    matrix = np.zeros((len(materials), variables))
+    costs = np.zeros(variables)
+    bounds = []
+    for factory, count, flow in zip(factories, count_columns, flow_columns):
+        for material, rate in factory.outputs.items():
+            if material in rows:
+                matrix[rows[material], flow] += rate
+        for material, rate in factory.inputs.items():
+            if material in rows:
+                matrix[rows[material], flow] -= rate
+        if M.POWER in rows:
+            matrix[rows[M.POWER], count] += factory.power # Buildings draw full power at any efficiency
+        building_cost, throughput_cost = cost(factory)
+        costs[count] += building_cost + TIE_BREAK
+        costs[flow] += throughput_cost
+        if factory.modal_efficiency:
+            low, high = efficiency.get(factory, (0.0, 1.0)) if isinstance(efficiency, dict) else efficiency
+            bounds.append((count, flow, low, high))
+
+    rates = np.zeros(len(materials))
+    for material, rate in group.IOMap.items():
+        if material in rows:
+            rates[rows[material]] += rate
+    for material, row in rows.items():
+        if rates[row] < -1e-9 and not (matrix[row] > 0).any():
+            raise MindustryException(f"No source found for {material.name}")
+
+    # rates + matrix @ x >= 0, and low * count <= throughput <= high * count
+    A_ub = [-matrix]
+    b_ub = [rates]
+    if bounds:
+        ranges = np.zeros((2 * len(bounds), variables))
+        for index, (count, flow, low, high) in enumerate(bounds):
+            ranges[2 * index, [flow, count]] = 1, -high
+            ranges[2 * index + 1, [count, flow]] = low, -1
+        A_ub.append(ranges)
+        b_ub.append(np.zeros(len(ranges)))
+    if limits:
+        capped = [(count, limit) for factory, count in zip(factories, count_columns) if (limit := limits.get(factory)) is not None]
+        caps = np.zeros((len(capped), variables))
+        caps[np.arange(len(capped)), [count for count, _ in capped]] = 1
+        A_ub.append(caps)
+        b_ub.append(np.array([limit for _, limit in capped], dtype=float))
+    if available:
+        consumption = np.zeros((len(available), variables)) # The net consumption of each natural material, which must be at most what is available
+        for row, material in enumerate(available):
+            for factory, flow in zip(factories, flow_columns):
+                consumption[row, flow] += factory.inputs.get(material, 0) - factory.outputs.get(material, 0)
+        A_ub.append(consumption)
+        b_ub.append(np.array(list(available.values()), dtype=float))
+    solution, _ = linprog(costs, np.vstack(A_ub), np.concatenate(b_ub))
+
+    upstream, supplied = {}, {}
+    for factory, count, flow in zip(factories, solution[count_columns].tolist(), solution[flow_columns].tolist()):
+        if count <= 1e-9:
+            continue
+        if factory.modal_efficiency and abs(flow / count - 1) > 1e-9:
+            factory = factory.variant(efficiency = factory.efficiency * flow / count)
+        upstream[factory] = upstream.get(factory, 0) + count
+        for material, rate in factory.outputs.items():
+            if material in rows and rate * count > supplied.get(material, (0, None))[0]:
+                supplied[material] = (rate * count, factory)
+        if factory.power > 0 and factory.power * count > supplied.get(M.POWER, (0, None))[0]:
+            supplied[M.POWER] = (factory.power * count, factory)
+
+    chosen = {material: factory for material, (_, factory) in supplied.items()}
+    chosen.update((material, None) for material, source in sources.items() if source is None)
+    return upstream, chosen
@@ -0,0 +1,426 @@
+import json
+import mmap
+import os
+import struct
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from MindustryTools.MindustryObject import Building, MindustryException, REGISTRY
+from MindustryTools.Catalog import catalog_version
+from MindustryTools.Factories import Factory, FactoryGroup
+from MindustryTools.DenseGroups import DenseFactoryGroup, FixedPointFactoryGroup
+import MindustryTools.Materials as M
+
+# Plans are stored as a file header followed by records, all little-endian and padded to 8 bytes, so that the whole file can be viewed as arrays in place:
+#     File header: MAGIC, FORMAT (uint32), catalog_version() (uint32).
+#     Record header: length in bytes, including the header (uint32), kind (uint8), flags (uint8), padding (uint16), material count (uint32), building count (uint32).
+#     SYMBOLS record: the ids of new materials and buildings, as JSON. Codes are given in the order symbols are first written, starting at 0 for each kind.
+#     PLAN record: material codes and building codes (int32), then rates and counts (float64, or int64 if the flags say so).
+#         Fixed-point plans then have a byte for each rate and count, which is 1 if it reads as an int, padded.
+# REGISTRY indexes are only valid within one process, so plans refer to materials and buildings by these codes, and each file keeps its own symbols.
+MAGIC = b'MTPLANS\0'
+FORMAT = 2
+_FILE_HEADER = struct.Struct('<8sII')
+_RECORD_HEADER = struct.Struct('<IBBHII')
+SYMBOLS, PLAN = 1, 2
+INTEGER_RATES, INTEGER_COUNTS, FIXED_POINT = 1, 2, 4 # Flags of a PLAN record. Fixed-point plans store the raw values of a FixedPointFactoryGroup.
+
+def pack_plan(group: FactoryGroup | Factory) -> bytes:
+    '''
+    Serializes a plan to a compact binary form: a header with the catalog version, the ids of the materials and buildings it uses, and packed arrays of its rates and counts.
+    This is a PlanStore of one plan, so it is much smaller and faster to read than a pickle.
+
+    Args:
+        group (FactoryGroup | Factory): The plan. FixedPointFactoryGroups keep their exact values.
+
+    Returns:
+        bytes: The serialized plan.
+    '''
+    symbols = _Symbols()
+    plan = _plan_record(group, symbols)
+    return _FILE_HEADER.pack(MAGIC, FORMAT, catalog_version()) + symbols.record() + plan
+
+def unpack_plan(data: bytes, check_catalog: bool = True) -> FactoryGroup:
+    '''
+    Reads a plan serialized by pack_plan().
+
+    Args:
+        data (bytes): The serialized plan.
+        check_catalog (bool): Whether to raise an exception if the plan was written with a different catalog. Defaults to True.
+
+    Returns:
+        FactoryGroup: The plan, as a FixedPointFactoryGroup if it was one.
+
+    Raises:
+        MindustryException: If the data is not a plan, or was written with a different catalog.
+    '''
+    symbols = _Symbols()
+    for kind, flags, materials, buildings, start, end in _records(data, _check_header(data, check_catalog)):
+        if kind == SYMBOLS:
+            symbols.read(data[start:end], materials, buildings)
+        elif kind == PLAN:
+            start -= _RECORD_HEADER.size
+            codes, values = _layout(start, materials, buildings)
+            return _plan(symbols, flags,
+                         np.frombuffer(data, '<i4', materials, codes), np.frombuffer(data, '<i8' if flags & INTEGER_RATES else '<f8', materials, values),
+                         np.frombuffer(data, '<i4', buildings, codes + 4 * materials), np.frombuffer(data, '<i8' if flags & INTEGER_COUNTS else '<f8', buildings, values + 8 * materials),
+                         np.frombuffer(data, 'u1', materials + buildings, values + 8 * (materials + buildings)) if flags & FIXED_POINT else None)
+    raise MindustryException("The data contains no plan.")
+
+class PlanStore():
+    '''
+    An append-only file of plans, which is memory-mapped to scan and filter them without reading every plan back into Python objects.
+
+        >>> with PlanStore('plans.bin') as store:
+        ...     store.extend(plans)
+        ...     heavy = store.select(store.rates(M.TITANIUM) < -10) # Every plan consuming more than 10 titanium / second
+
+    rates() and counts() gather one material or building from every plan with a few array operations over the mapped file, so filters are written as NumPy comparisons.
+    Reading a single plan only decodes its own record. A record left incomplete by an interrupted write is ignored, and is overwritten by the next append.
+    Only one process may append to a store at a time, but any number may read it; readers see plans appended after they opened it on their next call.
+
+    Args:
+        path (str): The file. It is created if it does not exist.
+        check_catalog (bool): Whether to raise an exception if the store was written with a different catalog. Defaults to True.
+
+    Attributes:
+        path (str): The file.
+    '''
+    def __init__(self, path: str, check_catalog: bool = True):
+        self.path = path
+        if not os.path.exists(path) or not os.path.getsize(path):
+            with open(path, 'wb') as file:
+                file.write(_FILE_HEADER.pack(MAGIC, FORMAT, catalog_version()))
+        with open(path, 'rb') as file:
+            _check_header(file.read(_FILE_HEADER.size), check_catalog)
+        self._file = None
+        self._map = None
+        self._size = 0
+        self._end = _FILE_HEADER.size # The end of the last complete record read
+        self._symbols = _Symbols()
+        self._written = (0, 0) # The number of materials and buildings in the symbols of the file
+        self._plans = [] # (offset, flags, materials, buildings) of each plan record
+        self._entries = {} # 'materials' or 'buildings': the cached entry arrays of every plan
+
+    def append(self, group: FactoryGroup | Factory) -> int:
+        '''
+        Adds a plan to the end of the store.
+
+        Returns:
+            int: The position of the plan.
+        '''
+        return self.extend([group])[0]
+
+    def extend(self, groups: Iterable[FactoryGroup | Factory]) -> List[int]:
+        '''
+        Adds plans to the end of the store, in one write.
+
+        Returns:
+            List[int]: The positions of the plans.
+        '''
+        self._refresh()
+        records, plans, end = [], [], self._end
+        for group in groups:
+            plan = _plan_record(group, self._symbols) # Adds any new symbols, which are written first
+            symbols = self._symbols.record(*self._written)
+            self._written = (len(self._symbols.materials), len(self._symbols.buildings))
+            records += [symbols, plan]
+            end += len(symbols)
+            _, _, flags, _, materials, buildings = _RECORD_HEADER.unpack_from(plan)
+            plans.append((end, flags, materials, buildings))
+            end += len(plan)
+        if self._file is None:
+            self._file = open(self.path, 'r+b')
+        self._file.seek(self._end) # Past the last complete record, overwriting any incomplete one
+        self._file.write(b''.join(records))
+        self._file.truncate()
+        self._file.flush()
+        positions = list(range(len(self._plans), len(self._plans) + len(plans)))
+        self._plans += plans
+        self._end = end # The new records are already known, so are not read back
+        self._refresh()
+        return positions
+
+    def __len__(self) -> int:
+        self._refresh()
+        return len(self._plans)
+
+    def __getitem__(self, position: int) -> FactoryGroup:
+        self._refresh()
+        offset, flags, materials, buildings = self._plans[position]
+        codes, values = _layout(offset, materials, buildings)
+        return _plan(self._symbols, flags,
+                     self._view('<i4', codes, materials), self._view('<i8' if flags & INTEGER_RATES else '<f8', values, materials),
+                     self._view('<i4', codes + 4 * materials, buildings), self._view('<i8' if flags & INTEGER_COUNTS else '<f8', values + 8 * materials, buildings),
+                     self._view('u1', values + 8 * (materials + buildings), materials + buildings) if flags & FIXED_POINT else None)
+
+    def __iter__(self) -> Iterator[FactoryGroup]:
+        for position in range(len(self)):
+            yield self[position]
+
+    def select(self, which: np.ndarray | Iterable[int]) -> List[FactoryGroup]:
+        '''
+        Reads some of the plans.
+
+        Args:
+            which (np.ndarray | Iterable[int]): A boolean mask over the plans, such as the result of comparing rates(), or their positions.
+
+        Returns:
+            List[FactoryGroup]: The plans, in order.
+        '''
+        which = np.asarray(which)
+        positions = np.flatnonzero(which) if which.dtype == bool else which
+        return [self[int(position)] for position in positions]
+
+    def rates(self, material: M.Material) -> np.ndarray:
+        '''
+        The rate of a material in every plan, without reading the plans.
+
+        Returns:
+            np.ndarray: The rate in each plan, in materials / second, or 0 where a plan does not use the material.
+        '''
+        return self._gather('materials', self._symbols.material_codes.get(_material_key(material)))
+
+    def counts(self, factory: Building) -> np.ndarray:
+        '''
+        The count of a building in every plan, without reading the plans.
+
+        Returns:
+            np.ndarray: The count in each plan, or 0 where a plan does not have the building.
+        '''
+        return self._gather('buildings', self._symbols.building_codes.get(_building_key(factory)))
+
+    def close(self):
+        self._entries = {}
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+
+    def __repr__(self):
+        return f"PlanStore('{self.path}', {len(self)} plans)"
+
+    def _refresh(self):
+        'Maps the file again and reads any records appended since it was last read.'
+        size = os.path.getsize(self.path)
+        if size == self._size:
+            return
+        self._entries = {}
+        if self._map is not None:
+            self._map.close()
+        with open(self.path, 'rb') as file:
+            self._map = mmap.mmap(file.fileno(), 0, access = mmap.ACCESS_READ)
+        self._size = size
+        for kind, flags, materials, buildings, start, end in _records(self._map, self._end):
+            if kind == SYMBOLS:
+                self._symbols.read(self._map[start:end], materials, buildings)
+                self._written = (len(self._symbols.materials), len(self._symbols.buildings))
+            elif kind == PLAN:
+                self._plans.append((start - _RECORD_HEADER.size, flags, materials, buildings))
+            self._end = end
+
+    def _view(self, dtype: str, offset: int, count: int) -> np.ndarray:
+        return np.frombuffer(self._map, dtype, count, offset)
+
+    def _gather(self, kind: str, code: Optional[int]) -> np.ndarray:
+        'The value of one symbol in every plan, as a float.'
+        self._refresh()
+        result = np.zeros(len(self._plans))
+        if code is None or not self._plans:
+            return result
+        plans, codes, values = self._entries.get(kind) or self._build_entries(kind)
+        found = codes == code
+        result[plans[found]] = values[found]
+        return result
+
+    def _build_entries(self, kind: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        '''
+        The plan, code and value of every material (or building) entry in the store, read straight from the mapped file.
+        Records are aligned to 8 bytes, so the file is viewed as int32, int64 and float64 arrays and the entries are gathered by position.
+        '''
+        offsets, flags, materials, buildings = (np.array(column, dtype=np.int64) for column in zip(*self._plans))
+        counts = materials if kind == 'materials' else buildings
+        skip = 0 if kind == 'materials' else materials # Entries before these in the codes and values arrays of each record
+        codes_at, values_at = _layout(offsets, materials, buildings)
+        plans = np.repeat(np.arange(len(offsets)), counts)
+        within = np.arange(len(plans)) - np.repeat(np.cumsum(counts) - counts, counts)
+
+        length = self._size // 8 * 8
+        words = np.frombuffer(self._map, '<i4', length // 4)
+        codes = words[(np.repeat(codes_at + 4 * skip, counts) + 4 * within) // 4]
+        positions = (np.repeat(values_at + 8 * skip, counts) + 8 * within) // 8
+        integer = np.repeat(flags & (INTEGER_RATES if kind == 'materials' else INTEGER_COUNTS) != 0, counts)
+        values = np.where(integer, np.frombuffer(self._map, '<i8', length // 8)[positions], np.frombuffer(self._map, '<f8', length // 8)[positions])
+        fixed = np.repeat(flags & FIXED_POINT != 0, counts)
+        if fixed.any():
+            values[fixed] /= FixedPointFactoryGroup.UNIT if kind == 'materials' else FixedPointFactoryGroup.PARTS
+        self._entries[kind] = plans, codes, values
+        return plans, codes, values
+
+class _Symbols():
+    '''
+    The codes of the materials and buildings in one file, in the order they were first written.
+
+    Attributes:
+        materials (List): The key of each material code.
+        buildings (List): The key of each building code.
+        material_codes (Dict): The code of each material key.
+        building_codes (Dict): The code of each building key.
+    '''
+    def __init__(self):
+        self.materials, self.buildings = [], []
+        self.material_codes, self.building_codes = {}, {}
+        self._resolved = {} # (kind, code): object
+
+    def material_code(self, material: M.Material) -> int:
+        key = _material_key(material)
+        code = self.material_codes.get(key)
+        if code is None:
+            code = self.material_codes[key] = len(self.materials)
+            self.materials.append(key)
+            self._resolved['materials', code] = material
+        return code
+
+    def building_code(self, building: Building) -> int:
+        key = _building_key(building)
+        code = self.building_codes.get(key)
+        if code is None:
+            code = self.building_codes[key] = len(self.buildings)
+            self.buildings.append(key)
+            self._resolved['buildings', code] = building
+        return code
+
+    def material(self, code: int) -> M.Material:
+        material = self._resolved.get(('materials', code))
+        if material is None:
+            id = self.materials[code]
+            try:
+                material = self._resolved['materials', code] = REGISTRY.materials.by_id(id)
+            except KeyError:
+                raise MindustryException(f"Unknown material id {id}; load its catalog before reading plans that use it.")
+        return material
+
+    def building(self, code: int) -> Building:
+        building = self._resolved.get(('buildings', code))
+        if building is None:
+            id, fields = self.buildings[code]
+            try:
+                building = REGISTRY.buildings.by_id(id)
+            except KeyError:
+                raise MindustryException(f"Unknown building id {id}; load its catalog or register it before reading plans that use it.")
+            building = self._resolved['buildings', code] = building.variant(**dict(fields))
+        return building
+
+    def record(self, materials: int = 0, buildings: int = 0) -> bytes:
+        'A SYMBOLS record of the symbols added after the given counts, or nothing if there are none.'
+        new_materials, new_buildings = self.materials[materials:], self.buildings[buildings:]
+        if not new_materials and not new_buildings:
+            return b''
+        payload = json.dumps([new_materials, [[id, dict(fields)] for id, fields in new_buildings]], separators = (',', ':')).encode()
+        payload += b' ' * (-len(payload) % 8)
+        return _RECORD_HEADER.pack(_RECORD_HEADER.size + len(payload), SYMBOLS, 0, 0, len(new_materials), len(new_buildings)) + payload
+
+    def read(self, payload: bytes, materials: int, buildings: int):
+        'Adds the symbols of a SYMBOLS record.'
+        new_materials, new_buildings = json.loads(bytes(payload))
+        if len(new_materials) != materials or len(new_buildings) != buildings:
+            raise MindustryException("The plan data is corrupt.")
+        for id in new_materials:
+            self.material_codes[id] = len(self.materials)
+            self.materials.append(id)
+        for id, fields in new_buildings:
+            key = (id, tuple(fields.items()))
+            self.building_codes[key] = len(self.buildings)
+            self.buildings.append(key)
+
+def _material_key(material: M.Material):
+    return material.id
+
+def _building_key(building: Building):
+    return (building.id, tuple((name, getattr(building, name)) for name in building._variant_fields))
+
+def _check_header(data: bytes, check_catalog: bool) -> int:
+    'Checks the file header, and returns where the records start.'
+    if len(data) < _FILE_HEADER.size:
+        raise MindustryException("The data is not a plan store.")
+    magic, format, version = _FILE_HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise MindustryException("The data is not a plan store.")
+    if format != FORMAT:
+        raise MindustryException(f"The plan store has format {format}, but only format {FORMAT} can be read.")
+    if check_catalog and version != catalog_version():
+        raise MindustryException("The plans were written with a different catalog, so their rates may not match it. Pass check_catalog = False to read them anyway.")
+    return _FILE_HEADER.size
+
+def _records(buffer, position: int) -> Iterator[Tuple[int, int, int, int, int, int]]:
+    'The (kind, flags, materials, buildings, payload start, end) of each complete record from a position.'
+    while position + _RECORD_HEADER.size <= len(buffer):
+        length, kind, flags, _, materials, buildings = _RECORD_HEADER.unpack_from(buffer, position)
+        if length < _RECORD_HEADER.size or length % 8 or position + length > len(buffer): # Incomplete
+            return
+        yield kind, flags, materials, buildings, position + _RECORD_HEADER.size, position + length
+        position += length
+
+def _layout(offset, materials, buildings):
+    'Where the codes and the values of a plan record start. Works on arrays of records too.'
+    codes = offset + _RECORD_HEADER.size
+    return codes, codes + (4 * (materials + buildings) + 7) // 8 * 8
+
+def _plan_record(group: FactoryGroup | Factory, symbols: _Symbols) -> bytes:
+    'A PLAN record of a plan, adding any new materials and buildings to the symbols.'
+    if isinstance(group, Factory):
+        group = FactoryGroup([group])
+    if isinstance(group, FixedPointFactoryGroup):
+        group._fit()
+        material_order, factory_order = group._material_order, group._factory_order
+        materials, factories = list(material_order.values()), list(factory_order.values())
+        rates = group.rates[list(material_order)].astype('<i8')
+        counts = group.counts[list(factory_order)].astype('<i8')
+        integral = np.concatenate([group._integral_rates[list(material_order)], group._integral_counts[list(factory_order)]]).astype('u1')
+        flags = FIXED_POINT | INTEGER_RATES | INTEGER_COUNTS
+    else:
+        integral = np.zeros(0, dtype='u1')
+        IOMap, factory_counts = group.IOMap, group.factories
+        materials, factories = list(IOMap), list(factory_counts)
+        rates, rate_flags = _pack_values(IOMap.values(), INTEGER_RATES)
+        counts, count_flags = _pack_values(factory_counts.values(), INTEGER_COUNTS)
+        flags = rate_flags | count_flags
+    codes = np.array([symbols.material_code(material) for material in materials] + [symbols.building_code(factory) for factory in factories], dtype='<i4').tobytes()
+    codes += b'\0' * (-len(codes) % 8)
+    body = codes + rates.tobytes() + counts.tobytes() + integral.tobytes()
+    body += b'\0' * (-len(body) % 8)
+    return _RECORD_HEADER.pack(_RECORD_HEADER.size + len(body), PLAN, flags, 0, len(materials), len(factories)) + body
+
+def _pack_values(values: Iterable[float], flag: int) -> Tuple[np.ndarray, int]:
+    'Packs values as int64 with the flag if they are all Python ints, so that they read back as ints, and otherwise as float64.'
+    values = list(values)
+    if all(type(value) is int for value in values):
+        return np.array(values, dtype='<i8'), flag
+    return np.array(values, dtype='<f8'), 0
+
+def _plan(symbols: _Symbols, flags: int, material_codes: np.ndarray, rates: np.ndarray, factory_codes: np.ndarray, counts: np.ndarray, integral: Optional[np.ndarray] = None) -> FactoryGroup:
+    'Builds a plan from the arrays of its record, and for a fixed-point plan, whether each rate and count reads as an int.'
+    materials = [symbols.material(code) for code in material_codes.tolist()]
+    factories = [symbols.building(code) for code in factory_codes.tolist()]
+    if flags & FIXED_POINT:
+        group = FixedPointFactoryGroup()
+        for factory, count in zip(factories, counts.tolist()):
+            DenseFactoryGroup._add_count(group, factory, count) # The stored values are already in fixed-point units
+        for material, rate in zip(materials, rates.tolist()):
+            DenseFactoryGroup._add_rate(group, material, rate)
+        group._integral_rates[[material.index for material in materials]] = integral[:len(materials)]
+        group._integral_counts[[factory.index for factory in factories]] = integral[len(materials):]
+        return group
+    group = FactoryGroup()
+    group.factories = dict(zip(factories, counts.tolist()))
+    group.IOMap = dict(zip(materials, rates.tolist()))
+    return group
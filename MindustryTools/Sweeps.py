@@ -0,0 +1,276 @@
+import csv
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from MindustryTools.MindustryObject import MindustryObject
+from MindustryTools.Factories import FactoryGroup
+
+def parameter_grid(**axes: Iterable) -> List[dict]:
+    '''
+    Every combination of the given parameter values, in order (the last parameter varies fastest).
+
+        >>> parameter_grid(rate = [1, 2], boosted = [False, True])
+        [{'rate': 1, 'boosted': False}, {'rate': 1, 'boosted': True}, {'rate': 2, 'boosted': False}, {'rate': 2, 'boosted': True}]
+
+    Returns:
+        List[dict]: The parameters of each point.
+    '''
+    names = list(axes)
+    return [dict(zip(names, values)) for values in itertools.product(*(list(axes[name]) for name in names))]
+
+def iter_sweep(builder: Callable[..., Any], grid: Dict[str, Iterable] | Iterable[dict], processes: Optional[int] = None, chunksize: Optional[int] = None,
+               checkpoint: Optional[str] = None, executor: Optional[Executor] = None, retry_errors: bool = True) -> Iterator[dict]:
+    '''
+    Evaluates a plan builder at every point of a parameter grid, yielding each row as soon as it is finished. See sweep().
+
+    Rows already in the checkpoint are yielded first, without being evaluated again (except for errors, if retry_errors is set). Rows are otherwise yielded in the order their chunks finish, not in grid order.
+
+    Yields:
+        dict: The row of each point.
+    '''
+    points = parameter_grid(**grid) if isinstance(grid, dict) else list(grid)
+    done = _read_checkpoint(checkpoint, retry_errors) if checkpoint is not None else {}
+    pending = []
+    for index, parameters in enumerate(points):
+        row = done.get(_key(parameters))
+        if row is not None:
+            yield {**row, 'index': index}
+        else:
+            pending.append((index, parameters))
+    if not pending:
+        return
+
+    file = None
+    if checkpoint is not None:
+        incomplete = _incomplete(checkpoint)
+        file = open(checkpoint, 'a')
+        if incomplete: # Ends the line left by an interrupted sweep, so the next row starts on its own line
+            file.write('\n')
+    try:
+        for row in _evaluate(builder, pending, processes, chunksize, executor):
+            if file is not None:
+                file.write(json.dumps(row) + '\n')
+                file.flush()
+            yield row
+    finally:
+        if file is not None:
+            file.close()
+
+def sweep(builder: Callable[..., Any], grid: Dict[str, Iterable] | Iterable[dict], processes: Optional[int] = None, chunksize: Optional[int] = None,
+          checkpoint: Optional[str] = None, progress: bool | Callable[[int, int], None] = False, executor: Optional[Executor] = None, retry_errors: bool = True) -> 'SweepResult':
+    '''
+    Evaluates a plan builder at every point of a parameter grid, across a process pool.
+
+        >>> def build(rate, efficiency):
+        ...     return (FactoryGroup({SporePress(): rate}) @ Cultivator(efficiency = efficiency)).get_upstream(rounded = True)
+        >>> result = sweep(build, {'rate': [1, 2, 4], 'efficiency': [1.0, 2.0, 3.0]}, checkpoint = 'sweep.jsonl')
+        >>> result.to_csv('sweep.csv')
+
+    Points are sent to the workers in chunks, to keep the overhead of the pool small next to the cost of each point.
+    A point whose builder raises an exception is recorded with its error rather than stopping the sweep.
+    With a checkpoint, each row is appended to a JSON lines file as soon as it is finished, and a sweep that is run again with the same file only evaluates the points that are missing from it or that failed.
+
+    Args:
+        builder (Callable[..., Any]): Called with the parameters of each point as keyword arguments. Usually returns a FactoryGroup, but may return a number or a dictionary of numbers.
+            With more than one process, it must be picklable (defined at the top level of a module).
+        grid (Dict[str, Iterable] | Iterable[dict]): The values of each parameter, which are combined with parameter_grid(), or the parameters of each point.
+        processes (int, optional): The number of worker processes. Defaults to one per CPU. With 1, the points are evaluated in this process.
+            With an executor, the number of workers it has, which the default chunksize is based on.
+        chunksize (int, optional): The number of points sent to a worker at once. Defaults to about four chunks per worker.
+        checkpoint (str, optional): A JSON lines file to resume from and append rows to. Defaults to None.
+        progress (bool | Callable[[int, int], None]): Whether to report progress on stderr, or a function called with the number of points done and the total. Defaults to False.
+        executor (Executor, optional): An executor to evaluate the chunks with, instead of a new process pool.
+        retry_errors (bool): Whether to evaluate points again whose row in the checkpoint is an error. Defaults to True.
+
+    Returns:
+        SweepResult: The rows, in grid order.
+    '''
+    if progress is True:
+        progress = _report
+    points = parameter_grid(**grid) if isinstance(grid, dict) else list(grid)
+    rows = []
+    for row in iter_sweep(builder, points, processes, chunksize, checkpoint, executor, retry_errors):
+        rows.append(row)
+        if progress:
+            progress(len(rows), len(points))
+    if progress is _report:
+        sys.stderr.write('\n')
+    return SweepResult(sorted(rows, key = lambda row: row['index']))
+
+class SweepResult():
+    '''
+    The rows of a sweep, one per point, in grid order.
+
+    Each row is a dictionary with:
+        index (int): The position of the point in the grid.
+        parameters (dict): The parameters of the point. Materials and buildings are replaced by their names.
+        rates (Dict[str, float]): The rate of each material in the plan, by name.
+        counts (Dict[str, float]): The count of each factory in the plan, by name.
+        value: What the builder returned, if it was not a FactoryGroup.
+        error (str): The exception the builder raised, if any.
+        seconds (float): How long the point took to evaluate.
+
+    Attributes:
+        rows (List[dict]): The rows.
+    '''
+    def __init__(self, rows: List[dict]):
+        self.rows = rows
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __getitem__(self, index: int) -> dict:
+        return self.rows[index]
+
+    @property
+    def errors(self) -> List[dict]:
+        'The rows of the points whose builder raised an exception.'
+        return [row for row in self.rows if 'error' in row]
+
+    def table(self) -> List[dict]:
+        '''
+        The rows as flat records, for spreadsheets and data frames. Rates are in columns named after their material, and counts in columns named "<factory> count".
+
+        Returns:
+            List[dict]: One record per row. Missing values are left out.
+        '''
+        records = []
+        for row in self.rows:
+            record = {'index': row['index'], **row['parameters']}
+            record.update(row.get('rates', {}))
+            record.update({f'{name} count': count for name, count in row.get('counts', {}).items()})
+            if 'value' in row:
+                value = row['value']
+                record.update(value if isinstance(value, dict) else {'value': value})
+            if 'error' in row:
+                record['error'] = row['error']
+            record['seconds'] = row['seconds']
+            records.append(record)
+        return records
+
+    def columns(self) -> List[str]:
+        'Every column of table(), in the order they first appear.'
+        return list(dict.fromkeys(column for record in self.table() for column in record))
+
+    def column(self, name: str) -> List[Any]:
+        'The values of one column of table(), with None where a row has no value.'
+        return [record.get(name) for record in self.table()]
+
+    def to_csv(self, path: Optional[str] = None) -> str:
+        '''
+        Exports table() as CSV.
+
+        Args:
+            path (str): A file to write the CSV to. Defaults to None.
+
+        Returns:
+            str: The CSV.
+        '''
+        import io
+        records = self.table()
+        columns = list(dict.fromkeys(column for record in records for column in record))
+        text = io.StringIO()
+        writer = csv.DictWriter(text, columns, lineterminator = '\n')
+        writer.writeheader()
+        writer.writerows(records)
+        if path is not None:
+            with open(path, 'w', newline = '') as file:
+                file.write(text.getvalue())
+        return text.getvalue()
+
+    def __repr__(self):
+        return f'SweepResult({len(self.rows)} rows, {len(self.errors)} errors)'
+
+def _evaluate(builder: Callable[..., Any], pending: List[tuple], processes: Optional[int], chunksize: Optional[int], executor: Optional[Executor]) -> Iterator[dict]:
+    'Evaluates the pending (index, parameters) points in chunks, yielding rows as each chunk finishes.'
+    if executor is None and processes == 1:
+        for index, parameters in pending:
+            yield _run_point(builder, index, parameters)
+        return
+    workers = processes or os.cpu_count() or 1
+    if chunksize is None:
+        chunksize = max(len(pending) // (workers * 4), 1)
+    chunks = [pending[start:start + chunksize] for start in range(0, len(pending), chunksize)]
+    pool = executor if executor is not None else ProcessPoolExecutor(max_workers = processes)
+    try:
+        futures = [pool.submit(_run_chunk, builder, chunk) for chunk in chunks]
+        for future in as_completed(futures):
+            yield from future.result()
+    finally:
+        if executor is None:
+            pool.shutdown(cancel_futures = True)
+
+def _run_chunk(builder: Callable[..., Any], chunk: List[tuple]) -> List[dict]:
+    'Evaluates a chunk of points. Runs in a worker process.'
+    return [_run_point(builder, index, parameters) for index, parameters in chunk]
+
+def _run_point(builder: Callable[..., Any], index: int, parameters: dict) -> dict:
+    'Evaluates one point, and converts the result to a row of plain values, so that it is cheap to send back and can be written as JSON.'
+    start = time.perf_counter()
+    row = {'index': index, 'parameters': _plain(parameters)}
+    try:
+        result = builder(**parameters)
+    except Exception as exception:
+        row['error'] = f'{type(exception).__name__}: {exception}'
+    else:
+        if isinstance(result, FactoryGroup):
+            row['rates'] = {material.name: rate for material, rate in result.IOMap.items()}
+            row['counts'] = {factory.name: count for factory, count in result.factories.items()}
+        else:
+            row['value'] = _plain(result)
+    row['seconds'] = time.perf_counter() - start
+    return row
+
+def _plain(value: Any) -> Any:
+    'A value with materials and buildings replaced by their names, and other unknown objects by their repr, so that it can be written as JSON.'
+    if isinstance(value, MindustryObject):
+        return value.name
+    if isinstance(value, dict):
+        return {str(_plain(key)): _plain(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(item) for item in value]
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if hasattr(value, 'item'): # NumPy scalars
+        return value.item()
+    return repr(value)
+
+def _key(parameters: dict) -> str:
+    'Identifies a point in a checkpoint by its parameters, so that a checkpoint still applies when points are added to the grid.'
+    return json.dumps(_plain(parameters), sort_keys = True)
+
+def _read_checkpoint(path: str, retry_errors: bool = True) -> Dict[str, dict]:
+    'The rows in a checkpoint by their key, skipping a last line left incomplete by an interrupted sweep, and errors if they are to be retried.'
+    rows = {}
+    if not os.path.exists(path):
+        return rows
+    with open(path) as file:
+        for line in file:
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if retry_errors and 'error' in row:
+                continue
+            rows[json.dumps(row['parameters'], sort_keys = True)] = row
+    return rows
+
+def _incomplete(path: str) -> bool:
+    'Whether a checkpoint ends partway through a line.'
+    if not os.path.exists(path) or not os.path.getsize(path):
+        return False
+    with open(path, 'rb') as file:
+        file.seek(-1, os.SEEK_END)
+        return file.read(1) != b'\n'
+
+def _report(done: int, total: int):
+    sys.stderr.write(f'\r{done}/{total} points ({100 * done / total:.0f}%)')
+    sys.stderr.flush()
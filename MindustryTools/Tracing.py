@@ -0,0 +1,186 @@
+import functools
+import json
+import threading
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional
+
+# The innermost active tracer of the current thread (or asyncio task), or None. Instrumented code checks this once per call, so tracing costs nothing when it is off.
+ACTIVE: ContextVar[Optional['Tracer']] = ContextVar('ACTIVE', default = None)
+
+# Operators counted while any tracer is active. __init__ is counted as an allocation.
+OPERATORS = ['__init__', '__add__', '__radd__', '__iadd__', '__sub__', '__rsub__', '__isub__', '__mul__', '__rmul__', '__imul__', '__matmul__', '__rmatmul__', '__imatmul__', '__truediv__', '__floordiv__']
+_originals = {} # (class, name): the original function of each instrumented operator
+_instrument_lock = threading.Lock()
+
+class Tracer():
+    '''
+    Records what get_upstream does, and counts factory group operations. Use it as a context manager:
+
+        >>> with Tracer() as tracer:
+        ...     plan = FactoryGroup([SurgeSmelter()]).get_upstream()
+        >>> tracer.counters['iterations']
+
+    Each get_upstream call is recorded as a span, containing one event per iteration with the material chased, its source, the ratio added, the size of the IOMap and the elapsed time.
+    The operators of FactoryGroup and its subclasses are wrapped to count calls the first time a tracer is entered; this includes operators used internally (+ copies the group, then uses +=).
+    Tracing is local to the thread (or asyncio task) that entered the tracer, so other threads are neither recorded nor counted. Nested tracers each record their own events, and the innermost is the one that is active.
+
+    Attributes:
+        events (List[dict]): The recorded spans and events, in the order they started. Times are in seconds since the tracer was entered.
+        counters (Dict[str, int]): Counts of get_upstream calls, iterations, operator calls and allocations.
+        callback (Callable[[dict], None]): Called with each event as soon as it is complete. Defaults to None.
+        record_events (bool): Whether to keep the events. Turn off to only count, for long runs. Defaults to True.
+    '''
+    def __init__(self, callback: Optional[Callable[[dict], None]] = None, record_events: bool = True):
+        self.callback = callback
+        self.record_events = record_events
+        self.events = []
+        self.counters = {}
+        self._stack = []
+        self._start = None
+        self._token = None
+
+    def __enter__(self) -> 'Tracer':
+        _instrument()
+        self._token = ACTIVE.set(self)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exception):
+        ACTIVE.reset(self._token)
+        self._token = None
+
+    def now(self) -> float:
+        'The time since the tracer was entered, in seconds.'
+        return time.perf_counter() - self._start
+
+    def count(self, name: str, amount: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def begin(self, name: str, **args) -> dict:
+        '''
+        Starts a span, which contains every event recorded until it ends.
+
+        Returns:
+            dict: The span, to pass to end().
+        '''
+        span = {'name': name, 'start': self.now(), 'duration': None, 'depth': len(self._stack), 'args': args}
+        self._stack.append(span)
+        if self.record_events:
+            self.events.append(span)
+        return span
+
+    def end(self, span: dict, **args):
+        'Ends a span, adding any extra arguments to it.'
+        span['duration'] = self.now() - span['start']
+        span['args'].update(args)
+        while self._stack and self._stack.pop() is not span: # Also closes spans left open by an exception
+            pass
+        if self.callback is not None:
+            self.callback(span)
+
+    def event(self, name: str, start: float, **args):
+        '''
+        Records an event that started at the given time (as given by now()) and has just finished.
+        '''
+        event = {'name': name, 'start': start, 'duration': self.now() - start, 'depth': len(self._stack), 'args': args}
+        if self.record_events:
+            self.events.append(event)
+        if self.callback is not None:
+            self.callback(event)
+
+    def to_dict(self) -> dict:
+        'The counters and events, with materials and buildings replaced by their names.'
+        return {'counters': dict(self.counters), 'events': [{**event, 'args': _names(event['args'])} for event in self.events]}
+
+    def to_json(self, path: Optional[str] = None) -> str:
+        '''
+        Exports the counters and events as JSON.
+
+        Args:
+            path (str): A file to write the JSON to. Defaults to None.
+
+        Returns:
+            str: The JSON.
+        '''
+        return _write(json.dumps(self.to_dict(), indent = 1), path)
+
+    def to_chrome_trace(self, path: Optional[str] = None) -> str:
+        '''
+        Exports the events in the Chrome trace event format, which chrome://tracing, Perfetto and speedscope display as a flame chart.
+
+        Args:
+            path (str): A file to write the trace to. Defaults to None.
+
+        Returns:
+            str: The trace, as JSON.
+        '''
+        trace = [{
+            'name': _label(event), 'ph': 'X', 'pid': 0, 'tid': 0,
+            'ts': event['start'] * 1e6, 'dur': (event['duration'] or 0) * 1e6, 'args': _names(event['args']),
+        } for event in self.events]
+        trace += [{'name': name, 'ph': 'C', 'pid': 0, 'tid': 0, 'ts': self.now() * 1e6, 'args': {name: value}} for name, value in self.counters.items()]
+        return _write(json.dumps({'traceEvents': trace, 'displayTimeUnit': 'ms'}), path)
+
+    def to_folded(self, path: Optional[str] = None) -> str:
+        '''
+        Exports the events as folded stacks, one line per stack with its self time in microseconds, for flamegraph.pl and similar tools.
+
+        Args:
+            path (str): A file to write the stacks to. Defaults to None.
+
+        Returns:
+            str: The folded stacks.
+        '''
+        totals = {}
+        stack = [] # (event, stack label)
+        for event in self.events:
+            del stack[event['depth']:]
+            label = f'{stack[-1][1]};{_label(event)}' if stack else _label(event)
+            duration = event['duration'] or 0
+            totals[label] = totals.get(label, 0) + duration
+            if stack: # Time spent in a child is not the parent's self time
+                parent_label = stack[-1][1]
+                totals[parent_label] = totals.get(parent_label, 0) - duration
+            stack.append((event, label))
+        return _write(''.join(f'{label} {max(round(total * 1e6), 0)}\n' for label, total in totals.items()), path)
+
+def _label(event: dict) -> str:
+    'The name shown for an event in flame graphs.'
+    args = event['args']
+    if 'material' in args:
+        return f"{event['name']} {getattr(args['material'], 'name', args['material'])}"
+    return event['name']
+
+def _names(args: dict) -> dict:
+    return {key: getattr(value, 'name', value) for key, value in args.items()}
+
+def _write(text: str, path: Optional[str]) -> str:
+    if path is not None:
+        with open(path, 'w') as file:
+            file.write(text)
+    return text
+
+def _counted(function: Callable, counter: str) -> Callable:
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        tracer = ACTIVE.get()
+        if tracer is not None:
+            tracer.count(counter)
+        return function(*args, **kwargs)
+    return wrapper
+
+def _instrument():
+    '''
+    Wraps the operators of FactoryGroup and all of its subclasses to count calls, unless they are wrapped already.
+    The wrappers stay installed, as other threads may be tracing, and only count while a tracer is active in the calling thread.
+    '''
+    from MindustryTools.Factories import FactoryGroup
+    with _instrument_lock:
+        classes = [FactoryGroup]
+        for cls in classes:
+            classes.extend(cls.__subclasses__())
+            for name in OPERATORS:
+                if name in cls.__dict__ and (cls, name) not in _originals:
+                    _originals[cls, name] = cls.__dict__[name]
+                    setattr(cls, name, _counted(cls.__dict__[name], 'allocations' if name == '__init__' else name.strip('_')))
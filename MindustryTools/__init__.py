@@ -1,4 +1,41 @@
 from .MindustryObject import *
-from .Materials import *
-from .Factories import *
-from .Collectors import *
\ No newline at end of file
+from . import Materials, Factories, Collectors
+for _module in (Materials, Factories, Collectors): # As from .Module import *, without asking for their __all__, which would load the default catalog
+    globals().update({_name: _value for _name, _value in vars(_module).items() if not _name.startswith('_')})
+from .Catalog import Catalog, load_catalog, default_catalog, register_factory, catalog_version
+from .Graphs import RecipeGraph
+from .Expressions import *
+from .Tracing import Tracer
+from .Planning import IncrementalPlanner
+from .Caches import ResultCache, use_cache
+
+# Imported the first time one of their names is used, as they need numpy or are slow to import
+_LAZY_MODULES = ('DenseGroups', 'Solvers', 'Maps', 'Placements', 'Simulation', 'Sweeps', 'Storage', 'Queries', 'Service')
+_STAR_MODULES = ('DenseGroups', 'Maps', 'Placements', 'Simulation', 'Sweeps', 'Storage') # Their names are available here, as if by from .Module import *
+_NUMPY_MODULES = ('DenseGroups', 'Maps', 'Placements', 'Simulation', 'Storage') # Left out of from MindustryTools import *, so that it does not import numpy
+
+def __getattr__(name: str):
+    # Loads the default catalog and the numpy modules the first time they are used, so that importing the package stays fast
+    import importlib
+    if name in _LAZY_MODULES:
+        return importlib.import_module(f'{__name__}.{name}')
+    if name.startswith('__') and name != '__all__':
+        raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+    default_catalog() # Adds the materials and buildings to this module
+    if name == '__all__': # Used by from MindustryTools import *
+        _add_names(module for module in _STAR_MODULES if module not in _NUMPY_MODULES)
+        return [key for key in globals() if not key.startswith('_')]
+    if name in globals():
+        return globals()[name]
+    _add_names(_STAR_MODULES)
+    if name in globals():
+        return globals()[name]
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+
+def _add_names(modules):
+    # Adds the names of modules to this one, as if by from .Module import *
+    import importlib
+    for module in modules:
+        for key, value in vars(importlib.import_module(f'{__name__}.{module}')).items():
+            if not key.startswith('_'):
+                globals().setdefault(key, value)
@@ -0,0 +1,5 @@
+import sys
+
+from MindustryTools.Queries import main
+
+sys.exit(main())
@@ -0,0 +1,175 @@
+'''
+Benchmarks for MindustryTools. Runs offline, using only the standard library and the package's own dependencies.
+
+Usage:
+    python benchmarks/run.py [--quick] [--filter REGEX] [--output FILE] [--compare BASELINE]
+
+Each result records the best, median and mean time of one call, in seconds. Results are written as JSON so that runs can be compared with --compare.
+'''
+import argparse
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import time
+import timeit
+from typing import Callable, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from MindustryTools import FACTORIES, FactoryGroup, DenseFactoryGroup, FixedPointFactoryGroup
+from synthetic import make_catalog
+
+GROUP_SIZES = [1, 4, 16, 64, 256]
+CATALOG_SIZES = [100, 200, 400, 800]
+
+def measure(function: Callable, repeat: int, min_time: float) -> Dict[str, float]:
+    '''
+    Times a function with timeit, calling it enough times per sample to take at least min_time seconds.
+
+    Returns:
+        Dict[str, float]: The best, median and mean seconds per call, and the number of calls per sample.
+    '''
+    timer = timeit.Timer(function)
+    number = 1
+    while timer.timeit(number) < min_time:
+        number *= 10 if number < 1000 else 2
+    samples = [total / number for total in timer.repeat(repeat, number)]
+    return {'best': min(samples), 'median': statistics.median(samples), 'mean': statistics.fmean(samples), 'number': number, 'repeat': repeat}
+
+def bench_import(repeat: int, min_time: float) -> List[dict]:
+    'Times a cold import of the package in a fresh interpreter.'
+    code = 'import time; start = time.perf_counter(); import MindustryTools; print(time.perf_counter() - start)'
+    samples = []
+    for _ in range(max(repeat, 5)):
+        output = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True).stdout
+        samples.append(float(output))
+    return [{'name': 'import', 'params': {}, 'best': min(samples), 'median': statistics.median(samples), 'mean': statistics.fmean(samples), 'number': 1, 'repeat': len(samples)}]
+
+def bench_operators(repeat: int, min_time: float) -> List[dict]:
+    'Times each FactoryGroup operator on groups with a growing number of distinct factories.'
+    materials, factories, sources = make_catalog(2 * max(GROUP_SIZES))
+    results = []
+    for group_type in (FactoryGroup, DenseFactoryGroup, FixedPointFactoryGroup):
+        for size in GROUP_SIZES:
+            left = group_type(factories[:size])
+            right = group_type(factories[size:2 * size])
+            supplier = group_type([sources[material] for material in left.get_inputs() if material in sources][:size] or factories[:1])
+            operations = {
+                'copy': lambda: group_type(factory_group = left),
+                'add': lambda: left + right,
+                'sub': lambda: left - right,
+                'mul': lambda: left * 2.5,
+                'matmul': lambda: left @ supplier,
+                'truediv': lambda: left / supplier,
+                'get_inputs': lambda: left.get_inputs(),
+            }
+            accumulator = group_type(factory_group = left)
+            def iadd():
+                nonlocal accumulator
+                accumulator += right
+            def imatmul(): # Includes a copy, since repeating @= on one group does nothing after the first time
+                result = group_type(factory_group = left)
+                result @= supplier
+            operations['iadd'] = iadd
+            operations['copy+imatmul'] = imatmul
+            for operation, function in operations.items():
+                results.append({'name': f'operator.{operation}', 'params': {'group': group_type.__name__, 'size': size}, **measure(function, repeat, min_time)})
+    return results
+
+def bench_upstream(repeat: int, min_time: float) -> List[dict]:
+    'Times get_upstream for every factory in the catalog, with each solver, plain and rounded.'
+    results = []
+    for factory in FACTORIES.values():
+        group = FactoryGroup([factory])
+        for solver in ('iterative', 'linear'):
+            for rounded in (False, True):
+                function = lambda: group.get_upstream(rounded = rounded, solver = solver)
+                try:
+                    function()
+                except Exception as exception: # Recorded rather than aborting the whole run
+                    results.append({'name': 'upstream', 'params': {'factory': factory.name, 'solver': solver, 'rounded': rounded}, 'error': repr(exception)})
+                    continue
+                results.append({'name': 'upstream', 'params': {'factory': factory.name, 'solver': solver, 'rounded': rounded}, **measure(function, repeat, min_time)})
+    return results
+
+def bench_synthetic(repeat: int, min_time: float) -> List[dict]:
+    'Times get_upstream for the last recipe of synthetic catalogs with hundreds of recipes.'
+    results = []
+    for recipes in CATALOG_SIZES:
+        materials, factories, sources = make_catalog(recipes)
+        group = FactoryGroup([factories[-2]]) # The last recipe before the generator depends on the most others
+        for solver in ('iterative', 'linear'):
+            function = lambda: group.get_upstream(sources, solver = solver)
+            results.append({'name': 'synthetic.upstream', 'params': {'recipes': recipes, 'solver': solver}, **measure(function, repeat, min_time)})
+    return results
+
+BENCHMARKS = {
+    'import': bench_import,
+    'operators': bench_operators,
+    'upstream': bench_upstream,
+    'synthetic': bench_synthetic,
+}
+
+def metadata() -> dict:
+    'Describes the machine and revision the benchmarks ran on.'
+    try:
+        revision = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        revision = None
+    import numpy
+    return {
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'revision': revision,
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'numpy': numpy.__version__,
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+    }
+
+def result_key(result: dict) -> str:
+    return result['name'] + json.dumps(result['params'], sort_keys=True)
+
+def compare(baseline: dict, results: List[dict]):
+    'Prints the ratio of each median to the matching baseline median. Ratios above 1 are slower.'
+    previous = {result_key(result): result for result in baseline['results']}
+    for result in results:
+        old = previous.get(result_key(result))
+        if old is None or 'median' not in old or 'median' not in result:
+            continue
+        ratio = result['median'] / old['median']
+        print(f"{ratio:7.2f}x  {result['name']} {json.dumps(result['params'], sort_keys=True)}")
+
+def main(arguments: List[str] = None):
+    parser = argparse.ArgumentParser(description = 'Run the MindustryTools benchmarks.')
+    parser.add_argument('--quick', action = 'store_true', help = 'take fewer, shorter samples')
+    parser.add_argument('--filter', default = '', help = 'only run benchmarks whose group matches this regular expression')
+    parser.add_argument('--output', help = 'write the results to this JSON file')
+    parser.add_argument('--compare', help = 'compare the results with an earlier JSON file')
+    arguments = parser.parse_args(arguments)
+
+    repeat, min_time = (3, 0.02) if arguments.quick else (5, 0.1)
+    results = []
+    for group, benchmark in BENCHMARKS.items():
+        if not re.search(arguments.filter, group):
+            continue
+        print(f'Running {group}...', file = sys.stderr)
+        for result in benchmark(repeat, min_time):
+            results.append(result)
+            timing = f"{result['median'] * 1e6:12.1f} us" if 'median' in result else f"  error: {result['error']}"
+            print(f"{timing}  {result['name']} {json.dumps(result['params'], sort_keys=True)}")
+
+    if arguments.output:
+        with open(arguments.output, 'w') as file:
+            json.dump({'meta': metadata(), 'results': results}, file, indent = 1)
+    if arguments.compare:
+        with open(arguments.compare) as file:
+            compare(json.load(file), results)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+'''
+Synthetic recipe catalogs, for measuring how the planners scale past the size of the real catalog.
+'''
+import random
+from typing import Dict, List, Tuple
+
+from MindustryTools.Factories import Factory
+import MindustryTools.Materials as M
+
+def make_catalog(recipes: int, raw: int = 8, fan_in: int = 3, seed: int = 0) -> Tuple[List[M.Material], List[Factory], Dict[M.Material, Factory]]:
+    '''
+    Builds a random, acyclic catalog of recipes. Each recipe makes one new material from up to fan_in natural or previously made materials, and consumes power.
+    A synthetic generator burning the first natural material supplies the power. Catalogs with the same arguments are identical, and reuse the same registry entries.
+
+    Args:
+        recipes (int): The number of recipes (and made materials).
+        raw (int): The number of natural materials. Defaults to 8.
+        fan_in (int): The most inputs a recipe can have. Defaults to 3.
+        seed (int): The random seed. Defaults to 0.
+
+    Returns:
+        Tuple: The materials (natural first), the factories (the generator last), and the source of each made material and of power.
+    '''
+    generator = random.Random(seed)
+    prefix = f'synthetic-{seed}-{raw}-{fan_in}'
+    materials = [M.Material(id=f'{prefix}-raw-{i}', name=f'Raw {i}', is_natural=True) for i in range(raw)]
+    factories = []
+    sources = {}
+    for i in range(recipes):
+        product = M.Material(id=f'{prefix}-material-{i}', name=f'Material {i}')
+        inputs = {material: round(generator.uniform(0.5, 4), 2) for material in generator.sample(materials, min(fan_in, len(materials)))}
+        factory = Factory(
+            id=f'{prefix}-factory-{i}', name=f'Factory {i}', size=generator.randint(1, 4), power=-generator.randint(10, 300),
+            inputs=inputs, outputs={product: round(generator.uniform(0.5, 4), 2)},
+        )
+        materials.append(product)
+        factories.append(factory)
+        sources[product] = factory
+
+    power = Factory(id=f'{prefix}-generator', name='Synthetic Generator', size=2, power=600, inputs={materials[0]: 1}, outputs={})
+    factories.append(power)
+    sources[M.POWER] = power
+    return materials, factories, sources
@@ -9,7 +9,8 @@ setup(
     author = 'Samuel Squires',
     author_email = 'sdsquires@gmail.com',
     url = 'https://github.com/sdsquire/MindustryTools',
-    packages = find_packages(),
+    packages = find_packages(exclude = ['tests', 'tests.*']),
+    package_data = {'MindustryTools': ['data/*.json']},
     classifiers = [
         'Development Status :: 3 - Alpha',
         'Intended Audience :: Developers',
@@ -18,6 +19,7 @@ setup(
         'Programming Language :: Python :: 3.11',
     ],
     python_requires = '>=3.8',
-    install_requires = [],
+    install_requires = ['numpy'],
+    entry_points = {'console_scripts': ['mindustry-tools = MindustryTools.Queries:main']},
 
 )
\ No newline at end of file
@@ -0,0 +1,69 @@
+'''
+Tests of the on-disk result cache: hits, misses, and misses after the catalog changes.
+'''
+from MindustryTools.Caches import ResultCache
+from MindustryTools.Catalog import catalog_version, register_factory
+from MindustryTools.Factories import Factory, FactoryGroup, Kiln, SurgeSmelter
+import MindustryTools.Materials as M
+
+def plan(factory) -> FactoryGroup:
+    return FactoryGroup([factory]).get_upstream(solver = 'linear')
+
+def test_hit_after_miss(tmp_path):
+    with ResultCache(str(tmp_path / 'cache.db')) as cache:
+        first = plan(SurgeSmelter())
+        assert cache.counters['misses'] == 1 and cache.counters['hits'] == 0
+        second = plan(SurgeSmelter())
+        assert cache.counters['hits'] == 1
+    assert second.factories == first.factories and second.IOMap == first.IOMap
+    assert plan(SurgeSmelter()).IOMap == first.IOMap # Uncached once the cache is no longer active
+    assert cache.counters['hits'] == 1
+
+def test_totals_are_shared(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    with ResultCache(path):
+        plan(Kiln())
+    with ResultCache(path) as cache: # As another process would open it
+        plan(Kiln())
+        plan(Kiln())
+    stats = ResultCache(path).stats()
+    assert (stats['hits'], stats['misses'], stats['stores'], stats['entries']) == (2, 1, 1, 1)
+
+def test_different_arguments_miss(tmp_path):
+    with ResultCache(str(tmp_path / 'cache.db')) as cache:
+        plan(Kiln())
+        FactoryGroup({Kiln(): 2}).get_upstream(solver = 'linear')
+        FactoryGroup([Kiln()]).get_upstream(solver = 'linear', rounded = True)
+        assert cache.counters['hits'] == 0
+
+def test_miss_after_catalog_change(tmp_path):
+    with ResultCache(str(tmp_path / 'cache.db')) as cache:
+        before = plan(Kiln())
+        plan(Kiln())
+        assert cache.counters == {'hits': 1, 'misses': 1, 'stores': 1, 'evictions': 0}
+
+        version = catalog_version()
+        # A new product, so that no other plan changes
+        token = M.Material(id = '9001', name = 'Test_token')
+        register_factory(Factory(id = 9001, name = 'Token Press', size = 1, power = 0, inputs = {M.COPPER: 1.0}, outputs = {token: 1.0}))
+        assert catalog_version() != version
+
+        after = plan(Kiln())
+        assert cache.counters['misses'] == 2 and cache.counters['hits'] == 1
+        assert after.IOMap == before.IOMap
+        plan(Kiln())
+        assert cache.counters['hits'] == 2
+
+def test_miss_after_sources_change(tmp_path):
+    import MindustryTools.Factories as F
+    with ResultCache(str(tmp_path / 'cache.db')) as cache:
+        assert F.SiliconCrucible() in plan(SurgeSmelter()).factories
+        F.SOURCES[M.SILICON].append(F.SiliconSmelter()) # The last source is the default one
+        try:
+            edited = plan(SurgeSmelter())
+            assert cache.counters['misses'] == 2 and cache.counters['hits'] == 0
+            assert F.SiliconSmelter() in edited.factories and F.SiliconCrucible() not in edited.factories
+        finally:
+            F.SOURCES[M.SILICON].pop()
+        assert F.SiliconCrucible() in plan(SurgeSmelter()).factories
+        assert cache.counters['hits'] == 1
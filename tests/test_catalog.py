@@ -0,0 +1,70 @@
+'''
+Tests of catalogs: loading the default catalog lazily, and loading other catalogs from data files.
+'''
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from MindustryTools.MindustryObject import MindustryException
+from MindustryTools.Catalog import Catalog, _read, default_catalog, load_catalog
+from MindustryTools.Factories import FactoryGroup
+import MindustryTools.Materials as M
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def run(code: str) -> str:
+    'Runs code in a new interpreter, so that nothing is loaded yet, and returns what it prints.'
+    return subprocess.run([sys.executable, '-c', code], cwd = ROOT, capture_output = True, text = True, check = True).stdout.strip()
+
+def test_import_is_lazy():
+    loaded = 'sys.modules["MindustryTools.Catalog"]._default is not None'
+    assert run(f'import sys, MindustryTools; print({loaded}, "numpy" in sys.modules)') == 'False False'
+    assert run(f'import sys, MindustryTools; MindustryTools.SurgeSmelter; print({loaded}, "numpy" in sys.modules)') == 'True False'
+    assert run('import sys; from MindustryTools import *; print(SurgeSmelter().name, "numpy" in sys.modules)') == 'Surge Smelter False'
+    assert run('import MindustryTools; print(MindustryTools.DenseFactoryGroup.__name__)') == 'DenseFactoryGroup'
+
+def test_default_catalog():
+    catalog = default_catalog()
+    assert load_catalog() is catalog
+    assert catalog.SurgeSmelter().name == 'Surge Smelter' and catalog.COPPER is M.COPPER
+    assert all(factories[-1] is catalog.default_sources()[material] for material, factories in catalog.sources.items() if factories)
+
+# A small mod, with ids that no other catalog uses
+MOD = {
+    'name': 'Test mod',
+    'materials': {'ZINC': {'id': 9401, 'name': 'Zinc', 'is_natural': True}, 'BRASS': {'id': 9402, 'name': 'Brass'}},
+    'lists': {'METALS': ['ZINC', 'BRASS']},
+    'buildings': {'BrassFoundry': {'base': 'Factory', 'id': 9401, 'name': 'Brass Foundry', 'power': -30, 'size': 2, 'inputs': {'ZINC': 1.0, 'COPPER': 2.0}, 'outputs': {'BRASS': 1.5}}},
+    'groups': {'FACTORIES': ['BrassFoundry']},
+}
+
+def test_load_catalog(tmp_path):
+    path = tmp_path / 'mod.json'
+    path.write_text(json.dumps({**MOD, 'materials': {**MOD['materials'], 'COPPER': {'id': 9403, 'name': 'Mod_copper', 'is_natural': True}}}))
+    mod = load_catalog(str(path))
+    assert isinstance(mod, Catalog) and load_catalog(str(path)) is mod # Loaded once per process
+    assert [material.name for material in mod.METALS] == ['Zinc', 'Brass']
+    foundry = mod.BrassFoundry()
+    assert foundry is mod.buildings['BrassFoundry'] and foundry.outputs == {mod.BRASS: 1.5}
+    plan = FactoryGroup(materials = {mod.BRASS: -3}).get_upstream({**mod.default_sources(), M.POWER: None})
+    assert plan.factories == {foundry: 2}
+    assert plan.IOMap == {mod.ZINC: -2, mod.COPPER: -4, M.POWER: -60}
+    assert os.path.exists(tmp_path / '__pycache__' / 'mod.json.marshal')
+    assert _read(str(path), True) == _read(str(path), False) # The compiled cache gives the same data
+
+@pytest.mark.parametrize('change', [
+    {'buildings': {'Broken': {'base': 'Conveyor', 'id': 9410, 'name': 'Broken', 'power': 0, 'size': 1}}},
+    {'buildings': {'Broken': {'base': 'Factory', 'id': 9410, 'name': 'Broken', 'power': 0, 'size': 1, 'inputs': {'UNOBTAINIUM': 1}}}},
+    {'buildings': {'Broken': {'base': 'Factory', 'id': 9410, 'name': 'Broken', 'size': 1}}},
+    {'lists': {'METALS': ['UNOBTAINIUM']}},
+    {'groups': {'FACTORIES': ['Missing']}},
+    {'materials': {'POWER': {'id': 9411, 'name': 'Power'}}},
+], ids = ['unknown base', 'unknown material', 'missing field', 'unknown list material', 'unknown group building', 'built in material'])
+def test_invalid_catalog(tmp_path, change):
+    path = tmp_path / 'broken.json'
+    path.write_text(json.dumps({**MOD, **change}))
+    with pytest.raises(MindustryException):
+        load_catalog(str(path), cache = False)
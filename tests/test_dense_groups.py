@@ -0,0 +1,38 @@
+'''
+Tests that DenseFactoryGroup gives the same plans as the dictionary based FactoryGroup.
+'''
+import pytest
+
+from MindustryTools.Factories import FACTORIES, FactoryGroup, Kiln, PyratiteMixer, SiliconSmelter, SurgeSmelter
+from MindustryTools.DenseGroups import DenseFactoryGroup
+import MindustryTools.Materials as M
+
+EXPRESSIONS = {
+    'add and supply': lambda G: (G([SurgeSmelter()]) * 4 + Kiln() * 2) @ SiliconSmelter() @ PyratiteMixer(),
+    'add material': lambda G: G([SurgeSmelter()]) * 2.0 + M.COPPER,
+    'subtract': lambda G: G([SurgeSmelter()]) - Kiln(),
+    'divide by number': lambda G: G({SurgeSmelter(): 3}) / 2,
+    'materials': lambda G: G(materials = {M.COPPER: 3}) + G([SurgeSmelter()]),
+    'supply group': lambda G: SiliconSmelter() @ G([SurgeSmelter()]),
+}
+
+@pytest.mark.parametrize('rounded', [False, True])
+@pytest.mark.parametrize('factory', list(FACTORIES.values()), ids = lambda factory: factory.name)
+def test_dense_upstream_matches_dict(factory, rounded):
+    assert repr(DenseFactoryGroup([factory]).get_upstream(rounded = rounded)) == repr((factory * 1).get_upstream(rounded = rounded))
+
+@pytest.mark.parametrize('expression', EXPRESSIONS.values(), ids = EXPRESSIONS.keys())
+def test_dense_operators_match_dict(expression):
+    assert repr(expression(DenseFactoryGroup)) == repr(expression(FactoryGroup))
+
+def test_divide_matches_dict():
+    assert DenseFactoryGroup({SurgeSmelter(): 3}) // SiliconSmelter() == FactoryGroup({SurgeSmelter(): 3}) // SiliconSmelter()
+    assert DenseFactoryGroup([SurgeSmelter()]) / SiliconSmelter() == FactoryGroup([SurgeSmelter()]) / SiliconSmelter()
+
+@pytest.mark.parametrize('expression', [*EXPRESSIONS.values(), lambda G: G([SurgeSmelter()]).get_upstream()], ids = [*EXPRESSIONS.keys(), 'upstream'])
+def test_dense_inputs_and_outputs_match_dict(expression):
+    dense, expected = expression(DenseFactoryGroup), expression(FactoryGroup)
+    for name in ('get_inputs', 'get_outputs'):
+        values, expected_values = getattr(dense, name)(), getattr(expected, name)()
+        assert list(values.items()) == list(expected_values.items()) # In the same order
+        assert [type(value) for value in values.values()] == [type(value) for value in expected_values.values()]
@@ -0,0 +1,43 @@
+'''
+Tests that lazy expressions give the same groups as applying the operators directly.
+'''
+import pytest
+
+from MindustryTools.Expressions import Expression, lazy
+from MindustryTools.Factories import FactoryGroup, GraphitePress, Kiln, PyratiteMixer, SiliconSmelter, SurgeSmelter
+from MindustryTools.DenseGroups import DenseFactoryGroup, FixedPointFactoryGroup
+import MindustryTools.Materials as M
+
+# Each builds the same expression from L(entity), which is either the entity itself or lazy(entity)
+EXPRESSIONS = {
+    'add and supply': lambda L: (L(SurgeSmelter()) * 4 + Kiln() * 2) @ SiliconSmelter() @ PyratiteMixer(),
+    'cancel': lambda L: L(Kiln()) - Kiln(),
+    'cancel nested': lambda L: L(Kiln()) - (L(Kiln()) - SiliconSmelter()),
+    'cancel part way': lambda L: L(Kiln()) + SiliconSmelter() - Kiln(),
+    'subtract sum': lambda L: L(SiliconSmelter()) - (L(Kiln()) + SiliconSmelter()),
+    'material first': lambda L: M.COPPER + L(Kiln()),
+    'material minus': lambda L: M.COPPER - L(Kiln()),
+    'material cancels': lambda L: L(Kiln()) + M.COPPER - M.COPPER,
+    'scale zero rates': lambda L: L(GraphitePress()) * 2,
+    'scale by zero': lambda L: L(Kiln()) * 0 + SiliconSmelter() * 0,
+    'scale sum': lambda L: (L(Kiln()) + SiliconSmelter()) * 2,
+    'group': lambda L: M.COPPER + L(FactoryGroup([SurgeSmelter()])) * 2.0 - Kiln(),
+    'supply difference': lambda L: L(Kiln()) - SiliconSmelter() @ L(SurgeSmelter()),
+    'dense group': lambda L: L(DenseFactoryGroup([SurgeSmelter()])) - Kiln() + M.COPPER,
+    'fixed point group': lambda L: L(FixedPointFactoryGroup([SurgeSmelter()])) - Kiln() + Kiln(),
+}
+
+@pytest.mark.parametrize('expression', EXPRESSIONS.values(), ids = EXPRESSIONS.keys())
+def test_lazy_matches_eager(expression):
+    assert repr(expression(lazy)) == repr(expression(lambda entity: entity))
+
+def test_shared_subexpression():
+    group = FactoryGroup([SurgeSmelter()])
+    supplied = lazy(group) @ SiliconSmelter()
+    assert repr(supplied - supplied) == repr((group @ SiliconSmelter()) - (group @ SiliconSmelter()))
+    assert repr(supplied + Kiln() + supplied) == repr((group @ SiliconSmelter()) + Kiln() + (group @ SiliconSmelter()))
+    assert group.factories == {SurgeSmelter(): 1} # Never modified
+
+def test_expression_is_abstract():
+    with pytest.raises(TypeError):
+        Expression()
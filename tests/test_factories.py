@@ -0,0 +1,37 @@
+'''
+Tests of the FactoryGroup operators, for every kind of factory group.
+'''
+import pytest
+
+from MindustryTools.Factories import FactoryGroup, Kiln, SiliconSmelter
+from MindustryTools.DenseGroups import DenseFactoryGroup, FixedPointFactoryGroup
+import MindustryTools.Materials as M
+
+GROUP_TYPES = [FactoryGroup, DenseFactoryGroup, FixedPointFactoryGroup]
+
+@pytest.mark.parametrize('G', GROUP_TYPES)
+def test_subtraction_is_self_minus_other(G):
+    # Subtraction once returned other - self
+    difference = G([Kiln()]) - SiliconSmelter()
+    assert difference.factories == {Kiln(): 1, SiliconSmelter(): -1}
+    assert difference.IOMap[M.METAGLASS] == pytest.approx(Kiln().outputs[M.METAGLASS])
+    assert difference.IOMap[M.SILICON] == pytest.approx(-SiliconSmelter().outputs[M.SILICON])
+    assert (G([Kiln()]) - M.COPPER).IOMap[M.COPPER] == -1
+    assert (M.COPPER - G([Kiln()])).IOMap[M.COPPER] == 1
+
+@pytest.mark.parametrize('G', GROUP_TYPES)
+@pytest.mark.parametrize('other', [M.COPPER, Kiln(), FactoryGroup([SiliconSmelter()])], ids = ['material', 'factory', 'group'])
+def test_adding_and_subtracting_cancel(G, other):
+    added, subtracted = G([SiliconSmelter()]), G([SiliconSmelter()])
+    added += other
+    added -= other
+    subtracted -= other
+    subtracted += other
+    assert added.IOMap == subtracted.IOMap == G([SiliconSmelter()]).IOMap
+    assert list(added.IOMap) == list(subtracted.IOMap) # In the same order
+
+@pytest.mark.parametrize('G', GROUP_TYPES)
+def test_operators_drop_cancelled_materials(G):
+    assert M.COPPER not in (G(materials = [M.COPPER]) - M.COPPER).IOMap
+    assert not (G([Kiln()]) - Kiln()).IOMap
+    assert not (G([Kiln()]) + -1 * Kiln()).IOMap
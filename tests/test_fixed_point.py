@@ -0,0 +1,52 @@
+'''
+Tests that FixedPointFactoryGroup gives the same plans as the dictionary based FactoryGroup, and keeps exact balances.
+'''
+import pytest
+
+from MindustryTools.Factories import FACTORIES, FactoryGroup, Kiln, SiliconSmelter, SurgeSmelter
+from MindustryTools.DenseGroups import FixedPointFactoryGroup
+from tests.test_dense_groups import EXPRESSIONS
+
+def assert_close(group: FactoryGroup, expected: FactoryGroup, rates: float, counts: float):
+    'Asserts that two plans have the same factories and rates, within absolute tolerances.'
+    materials = set(group.IOMap) | set(expected.IOMap)
+    assert {material: group.IOMap.get(material, 0) for material in materials} == pytest.approx({material: expected.IOMap.get(material, 0) for material in materials}, abs = rates)
+    factories = set(group.factories) | set(expected.factories)
+    assert {factory: group.factories.get(factory, 0) for factory in factories} == pytest.approx({factory: expected.factories.get(factory, 0) for factory in factories}, abs = counts)
+
+def test_divide_matches_dict():
+    assert FixedPointFactoryGroup({SurgeSmelter(): 3}) // SiliconSmelter() == FactoryGroup({SurgeSmelter(): 3}) // SiliconSmelter()
+    # Fixed-point ratios are rounded to whole thousandths
+    assert FixedPointFactoryGroup([SurgeSmelter()]) / SiliconSmelter() == pytest.approx(FactoryGroup([SurgeSmelter()]) / SiliconSmelter(), abs = 1e-3)
+
+@pytest.mark.parametrize('rounded', [False, True])
+@pytest.mark.parametrize('factory', list(FACTORIES.values()), ids = lambda factory: factory.name)
+def test_fixed_point_upstream_matches_dict(factory, rounded):
+    fixed = FixedPointFactoryGroup([factory]).get_upstream(rounded = rounded)
+    # Counts are rounded to thousandths, and only real deficits are supplied, where the dict group stops within a tolerance
+    expected = FactoryGroup([factory]).get_upstream(rounded = rounded)
+    factories = set(fixed.factories) | set(expected.factories)
+    assert {f: fixed.factories.get(f, 0) for f in factories} == pytest.approx({f: expected.factories.get(f, 0) for f in factories}, abs = 5e-3)
+    assert not [material for material, rate in fixed.IOMap.items() if rate < 0 and not material.is_natural]
+
+def test_fixed_point_upstream_leaves_no_residues():
+    # Supplying to the nearest thousandth, and dropping what is left of that rounding, balances every intermediate exactly
+    fixed = FixedPointFactoryGroup([SurgeSmelter()]).get_upstream()
+    expected = FactoryGroup([SurgeSmelter()]).get_upstream()
+    assert list(fixed.IOMap) == list(expected.IOMap)
+    assert_close(fixed, expected, rates = 0.05, counts = 5e-3)
+
+@pytest.mark.parametrize('expression', EXPRESSIONS.values(), ids = EXPRESSIONS.keys())
+def test_fixed_point_operators_match_dict(expression):
+    assert_close(expression(FixedPointFactoryGroup), expression(FactoryGroup), rates = 1e-3, counts = 1e-3)
+
+def test_fixed_point_sums_are_exact():
+    group = FixedPointFactoryGroup()
+    for _ in range(10):
+        group += FixedPointFactoryGroup({Kiln(): 0.1})
+    group -= Kiln()
+    assert not group.IOMap
+
+@pytest.mark.parametrize('expression', [lambda G: G([Kiln()]), *EXPRESSIONS.values()], ids = ['kiln', *EXPRESSIONS.keys()])
+def test_fixed_point_repr_matches_dict(expression):
+    assert repr(expression(FixedPointFactoryGroup)) == repr(expression(FactoryGroup))
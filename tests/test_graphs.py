@@ -0,0 +1,44 @@
+'''
+Tests of the recipe graph: its components, and the order it keeps as factories are registered.
+'''
+from MindustryTools.Catalog import default_catalog
+from MindustryTools.Factories import Factory
+from MindustryTools.Graphs import RecipeGraph, _strongly_connected
+import MindustryTools.Materials as M
+
+def assert_ordered(graph: RecipeGraph):
+    'Asserts that every material comes before the materials it depends on, or shares their component.'
+    for material in graph.order():
+        for dependency in graph.dependencies(material):
+            assert graph.rank(material) <= graph.rank(dependency), (material, dependency)
+
+def test_strongly_connected():
+    edges = {1: [2], 2: [3], 3: [2, 4], 4: [], 5: [5]}
+    assert _strongly_connected(edges, edges.get) == [[4], [2, 3], [1], [5]]
+
+def test_catalog_graph_is_ordered():
+    graph = default_catalog().graph
+    assert_ordered(graph)
+    # Power is made from fuels and coolants whose own producers draw power
+    assert [M.POWER] not in graph.components()
+    assert any(M.POWER in cycle for cycle in graph.cycles())
+
+# Materials outside of the catalog, so that registering their factories changes no other plan
+ORE = M.Material(id = '9201', name = 'Graph_ore', is_natural = True)
+PART = M.Material(id = '9202', name = 'Graph_part')
+KIT = M.Material(id = '9203', name = 'Graph_kit')
+
+def test_registering_keeps_order():
+    graph = RecipeGraph(default_catalog().graph.factories.values())
+    graph.components()
+    graph.register_factory(Factory(id = 9201, name = 'Part Press', size = 1, power = 0, inputs = {ORE: 1.0}, outputs = {PART: 1.0}))
+    graph.register_factory(Factory(id = 9202, name = 'Kit Bench', size = 1, power = 0, inputs = {PART: 2.0, M.COPPER: 1.0}, outputs = {KIT: 1.0}))
+    assert graph._components is not None # Extended, not recomputed
+    assert_ordered(graph)
+    assert graph.rank(KIT) < graph.rank(PART) < graph.rank(ORE)
+
+    # A recycler makes a cycle of the two, which the graph finds when it is next used
+    graph.register_factory(Factory(id = 9203, name = 'Kit Recycler', size = 1, power = 0, inputs = {KIT: 1.0}, outputs = {PART: 1.0}))
+    assert_ordered(graph)
+    assert graph.rank(KIT) == graph.rank(PART)
+    assert sorted(material.name for material in next(cycle for cycle in graph.cycles() if KIT in cycle)) == ['Graph_kit', 'Graph_part']
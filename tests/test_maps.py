@@ -0,0 +1,64 @@
+'''
+Tests that throughput maps match counting the tiles under each collector one position at a time.
+'''
+import numpy as np
+import pytest
+
+from MindustryTools.MindustryObject import MindustryException
+import MindustryTools.Collectors as C
+from MindustryTools.Maps import EMPTY, OreGrid, throughput_maps
+import MindustryTools.Materials as M
+
+def random_grid(seed: int = 0, shape = (13, 17)) -> OreGrid:
+    choices = np.array([EMPTY, M.COPPER.index, M.LEAD.index, M.SAND.index, M.TITANIUM.index, M.THORIUM.index, M.WATER.index])
+    return OreGrid(np.random.default_rng(seed).choice(choices, size = shape))
+
+def expected_throughput(grid: OreGrid, collector, row: int, column: int):
+    'The rate, material and tile count of a collector at one position, counted directly.'
+    window = grid.tiles[row:row + collector.size, column:column + collector.size]
+    counts = {material: int((window == material.index).sum()) for material in grid.materials if collector.can_collect(material)}
+    counts = {material: count for material, count in counts.items() if count}
+    if not counts:
+        return 0.0, None, 0
+    material = max(counts, key = lambda material: (counts[material], material.index)) # Ties go to the highest index
+    return collector.get_speed(material, tiles = counts[material]), material, counts[material]
+
+def test_counts_match_direct_sums():
+    grid = random_grid()
+    for size in (1, 2, 3, 4):
+        counts = grid.counts(M.COPPER, size)
+        assert counts.shape == (grid.shape[0] - size + 1, grid.shape[1] - size + 1)
+        for row, column in np.ndindex(*counts.shape):
+            assert counts[row, column] == (grid.tiles[row:row + size, column:column + size] == M.COPPER.index).sum()
+
+@pytest.mark.parametrize('boosted', [False, True])
+def test_throughput_matches_direct_count(boosted):
+    grid = random_grid(1)
+    maps = throughput_maps(grid.tiles, boosted = boosted)
+    assert set(maps) >= set(C.PUMPS.values())
+    for collector, throughput in maps.items():
+        if isinstance(collector, C.Drill):
+            assert throughput.collector.boosted == boosted # Keyed by the collector, which the map boosts
+        for row, column in np.ndindex(*throughput.rates.shape):
+            rate, material, tiles = expected_throughput(grid, throughput.collector, row, column)
+            assert throughput.rates[row, column] == pytest.approx(rate)
+            assert throughput.material(row, column) is material
+            assert throughput.tiles[row, column] == tiles
+
+def test_best():
+    grid = OreGrid.from_materials([[None, M.COPPER, M.COPPER], [M.SAND, M.COPPER, M.COPPER], [M.SAND, M.SAND, None]])
+    throughput = grid.throughput(C.MechanicalDrill())
+    assert throughput.best() == (0, 1) # Four copper tiles
+    assert throughput.best(M.SAND) == (1, 0) and throughput.material(1, 0) is M.SAND
+    assert throughput.best(M.TITANIUM) is None
+    assert grid.throughput(C.MechanicalPump()).best() is None # No liquid
+
+def test_collector_larger_than_map():
+    grid = OreGrid.from_materials([[M.COPPER, M.COPPER], [M.COPPER, M.COPPER]])
+    assert grid.throughput(C.LaserDrill()).rates.shape == (0, 0)
+
+def test_invalid_grids():
+    with pytest.raises(MindustryException):
+        OreGrid(np.zeros(4, dtype = np.int32))
+    with pytest.raises(MindustryException):
+        OreGrid(np.array([[10 ** 6]]))
@@ -0,0 +1,72 @@
+'''
+Tests that placed collectors do not overlap, gather what they say they do, and meet their targets.
+'''
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+import MindustryTools.Collectors as C
+from MindustryTools.Maps import EMPTY, OreGrid
+import MindustryTools.Materials as M
+from MindustryTools.Placements import COSTS, place_collectors
+
+def random_grid(seed: int = 0, shape = (60, 70)) -> OreGrid:
+    choices = np.array([EMPTY, EMPTY, M.COPPER.index, M.LEAD.index, M.SAND.index, M.TITANIUM.index, M.WATER.index])
+    return OreGrid(np.random.default_rng(seed).choice(choices, size = shape))
+
+def check(grid: OreGrid, placements, summary, targets, met: bool = True):
+    'Asserts that placements do not overlap, match the tiles under them and their summary, and meet targets if met.'
+    occupied = np.zeros(grid.shape, dtype = int)
+    gathered, expected = {}, {}
+    for placement in placements:
+        size = placement.collector.size
+        occupied[placement.row:placement.row + size, placement.column:placement.column + size] += 1
+        window = grid.tiles[placement.row:placement.row + size, placement.column:placement.column + size]
+        assert window.shape == (size, size) # Within the map
+        assert placement.rate == pytest.approx(placement.collector.get_speed(placement.material, tiles = int((window == placement.material.index).sum())))
+        gathered[placement.material] = gathered.get(placement.material, 0) + placement.rate
+        expected[M.POWER] = expected.get(M.POWER, 0) + placement.collector.power
+        if isinstance(placement.collector, C.Drill) and placement.collector.boosted:
+            expected[M.WATER] = expected.get(M.WATER, 0) - placement.collector.water_intake # Boosted drills use some of the water pumped
+    assert occupied.max(initial = 0) <= 1
+    for material, rate in gathered.items():
+        expected[material] = expected.get(material, 0) + rate
+    for material, rate in expected.items():
+        assert summary.IOMap.get(material, 0) == pytest.approx(rate)
+    if met:
+        for material, rate in targets.items():
+            assert gathered.get(material, 0) >= rate - 1e-9
+
+TARGETS = {M.COPPER: 6.0, M.SAND: 3.0, M.TITANIUM: 1.5, M.WATER: 20.0}
+
+@pytest.mark.parametrize('objective', COSTS)
+@pytest.mark.parametrize('boosted', [False, True])
+def test_placements_meet_targets(objective, boosted):
+    grid = random_grid()
+    placements, summary = place_collectors(grid, TARGETS, objective = objective, boosted = boosted)
+    check(grid, placements, summary, TARGETS)
+    assert all(placement.collector.boosted == boosted for placement in placements if isinstance(placement.collector, C.Drill))
+
+def test_tiles_do_not_overlap_across_borders():
+    grid = random_grid(1)
+    with ThreadPoolExecutor(2) as executor:
+        placements, summary = place_collectors(grid, TARGETS, tile_size = 16, executor = executor)
+    check(grid, placements, summary, TARGETS)
+    assert len({(placement.row // 16, placement.column // 16) for placement in placements}) > 1 # Spread over several tiles
+
+def test_unreachable_target_places_what_it_can():
+    grid = OreGrid.from_materials([[M.COPPER, M.COPPER, None], [M.COPPER, None, None], [None, None, M.SAND]])
+    targets = {M.COPPER: 1000.0, M.THORIUM: 1.0}
+    placements, summary = place_collectors(grid, targets, collectors = [C.MechanicalDrill()])
+    check(grid, placements, summary, targets, met = False)
+    assert {placement.material for placement in placements} == {M.COPPER}
+    assert summary.IOMap[M.COPPER] > 0
+
+def test_no_targets():
+    placements, summary = place_collectors(random_grid(), {M.COPPER: 0})
+    assert placements == [] and not summary.factories and not summary.IOMap
+
+def test_unknown_objective():
+    with pytest.raises(ValueError):
+        place_collectors(random_grid(), TARGETS, objective = 'speed')
@@ -0,0 +1,48 @@
+'''
+Tests that the incremental planner gives the same plan as replanning from scratch after every change.
+'''
+import pytest
+
+from MindustryTools.Factories import FactoryGroup, PlastaniumCompressor, SiliconSmelter, SurgeSmelter
+from MindustryTools.Planning import IncrementalPlanner
+import MindustryTools.Materials as M
+
+# Each change, applied to the planner in turn
+CHANGES = [
+    ('add', lambda planner: planner.add(PlastaniumCompressor())),
+    ('set source', lambda planner: planner.set_source(M.SILICON, SiliconSmelter())),
+    ('remove', lambda planner: planner.remove(SurgeSmelter())),
+    ('add material', lambda planner: planner.add(M.METAGLASS, 3)),
+    ('reset source', lambda planner: planner.reset_source(M.SILICON)),
+    ('remove again', lambda planner: planner.remove(PlastaniumCompressor())),
+]
+
+def nonzero(rates: dict) -> dict:
+    return {key: rate for key, rate in rates.items() if abs(rate) > 1e-6}
+
+def assert_same(plan: FactoryGroup, full: FactoryGroup, tolerance: float):
+    assert nonzero(plan.factories) == pytest.approx(nonzero(full.factories), abs = tolerance)
+    assert nonzero(plan.IOMap) == pytest.approx(nonzero(full.IOMap), abs = tolerance)
+
+# Without power, the plan has no cycles, so it matches exactly. Power is made in a cycle (see test_graphs.py), which the iterative solver only converges on.
+@pytest.mark.parametrize('sources, tolerance', [({M.POWER: None}, 1e-6), ({}, 1e-2)], ids = ['no power', 'power'])
+@pytest.mark.parametrize('rounded', [False, True])
+def test_matches_full_replan(sources, tolerance, rounded):
+    planner = IncrementalPlanner(FactoryGroup({SurgeSmelter(): 2}), sources = sources, rounded = rounded)
+    assert_same(planner.plan, planner.targets.get_upstream(sources, rounded = rounded), tolerance)
+    for name, change in CHANGES:
+        before = FactoryGroup(factory_group = planner.plan)
+        plan, diff = change(planner)
+        assert plan is planner.plan
+        assert_same(plan, planner.targets.get_upstream(planner.sources, rounded = rounded), tolerance)
+        # The diff is the change in the plan
+        changed = {factory: plan.factories.get(factory, 0) - before.factories.get(factory, 0) for factory in {*plan.factories, *before.factories}}
+        assert nonzero(diff.factories) == pytest.approx(nonzero(changed), abs = 1e-6), name
+        assert all(count == pytest.approx(plan.factories[source] - planner.targets.factories.get(source, 0)) for source, count in planner.upstream.items())
+
+def test_unsupplied_source():
+    planner = IncrementalPlanner(FactoryGroup([SurgeSmelter()]), sources = {M.POWER: None})
+    plan, diff = planner.set_source(M.SILICON, None)
+    assert plan.IOMap[M.SILICON] == pytest.approx(-SurgeSmelter().inputs[M.SILICON])
+    assert all(count < 0 for count in diff.factories.values()) # Only the silicon chain is removed
+    assert_same(plan, planner.targets.get_upstream(planner.sources), 1e-6)
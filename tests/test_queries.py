@@ -0,0 +1,80 @@
+'''
+Tests of planning queries: their results, and that batches stream results in order with errors inline.
+'''
+from concurrent.futures import ThreadPoolExecutor
+import json
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from MindustryTools.Factories import FactoryGroup, SurgeSmelter
+from MindustryTools.Queries import iter_results, main, run_query
+import MindustryTools.Materials as M
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+QUERIES = [
+    {'building': 'Surge Smelter', 'count': 2, 'rounded': True},
+    '{"materials": {"Silicon": 3}, "sources": {"SILICON": "Silicon Smelter", "Power": null}}',
+    {'building': 'Unobtainium Forge'},
+    'not json',
+    {'id': 'named', 'factories': {'Kiln': 1}, 'rounded': ['Kiln']},
+    [1, 2],
+    {'power': 'exclude'},
+]
+ERRORS = {3: 'MindustryException', 4: 'JSONDecodeError', 6: 'MindustryException', 7: 'MindustryException'}
+
+def test_run_query():
+    result = run_query(QUERIES[0], 1)
+    plan = FactoryGroup({SurgeSmelter(): 2}).get_upstream(rounded = True)
+    assert result['id'] == 1 and result['seconds'] >= 0
+    assert result['counts'] == {factory.name: count for factory, count in plan.factories.items()}
+    assert result['rates'] == {material.name: rate for material, rate in plan.IOMap.items()}
+
+    result = run_query(QUERIES[1])
+    assert 'id' not in result and result['counts'] == {'Silicon Smelter': 2} and result['rates'][M.POWER.name] == -60
+
+def check(results: list):
+    'Asserts that the results of QUERIES are in order, with their errors in place.'
+    assert [result['id'] for result in results] == [1, 2, 3, 4, 'named', 6, 7]
+    for number, result in enumerate(results, 1):
+        if number in ERRORS:
+            assert result['error'].startswith(ERRORS[number] + ':') and 'counts' not in result
+        else:
+            assert 'error' not in result and result['counts']
+
+def test_results_are_in_order_with_errors_inline():
+    serial = list(iter_results(QUERIES))
+    check(serial)
+    with ThreadPoolExecutor(3) as executor:
+        threaded = list(iter_results(QUERIES, 3, executor, window = 2))
+    check(threaded)
+    assert [{**result, 'seconds': 0} for result in threaded] == [{**result, 'seconds': 0} for result in serial]
+
+def test_results_stream_before_the_queries_end():
+    answered = threading.Event()
+    def queries():
+        yield QUERIES[0]
+        assert answered.wait(10) # The first result is yielded while the next query is awaited
+        yield QUERIES[1]
+    with ThreadPoolExecutor(2) as executor:
+        results = iter_results(queries(), 2, executor)
+        assert next(results)['id'] == 1
+        answered.set()
+        assert [result['id'] for result in results] == [2]
+
+def test_main_writes_results_in_order(tmp_path):
+    path = tmp_path / 'queries.jsonl'
+    path.write_text('\n'.join([*(query if isinstance(query, str) else json.dumps(query) for query in QUERIES[:4]), '', *map(json.dumps, QUERIES[4:])]) + '\n')
+    output = tmp_path / 'results.jsonl'
+    assert main([str(path), '--output', str(output)]) == 0
+    check([json.loads(line) for line in output.read_text().splitlines()]) # The blank line is not counted
+
+@pytest.mark.parametrize('processes', ['1', '2'])
+def test_command(processes):
+    lines = '\n'.join(query if isinstance(query, str) else json.dumps(query) for query in QUERIES) + '\n'
+    completed = subprocess.run([sys.executable, '-m', 'MindustryTools', '--processes', processes], input = lines, cwd = ROOT, capture_output = True, text = True, check = True)
+    check([json.loads(line) for line in completed.stdout.splitlines()])
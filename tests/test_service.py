@@ -0,0 +1,99 @@
+'''
+Tests of the planning service: coalescing identical queries, and answering them over HTTP.
+'''
+import asyncio
+from concurrent.futures import Executor, ThreadPoolExecutor
+import http.client
+import threading
+
+import pytest
+
+from MindustryTools.Queries import run_query
+from MindustryTools.Service import PlanningService, ServiceClient
+
+class GatedExecutor(Executor):
+    'Runs calls in threads, but only once the gate is opened, so that requests can be made while solves are in progress.'
+    def __init__(self):
+        self.gate = threading.Event()
+        self.calls = 0
+        self._threads = ThreadPoolExecutor(4)
+
+    def submit(self, function, *args, **kwargs):
+        self.calls += 1
+        def run():
+            self.gate.wait(10)
+            return function(*args, **kwargs)
+        return self._threads.submit(run)
+
+    def shutdown(self, wait = True, **options):
+        self.gate.set()
+        self._threads.shutdown(wait)
+
+QUERY = {'building': 'Surge Smelter', 'rounded': True}
+
+def test_coalesces_identical_in_flight_queries():
+    executor = GatedExecutor()
+    service = PlanningService(executor = executor)
+    async def requests():
+        tasks = [asyncio.ensure_future(service.plan(query)) for query in
+                 [{**QUERY, 'id': 1}, {'rounded': True, 'building': 'Surge Smelter', 'id': 2}, QUERY, {'building': 'Kiln'}]]
+        await asyncio.sleep(0.05)
+        assert len(service._in_flight) == 2 and service.metrics()['in_flight'] == 2 # Waiting at the gate
+        executor.gate.set()
+        results = await asyncio.gather(*tasks)
+        again = await service.plan(QUERY) # Not in flight any more, so solved again
+        return results, again
+    try:
+        results, again = asyncio.run(requests())
+    finally:
+        executor.shutdown()
+    expected = run_query(QUERY)
+    assert [result.get('id') for result in results] == [1, 2, None, None]
+    assert all(result['counts'] == expected['counts'] for result in results[:3]) and again['counts'] == expected['counts']
+    assert results[0] is not results[1] # Each request gets its own copy
+    assert service.counters == {'requests': 5, 'solves': 3, 'coalesced': 2, 'errors': 0} and executor.calls == 3
+    assert service.max_in_flight == 2 and not service._in_flight
+
+def test_errors_are_in_results():
+    with ThreadPoolExecutor(2) as executor:
+        service = PlanningService(executor = executor)
+        result = asyncio.run(service.plan({'id': 'x', 'building': 'Unobtainium Forge'}))
+    assert result['id'] == 'x' and result['error'].startswith('MindustryException:')
+    assert service.counters['errors'] == 1
+
+def serve(address: str, client_calls):
+    'Serves at an address while client_calls runs in another thread with a client, and returns what it returns.'
+    async def run():
+        with ThreadPoolExecutor(2) as executor:
+            service = PlanningService(executor = executor)
+            server = await service.serve(address)
+            bound = server.sockets[0].getsockname()
+            try:
+                def calls():
+                    with ServiceClient(address if isinstance(bound, str) else f'{bound[0]}:{bound[1]}') as client: # Port 0 is bound to a free port
+                        return client_calls(client)
+                return await asyncio.get_running_loop().run_in_executor(None, calls)
+            finally:
+                server.close()
+                await server.wait_closed()
+    return asyncio.run(run())
+
+@pytest.mark.parametrize('address', ['unix', '127.0.0.1:0'])
+def test_http(tmp_path, address):
+    if address == 'unix':
+        address = str(tmp_path / 'service.sock')
+    def calls(client):
+        first = client.plan({**QUERY, 'id': 7})
+        second = client.plan({'building': 'Kiln'}) # Over the same connection
+        health = client._request('GET', '/health')
+        with pytest.raises(http.client.HTTPException, match = '404'):
+            client._request('GET', '/missing')
+        with pytest.raises(http.client.HTTPException, match = '405'):
+            client._request('GET', '/plan')
+        with pytest.raises(http.client.HTTPException, match = '400'):
+            client._request('POST', '/plan', [1, 2])
+        return first, second, health, client.metrics()
+    first, second, health, metrics = serve(address, calls)
+    assert first['id'] == 7 and first['counts'] == run_query(QUERY)['counts'] and 'Kiln' in second['counts']
+    assert health == {'status': 'ok'}
+    assert metrics['requests'] == metrics['solves'] == 2 and metrics['connections'] == 1 and metrics['latency']['count'] == 2
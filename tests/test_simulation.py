@@ -0,0 +1,64 @@
+'''
+Tests of the simulator: steady states, starvation by inputs or power, batteries, and that materials are conserved.
+'''
+import numpy as np
+import pytest
+
+from MindustryTools.MindustryObject import MindustryException
+from MindustryTools.Factories import FactoryGroup, SiliconSmelter, SurgeSmelter
+from MindustryTools.Simulation import Simulator, simulate
+import MindustryTools.Materials as M
+
+SUPPLY = {M.COAL: 1.5, M.SAND: 3.0, M.POWER: 30} # Exactly what one silicon smelter uses
+
+def test_steady_state_matches_plan():
+    plan = FactoryGroup({SiliconSmelter(): 2})
+    result = simulate(plan, 20) # Supplied with the inputs of the plan, including power
+    assert result.starved() == {} and result.startup_time(SiliconSmelter()) == pytest.approx(1.0) # The first sample
+    assert result.rate(M.SILICON)[-1] == pytest.approx(plan.IOMap[M.SILICON])
+    assert result.rate(M.POWER)[-1] == pytest.approx(0)
+    assert result.series(M.SILICON)[-1] == pytest.approx(20 * plan.IOMap[M.SILICON])
+
+@pytest.mark.parametrize('short', [M.COAL, M.POWER])
+def test_starved_of_input_or_power(short):
+    result = simulate(FactoryGroup([SiliconSmelter()]), 20, supply = {**SUPPLY, short: SUPPLY[short] / 2})
+    assert result.starved() == {SiliconSmelter(): pytest.approx(0.5)}
+    assert result.rate(M.SILICON)[-1] == pytest.approx(0.75)
+    assert result.startup_time(SiliconSmelter()) is None
+
+def test_battery_runs_out():
+    result = simulate(FactoryGroup([SiliconSmelter()]), 10, supply = {M.COAL: 1.5, M.SAND: 3.0}, initial = {M.POWER: 1000}, battery = 90)
+    activity = result.activity[:, 0]
+    assert list(activity[:3]) == pytest.approx([1, 1, 1]) and activity[3] < 1 and activity[-1] == 0 # 90 power lasts 3 seconds
+    assert result.utilization[SiliconSmelter()] == pytest.approx(0.3)
+
+def test_self_powered_plan_needs_power_to_start():
+    plan = FactoryGroup([SurgeSmelter()]).get_upstream()
+    assert plan.IOMap.get(M.POWER, 0) >= 0 # Powers itself
+    assert not simulate(plan, 30).rate(M.SURGE_ALLOY).any()
+    started = simulate(plan, 60, initial = {M.POWER: 20000}, battery = 20000)
+    assert started.rate(M.SURGE_ALLOY)[-1] > 0 and started.power[-1] >= 0
+
+def test_materials_are_conserved():
+    simulator = Simulator(FactoryGroup([SurgeSmelter()]).get_upstream(), supply = {M.COPPER: 3, M.LEAD: 4, M.TITANIUM: 2, M.COAL: 2, M.SAND: 3, M.WATER: 2},
+                          initial = {M.POWER: 20000, M.SILICON: 5}, battery = 20000, capacity = 5, tick = 0.05)
+    result = simulator.run(12, sample = 0.5)
+    supply = np.array([simulator._supply[column] for column in range(len(simulator.materials))]) / simulator.tick
+    initial = np.array([5.0 if material == M.SILICON else 0.0 for material in simulator.materials])
+    expected = initial + supply * simulator.time + result.rates.sum(axis = 0) * 0.5
+    assert simulator.storage + simulator.buffers.sum(axis = 0) == pytest.approx(expected)
+    assert simulator.time == pytest.approx(result.times[-1]) == pytest.approx(12)
+
+def test_fractional_counts():
+    result = simulate(FactoryGroup(factories = {SiliconSmelter(): 0.5}), 10, supply = SUPPLY, whole = False)
+    assert result.counts[0] == 0.5 and result.rate(M.SILICON)[-1] == pytest.approx(0.75)
+    assert simulate(FactoryGroup(factories = {SiliconSmelter(): 0.5}), 10, supply = SUPPLY).counts[0] == 1
+
+def test_errors():
+    with pytest.raises(MindustryException):
+        Simulator(FactoryGroup([SiliconSmelter()]), tick = 0)
+    result = simulate(FactoryGroup([SiliconSmelter()]), 1)
+    with pytest.raises(MindustryException):
+        result.series(M.THORIUM)
+    with pytest.raises(MindustryException):
+        result.startup_time(SurgeSmelter())
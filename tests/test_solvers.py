@@ -0,0 +1,160 @@
+'''
+Tests of the linear program solver, the linear upstream solver, whole number planning and the optimizing solvers.
+'''
+import pytest
+
+from MindustryTools.MindustryObject import MindustryException
+from MindustryTools.Factories import FACTORIES, CoalCentrifuge, CombustionGenerator, Cultivator, Factory, FactoryGroup, ImpactReactor, LargeSolarPanel, SurgeSmelter
+from MindustryTools.DenseGroups import DenseFactoryGroup
+import MindustryTools.Materials as M
+from MindustryTools.Solvers import OBJECTIVES, SolverException, balance_power, linprog, optimize_sources, optimize_upstream, plan_integer
+
+def test_linprog_textbook():
+    # Maximize 3x + 5y subject to x <= 4, 2y <= 12 and 3x + 2y <= 18
+    x, cost = linprog([-3, -5], A_ub = [[1, 0], [0, 2], [3, 2]], b_ub = [4, 12, 18])
+    assert x == pytest.approx([2, 6])
+    assert cost == pytest.approx(-36)
+
+def test_linprog_beale_cycling():
+    # Beale's example, on which the simplex method cycles forever without an anti-cycling rule
+    costs = [-0.75, 150, -0.02, 6]
+    A_ub = [[0.25, -60, -0.04, 9], [0.5, -90, -0.02, 3], [0, 0, 1, 0]]
+    x, cost = linprog(costs, A_ub = A_ub, b_ub = [0, 0, 1])
+    assert cost == pytest.approx(-0.05)
+    assert x == pytest.approx([0.04, 0, 1, 0], abs = 1e-9)
+
+def test_linprog_unbounded():
+    with pytest.raises(SolverException, match = 'unbounded'):
+        linprog([-1, 0], A_ub = [[1, -1]], b_ub = [1])
+
+def test_linprog_infeasible():
+    with pytest.raises(SolverException, match = 'infeasible'):
+        linprog([1], A_ub = [[1], [-1]], b_ub = [1, -2])
+
+def test_linprog_redundant_equality():
+    x, cost = linprog([1, 2], A_eq = [[1, 1], [2, 2]], b_eq = [2, 4])
+    assert x == pytest.approx([2, 0])
+    assert cost == pytest.approx(2)
+
+@pytest.mark.parametrize('factory', list(FACTORIES.values()), ids = lambda factory: factory.name)
+def test_linear_solver_matches_iterative(factory):
+    iterative = FactoryGroup([factory]).get_upstream()
+    linear = FactoryGroup([factory]).get_upstream(solver = 'linear')
+    # The iterative solver stops within a tolerance of the exact totals
+    materials = set(iterative.IOMap) | set(linear.IOMap)
+    assert {material: linear.IOMap.get(material, 0) for material in materials} == pytest.approx({material: iterative.IOMap.get(material, 0) for material in materials}, abs = 1e-2)
+    factories = set(iterative.factories) | set(linear.factories)
+    assert {f: linear.factories.get(f, 0) for f in factories} == pytest.approx({f: iterative.factories.get(f, 0) for f in factories}, abs = 1e-3)
+
+@pytest.mark.parametrize('factory', list(FACTORIES.values()), ids = lambda factory: factory.name)
+def test_plan_integer_is_whole_and_supplied(factory):
+    plan = plan_integer(FactoryGroup([factory]))
+    assert all(float(count).is_integer() for count in plan.factories.values())
+    deficits = {material.name: rate for material, rate in plan.IOMap.items() if rate < -1e-9 and not material.is_natural}
+    assert not deficits
+
+@pytest.mark.parametrize('factory', list(FACTORIES.values()), ids = lambda factory: factory.name)
+def test_plan_integer_uses_no_more_buildings_than_rounding(factory):
+    group = FactoryGroup([factory])
+    assert sum(plan_integer(group).factories.values()) <= sum(group.get_upstream(solver = 'linear', rounded = True).factories.values()) + 1e-9
+
+# A recipe cycle outside of the catalog, given as sources: A is made from B, and B from A
+CYCLE_A = M.Material(id = '9101', name = 'Cycle_a')
+CYCLE_B = M.Material(id = '9102', name = 'Cycle_b')
+A_TO_B = Factory(id = 9101, name = 'A to B', size = 1, power = 0, inputs = {CYCLE_A: 1.0}, outputs = {CYCLE_B: 1.0})
+B_TO_A = Factory(id = 9102, name = 'B to A', size = 1, power = 0, inputs = {CYCLE_B: 2.0}, outputs = {CYCLE_A: 1.0}) # Consumes more than the cycle produces
+B_TO_2A = Factory(id = 9103, name = 'B to 2A', size = 1, power = 0, inputs = {CYCLE_B: 1.0}, outputs = {CYCLE_A: 2.0})
+
+@pytest.mark.parametrize('group_type', [FactoryGroup, DenseFactoryGroup])
+@pytest.mark.parametrize('solver', ['iterative', 'linear'])
+def test_unproductive_cycle_raises(group_type, solver):
+    with pytest.raises(MindustryException):
+        group_type(materials = {CYCLE_A: -1}).get_upstream({CYCLE_A: B_TO_A, CYCLE_B: A_TO_B}, solver = solver)
+
+def test_linear_solver_follows_edited_sources():
+    import MindustryTools.Factories as F
+    surge = FactoryGroup([F.SurgeSmelter()])
+    assert F.SiliconCrucible() in surge.get_upstream(solver = 'linear').factories
+    F.SOURCES[M.SILICON].append(F.SiliconSmelter()) # The last source is the default one
+    try:
+        plan = surge.get_upstream(solver = 'linear')
+        assert F.SiliconSmelter() in plan.factories and F.SiliconCrucible() not in plan.factories
+    finally:
+        F.SOURCES[M.SILICON].pop()
+    assert F.SiliconCrucible() in surge.get_upstream(solver = 'linear').factories
+
+def test_productive_cycle_converges():
+    sources = {CYCLE_A: B_TO_2A, CYCLE_B: A_TO_B}
+    iterative = FactoryGroup(materials = {CYCLE_A: -1}).get_upstream(sources)
+    linear = FactoryGroup(materials = {CYCLE_A: -1}).get_upstream(sources, solver = 'linear')
+    assert linear.factories == pytest.approx({B_TO_2A: 1, A_TO_B: 1})
+    assert iterative.factories == pytest.approx(linear.factories, abs = 1e-3)
+
+def deficits(plan: FactoryGroup) -> dict:
+    return {material.name: rate for material, rate in plan.IOMap.items() if rate < -1e-6 and not material.is_natural}
+
+def cost(plan: FactoryGroup, group: FactoryGroup, objective: str) -> float:
+    'The cost of the factories a plan adds to a group, as optimize_upstream() counts it.'
+    return sum((count - group.factories.get(factory, 0)) * sum(OBJECTIVES[objective](factory)) for factory, count in plan.factories.items())
+
+@pytest.mark.parametrize('objective', list(OBJECTIVES))
+def test_optimize_upstream_is_balanced_and_optimal(objective):
+    group = FactoryGroup([SurgeSmelter()])
+    plan = optimize_upstream(group, objective)
+    assert not deficits(plan)
+    assert plan.factories[SurgeSmelter()] == 1
+    # The plan of get_upstream() is one of the plans the optimizer chooses from
+    assert cost(plan, group, objective) <= cost(group.get_upstream(solver = 'linear'), group, objective) + 1e-6
+
+@pytest.mark.parametrize('objective', list(OBJECTIVES))
+def test_optimize_sources_plan_is_balanced(objective):
+    group = FactoryGroup([SurgeSmelter()])
+    sources = optimize_sources(group, objective)
+    assert not deficits(group.get_upstream(sources, solver = 'linear'))
+
+def test_modal_efficiency_is_fractional():
+    group = FactoryGroup(materials = {M.SPORE_POD: -1})
+    plan = optimize_upstream(group, 'buildings', sources = {M.POWER: None}, efficiency = {Cultivator(): (0.25, 0.5)})
+    (cultivator, count), = plan.factories.items()
+    assert cultivator.id == Cultivator().id and cultivator.efficiency == pytest.approx(0.5)
+    assert count == pytest.approx(1 / (0.5 * Cultivator().outputs[M.SPORE_POD]))
+    assert plan.IOMap.get(M.SPORE_POD, 0) == pytest.approx(0, abs = 1e-9) # Power is left unsupplied
+
+def test_efficiency_range_only_applies_to_modal_buildings():
+    plan = optimize_upstream(FactoryGroup([SurgeSmelter()]), 'footprint', efficiency = (0.25, 0.5))
+    assert not deficits(plan)
+    for factory in plan.factories:
+        assert (0.25 - 1e-9 <= factory.efficiency <= 0.5 + 1e-9) if factory.modal_efficiency else factory.efficiency == 1
+
+def added(plan: FactoryGroup, group: FactoryGroup) -> dict:
+    'The factories a plan adds to a group.'
+    return {factory: count - group.factories.get(factory, 0) for factory, count in plan.factories.items() if count - group.factories.get(factory, 0) > 1e-9}
+
+POWERED = FactoryGroup([SurgeSmelter()]).get_upstream(power = 'exclude')
+
+@pytest.mark.parametrize('objective', list(OBJECTIVES))
+def test_balance_power_covers_the_deficit(objective):
+    plan = balance_power(POWERED, objective)
+    assert plan.IOMap.get(M.POWER, 0) >= -1e-6 and not deficits(plan)
+    assert all(plan.factories[factory] >= count - 1e-9 for factory, count in POWERED.factories.items()) # Fuel chains may need more of them
+    assert any(factory.power > 0 for factory in added(plan, POWERED))
+
+def test_balance_power_respects_generators_limits_and_fuel():
+    coal = -POWERED.IOMap[M.COAL]
+    plan = balance_power(POWERED, generators = [CombustionGenerator()], available = {M.COAL: 3.0})
+    assert [factory for factory in added(plan, POWERED) if factory.power > 0] == [CombustionGenerator()]
+    assert -plan.IOMap[M.COAL] - coal <= 3.0 + 1e-6
+    with pytest.raises(SolverException):
+        balance_power(POWERED, generators = [CombustionGenerator()], available = {M.COAL: 1.0}, exclude = [CoalCentrifuge()]) # Needs about 2.9 coal / second
+    limited = balance_power(POWERED, 'fuel', limits = {LargeSolarPanel(): 2})
+    assert limited.factories.get(LargeSolarPanel(), 0) <= 2 + 1e-9 and limited.IOMap.get(M.POWER, 0) >= -1e-6
+
+def test_balance_power_rounded():
+    plan = balance_power(POWERED, 'buildings', rounded = True)
+    assert plan.IOMap.get(M.POWER, 0) >= -1e-6 and not deficits(plan)
+    assert all(count == round(count) for count in added(plan, POWERED).values())
+
+def test_balance_power_without_deficit():
+    group = FactoryGroup([SurgeSmelter(), ImpactReactor()])
+    plan = balance_power(group)
+    assert plan is not group and plan.factories == group.factories
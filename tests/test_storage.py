@@ -0,0 +1,58 @@
+'''
+Tests that plans survive pack_plan()/unpack_plan() and a PlanStore unchanged.
+'''
+import pytest
+
+from MindustryTools.MindustryObject import MindustryException
+from MindustryTools.Factories import FactoryGroup, Kiln, SiliconSmelter, SurgeSmelter
+from MindustryTools.DenseGroups import FixedPointFactoryGroup
+from MindustryTools.Storage import PlanStore, pack_plan, unpack_plan
+import MindustryTools.Materials as M
+
+def plans():
+    return [
+        FactoryGroup([SurgeSmelter()]).get_upstream(),
+        FactoryGroup({Kiln(): 3}).get_upstream(rounded = True),
+        FactoryGroup(materials = {M.COPPER: 1.5}),
+        FixedPointFactoryGroup([SiliconSmelter()]).get_upstream(),
+    ]
+
+def assert_same(group: FactoryGroup, expected: FactoryGroup):
+    assert type(group) is type(expected)
+    assert group.factories == expected.factories
+    assert group.IOMap == expected.IOMap
+    assert list(group.IOMap) == list(expected.IOMap) # In the same order
+
+@pytest.mark.parametrize('plan', plans(), ids = ['upstream', 'rounded', 'materials', 'fixed point'])
+def test_pack_round_trip(plan):
+    assert_same(unpack_plan(pack_plan(plan)), plan)
+
+def test_unpack_rejects_other_data():
+    with pytest.raises(MindustryException):
+        unpack_plan(b'not a plan')
+
+def test_plan_store_round_trip(tmp_path):
+    path = str(tmp_path / 'plans.bin')
+    with PlanStore(path) as store:
+        assert store.extend(plans()) == [0, 1, 2, 3]
+        store.append(FactoryGroup([Kiln()]))
+    with PlanStore(path) as store:
+        assert len(store) == 5
+        for stored, plan in zip(store, plans() + [FactoryGroup([Kiln()])]):
+            assert_same(stored, plan)
+        assert store.rates(M.METAGLASS).tolist() == [plan.IOMap.get(M.METAGLASS, 0) for plan in store]
+        assert store.counts(Kiln()).tolist() == [plan.factories.get(Kiln(), 0) for plan in store]
+        assert_same(store.select(store.counts(Kiln()) > 0)[0], plans()[1])
+
+def test_plan_store_ignores_incomplete_record(tmp_path):
+    path = str(tmp_path / 'plans.bin')
+    with PlanStore(path) as store:
+        store.extend(plans())
+    with open(path, 'ab') as file:
+        file.write(pack_plan(FactoryGroup([Kiln()]))[16:30]) # Part of a record, as left by an interrupted write
+    with PlanStore(path) as store:
+        assert len(store) == 4
+        store.append(FactoryGroup([Kiln()]))
+    with PlanStore(path) as store:
+        assert len(store) == 5
+        assert_same(store[4], FactoryGroup([Kiln()]))
@@ -0,0 +1,81 @@
+'''
+Tests of parameter sweeps: their rows, errors, checkpoints, and that every way of running them gives the same rows.
+'''
+from concurrent.futures import ThreadPoolExecutor
+import json
+
+from MindustryTools.Factories import FactoryGroup, Kiln, SiliconSmelter
+from MindustryTools.Sweeps import iter_sweep, parameter_grid, sweep
+import MindustryTools.Materials as M
+
+def build(count, factory):
+    'A plan of count factories, at the top level of the module so that worker processes can load it.'
+    if count < 0:
+        raise ValueError('negative count')
+    return FactoryGroup(factories = {factory: count})
+
+GRID = {'count': [1, -1, 2], 'factory': [Kiln(), SiliconSmelter()]}
+
+def without_times(result):
+    return [{key: value for key, value in row.items() if key != 'seconds'} for row in result]
+
+def test_parameter_grid():
+    assert parameter_grid(rate = [1, 2], boosted = [False, True]) == [{'rate': 1, 'boosted': False}, {'rate': 1, 'boosted': True}, {'rate': 2, 'boosted': False}, {'rate': 2, 'boosted': True}]
+
+def test_rows():
+    result = sweep(build, GRID, processes = 1)
+    assert len(result) == 6 and [row['index'] for row in result] == list(range(6))
+    assert result[0]['parameters'] == {'count': 1, 'factory': 'Kiln'}
+    assert result[0]['counts'] == {'Kiln': 1} and result[0]['rates'] == {material.name: rate for material, rate in FactoryGroup([Kiln()]).IOMap.items()}
+    assert [row['index'] for row in result.errors] == [2, 3] and result.errors[0]['error'] == 'ValueError: negative count'
+    assert sweep(lambda count: {'double': count * 2}, {'count': [1, 2]}, processes = 1).column('double') == [2, 4]
+
+def test_executors_give_the_same_rows():
+    serial = without_times(sweep(build, GRID, processes = 1))
+    with ThreadPoolExecutor(2) as executor:
+        assert without_times(sweep(build, GRID, executor = executor, chunksize = 1)) == serial
+    assert without_times(sweep(build, GRID, processes = 2)) == serial
+
+def test_checkpoint_resumes(tmp_path):
+    path = str(tmp_path / 'sweep.jsonl')
+    calls = []
+    def counted(count, factory):
+        calls.append((count, factory))
+        return build(count, factory)
+    first = sweep(counted, GRID, processes = 1, checkpoint = path)
+    assert len(calls) == 6
+
+    # An interrupted sweep leaves a partial last line, which is skipped and ended
+    with open(path, 'a') as file:
+        file.write('{"index": 9, "param')
+    calls.clear()
+    again = sweep(counted, GRID, processes = 1, checkpoint = path)
+    assert sorted(calls, key = repr) == sorted([(-1, Kiln()), (-1, SiliconSmelter())], key = repr) # Only the errors are retried
+    assert without_times(again) == without_times(first)
+
+    calls.clear()
+    assert len(sweep(counted, GRID, processes = 1, checkpoint = path, retry_errors = False).errors) == 2
+    assert calls == []
+
+    # New points in the grid are evaluated, and the old ones still apply
+    sweep(counted, {**GRID, 'count': [1, 3]}, processes = 1, checkpoint = path)
+    assert [count for count, factory in calls] == [3, 3]
+    with open(path) as file:
+        lines = file.read().splitlines()
+    assert lines[6] == '{"index": 9, "param' # Only the partial line is not a whole row
+    assert all(json.loads(line) for line in lines[:6] + lines[7:])
+
+def test_iter_sweep_yields_checkpointed_rows_first(tmp_path):
+    path = str(tmp_path / 'sweep.jsonl')
+    sweep(build, {'count': [2], 'factory': [Kiln()]}, processes = 1, checkpoint = path)
+    rows = list(iter_sweep(build, {'count': [1, 2], 'factory': [Kiln()]}, processes = 1, checkpoint = path))
+    assert [row['index'] for row in rows] == [1, 0]
+
+def test_table_and_csv(tmp_path):
+    result = sweep(build, {'count': [1, -1], 'factory': [Kiln()]}, processes = 1)
+    assert result.columns()[:3] == ['index', 'count', 'factory']
+    assert result.column('Kiln count') == [1, None] and result.column('error') == [None, 'ValueError: negative count']
+    assert result.column(M.METAGLASS.name) == [Kiln().outputs[M.METAGLASS], None]
+    path = tmp_path / 'sweep.csv'
+    text = result.to_csv(str(path))
+    assert path.read_text() == text and text.splitlines()[0] == ','.join(result.columns())
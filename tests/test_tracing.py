@@ -0,0 +1,57 @@
+'''
+Tests of the tracer: what it records, its exports, and that it only traces its own thread.
+'''
+import json
+import threading
+
+from MindustryTools.Factories import FactoryGroup, Kiln, SurgeSmelter
+from MindustryTools.DenseGroups import DenseFactoryGroup
+from MindustryTools.Tracing import Tracer
+
+def test_records_get_upstream():
+    seen = []
+    with Tracer(callback = seen.append) as tracer:
+        plan = FactoryGroup([SurgeSmelter()]).get_upstream()
+        DenseFactoryGroup([Kiln()]).get_upstream(rounded = True)
+    assert repr(plan) == repr(FactoryGroup([SurgeSmelter()]).get_upstream()) # Tracing does not change plans
+
+    spans = [event for event in tracer.events if event['name'] == 'get_upstream']
+    iterations = [event for event in tracer.events if event['name'] == 'iteration']
+    assert tracer.counters['get_upstream'] == len(spans) == 2
+    assert tracer.counters['iterations'] == len(iterations) > 0
+    assert all(event['depth'] == 0 for event in spans) and all(event['depth'] == 1 for event in iterations)
+    assert set(plan.factories) - {SurgeSmelter()} <= {event['args']['source'] for event in iterations}
+    assert sorted(map(id, seen)) == sorted(map(id, tracer.events)) # The callback gets every event once
+
+def test_counts_operators():
+    with Tracer() as tracer:
+        FactoryGroup([SurgeSmelter()]) + Kiln()
+    assert tracer.counters['add'] == 1 and tracer.counters['iadd'] == 1 # + copies, then uses +=
+    assert tracer.counters['allocations'] == 2
+
+def test_exports():
+    with Tracer() as tracer:
+        FactoryGroup([SurgeSmelter()]).get_upstream()
+    exported = json.loads(tracer.to_json())
+    assert exported['counters'] == tracer.counters
+    assert exported['events'][1]['args']['material'] == tracer.events[1]['args']['material'].name
+    trace = json.loads(tracer.to_chrome_trace())['traceEvents']
+    assert len([event for event in trace if event['ph'] == 'X']) == len(tracer.events)
+    folded = dict(line.rsplit(' ', 1) for line in tracer.to_folded().splitlines())
+    assert 'get_upstream' in folded and all(label.startswith('get_upstream;iteration ') for label in folded if label != 'get_upstream')
+
+def test_other_threads_are_not_traced():
+    with Tracer() as tracer:
+        thread = threading.Thread(target = lambda: FactoryGroup([SurgeSmelter()]).get_upstream())
+        thread.start()
+        thread.join()
+    assert tracer.counters == {} and tracer.events == []
+
+def test_nested_tracers():
+    with Tracer() as outer:
+        FactoryGroup([Kiln()]).get_upstream()
+        with Tracer() as inner:
+            FactoryGroup([SurgeSmelter()]).get_upstream()
+        FactoryGroup([Kiln()]).get_upstream()
+    assert outer.counters['get_upstream'] == 2 and inner.counters['get_upstream'] == 1
+    assert not set(map(id, outer.events)) & set(map(id, inner.events))
@@ -0,0 +1,45 @@
+'''
+Tests of building variants: each variant is shared, and different variants are never merged.
+'''
+import pickle
+
+import pytest
+
+from MindustryTools.MindustryObject import VARIANTS, MindustryException
+from MindustryTools.Collectors import MechanicalDrill
+from MindustryTools.Factories import FactoryGroup, Kiln, WaterExtractor
+from MindustryTools.DenseGroups import DenseFactoryGroup, FixedPointFactoryGroup
+import MindustryTools.Materials as M
+
+def test_variants_are_shared():
+    half = WaterExtractor(efficiency = 0.5)
+    assert half is WaterExtractor(efficiency = 0.5) is WaterExtractor().variant(efficiency = 0.5)
+    assert half.variant(efficiency = 1.0) is WaterExtractor() is WaterExtractor(efficiency = 1.0)
+    count = len(VARIANTS)
+    for _ in range(3):
+        WaterExtractor(efficiency = 0.5)
+    assert len(VARIANTS) == count
+
+def test_variants_are_not_merged():
+    half, full = WaterExtractor(efficiency = 0.5), WaterExtractor()
+    assert half != full and half.index != full.index and len({half, full}) == 2
+    assert half.outputs == {M.WATER: 3.3} and full.outputs == {M.WATER: 6.6}
+    assert half.variant(efficiency = 0.25).outputs == {M.WATER: pytest.approx(1.65)} # Scaled from the original rates, not the half rates
+    for group_type in (FactoryGroup, DenseFactoryGroup, FixedPointFactoryGroup):
+        group = group_type([half, full]) + half
+        assert group.factories == {half: 2, full: 1}, group_type
+        assert group.IOMap[M.WATER] == pytest.approx(13.2)
+
+def test_boosted_drills():
+    boosted = MechanicalDrill(boosted = True)
+    assert boosted is MechanicalDrill().variant(boosted = True) and boosted != MechanicalDrill()
+    assert boosted.get_speed(M.COPPER) == pytest.approx(MechanicalDrill().get_speed(M.COPPER) * boosted.boost_multiplier)
+
+def test_pickled_variants_compare_equal():
+    half = WaterExtractor(efficiency = 0.5)
+    copy = pickle.loads(pickle.dumps(half))
+    assert copy == half and copy != WaterExtractor() and copy.outputs == half.outputs
+
+def test_unknown_variant_field():
+    with pytest.raises(MindustryException):
+        Kiln().variant(boosted = True)